@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+AsyncGeoText latency under concurrent load
+
+Several client threads submit texts at once, each one waiting for its read
+to be done before submitting the next one. Prints read latency percentiles
+for the thread and the process executors.
+
+Usage::
+
+    $ python benchmarks/bench_async.py [--clients 32] [--requests 5000]
+"""
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import threading
+import time
+
+from corpus import generate_texts
+from geotext import GeoText
+from geotext.async_geotext import AsyncGeoText
+
+
+def percentile(values, percent):
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def run(async_geo_text, texts, clients):
+    latencies = list()
+    lock = threading.Lock()
+
+    def client(client_texts):
+        for text in client_texts:
+            start = time.time()
+            async_geo_text.aread(text).result()
+            with lock:
+                latencies.append(time.time() - start)
+
+    threads = [
+        threading.Thread(target=client, args=(texts[idx::clients],))
+        for idx in range(clients)
+    ]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument(
+        '--workers', type=int, default=multiprocessing.cpu_count()
+    )
+    parser.add_argument('--max-pending', type=int, default=None)
+    args = parser.parse_args()
+
+    geo_text = GeoText()
+    texts = generate_texts(geo_text._geodb, args.requests)
+    for use_processes in (False, True):
+        with AsyncGeoText(
+            geo_text, workers=args.workers, use_processes=use_processes,
+            max_pending=args.max_pending,
+        ) as async_geo_text:
+            total_time, latencies = run(async_geo_text, texts, args.clients)
+        print(
+            '{:9} {:7.0f} reads/s  latency ms: p50 {:.2f} p95 {:.2f} '
+            'p99 {:.2f} max {:.2f}'.format(
+                'processes' if use_processes else 'threads',
+                len(texts) / total_time,
+                *[
+                    1000 * percentile(latencies, percent)
+                    for percent in (50, 95, 99, 100)
+                ]
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+CandidateDB benchmark: candidates generation and locations suppression
+
+Usage::
+
+    $ python benchmarks/bench_candidates.py [--words 10000] [--repeat 3]
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from geotext.models.candidate import CandidateDB
+
+VOCABULARY = (
+    'the of and in a to from I live visit my friends near city river north '
+    'south new york san francisco los angeles london paris moscow berlin '
+    'united states kingdom republic'
+).split()
+
+LOCATIONS = {
+    'new york', 'new york city', 'san francisco', 'los angeles', 'london',
+    'paris', 'moscow', 'berlin', 'united states', 'united kingdom',
+}
+
+
+def generate_text(words_count, seed=0):
+    rnd = random.Random(seed)
+    return ' '.join(rnd.choice(VOCABULARY) for _ in range(words_count))
+
+
+def run(text, max_phrase_len):
+    candidates = locations = 0
+    candidate_db = CandidateDB(text, max_phrase_len=max_phrase_len)
+    for candidate in candidate_db.get_candidates():
+        candidates += 1
+        if candidate.text in LOCATIONS:
+            locations += 1
+            candidate.mark_as_location()
+    return candidates, locations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    text = generate_text(args.words)
+    for max_phrase_len in (3, 5, 7):
+        timings = list()
+        for _ in range(args.repeat):
+            start = time.time()
+            candidates, locations = run(text, max_phrase_len)
+            timings.append(time.time() - start)
+        print(
+            'words={} max_phrase_len={}: {:.3f}s best of {} '
+            '({} candidates, {} locations)'.format(
+                args.words, max_phrase_len, min(timings), args.repeat,
+                candidates, locations
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
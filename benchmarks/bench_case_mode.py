@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Case modes comparison: candidates, lookups, throughput and precision
+
+Texts are generated prose with capitalized places names (the expected
+locations) and lowercase words that are also places names ("china",
+"turkey", "of").
+
+Usage::
+
+    $ python benchmarks/bench_case_mode.py [--documents 20000]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from corpus import generate_labeled_texts
+from geotext import GeoText, load_geotext_model
+
+
+def measure(geodb, labeled_texts, case_mode, matcher):
+    texts = [text for text, _ in labeled_texts]
+    geo_text = GeoText(
+        geodb, matcher=matcher, case_mode=case_mode, instrument=True
+    )
+    start = time.time()
+    all_results = geo_text.read_many(texts)
+    elapsed = time.time() - start
+    found = correct = expected = 0
+    for results, (_, mentions) in zip(all_results, labeled_texts):
+        spans = set((span.start, span.end) for span in results.spans)
+        found += len(spans)
+        correct += len(spans & mentions)
+        expected += len(mentions)
+    return (
+        geo_text.stats.candidates / float(len(texts)),
+        geo_text.stats.lookups / float(len(texts)),
+        len(texts) / elapsed,
+        correct / float(found) if found else 0.0,
+        correct / float(expected) if expected else 0.0,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--documents', type=int, default=20000)
+    args = parser.parse_args()
+
+    geodb = load_geotext_model().load()
+    labeled_texts = generate_labeled_texts(geodb, args.documents, seed=1)
+    print('{:7} {:6} {:>11} {:>8} {:>10} {:>9} {:>7}'.format(
+        'matcher', 'case', 'candidates', 'lookups', 'texts/s', 'precision',
+        'recall',
+    ))
+    for matcher in GeoText.MATCHERS:
+        for case_mode in GeoText.CASE_MODES:
+            print(
+                '{:7} {:6} {:11.1f} {:8.1f} {:10.0f} {:9.3f} {:7.3f}'.format(
+                    matcher, case_mode,
+                    *measure(geodb, labeled_texts, case_mode, matcher)
+                )
+            )
+
+
+if __name__ == '__main__':
+    main()
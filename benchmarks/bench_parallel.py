@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+geotext.parallel scaling from 1 to N worker processes
+
+Usage::
+
+    $ python benchmarks/bench_parallel.py [--documents 100000] \
+        [--chunk-size 256]
+"""
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import time
+
+from corpus import generate_texts
+from geotext import GeoText
+from geotext.parallel import read_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument(
+        '--max-workers', type=int, default=multiprocessing.cpu_count()
+    )
+    args = parser.parse_args()
+
+    geo_text = GeoText()
+    texts = generate_texts(geo_text._geodb, args.documents)
+    workers_counts = sorted({1, args.max_workers} | {
+        2 ** power for power in range(args.max_workers.bit_length())
+    })
+    single_process_time = None
+    for workers in workers_counts:
+        start = time.time()
+        for _ in read_parallel(
+            texts, workers=workers, chunk_size=args.chunk_size,
+            geo_text=geo_text,
+        ):
+            pass
+        timing = time.time() - start
+        single_process_time = single_process_time or timing
+        print('workers={:<3} {:8.2f}s {:10.0f} documents/s  x{:.1f}'.format(
+            workers, timing, len(texts) / timing, single_process_time / timing
+        ))
+
+
+if __name__ == '__main__':
+    main()
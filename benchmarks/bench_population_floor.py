@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Model size, memory and read latency for several population floors
+
+Every model is built from the data files in a fresh process, so memory
+numbers don't include other models. RSS is read from /proc (Linux only).
+
+Usage::
+
+    $ python benchmarks/bench_population_floor.py [--documents 20000]
+"""
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from corpus import generate_texts
+from geotext import GeoText, load_geotext_model
+
+FLOORS = (0, 15000, 50000, 100000, 500000)
+
+
+def get_rss():
+    """
+    Resident memory of the current process in MB
+    """
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / float(1 << 20)
+
+
+def measure(min_population_floor, texts, output):
+    rss = get_rss()
+    start = time.time()
+    database = load_geotext_model(
+        snapshot_path=None, min_population_floor=min_population_floor
+    ).load()
+    build_time = time.time() - start
+    model_rss = get_rss() - rss
+    geo_text = GeoText(database)
+    start = time.time()
+    for text in texts:
+        geo_text.read(text)
+    read_time = time.time() - start
+    output.put((
+        len(list(database.city_db.all())), build_time, model_rss,
+        read_time * 1e6 / len(texts), database.get_max_location_length(),
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--documents', type=int, default=20000)
+    args = parser.parse_args()
+
+    # Same corpus for all floors, with all the cities mentioned
+    texts = generate_texts(load_geotext_model(), args.documents)
+    print('{:>8} {:>7} {:>8} {:>9} {:>12} {:>7}'.format(
+        'floor', 'cities', 'build', 'RSS', 'read', 'max len'
+    ))
+    for min_population_floor in FLOORS:
+        output = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=measure, args=(min_population_floor, texts, output)
+        )
+        process.start()
+        cities, build_time, model_rss, read_latency, max_length = (
+            output.get()
+        )
+        process.join()
+        print('{:>8} {:>7} {:>7.2f}s {:>7.1f}MB {:>9.1f}us/doc {:>7}'.format(
+            min_population_floor, cities, build_time, model_rss,
+            read_latency, max_length,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+GeoText.read_many throughput compared to a plain loop over GeoText.read
+
+Usage::
+
+    $ python benchmarks/bench_read_many.py [--documents 100000]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from corpus import generate_texts
+from geotext import GeoText
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--documents', type=int, default=100000)
+    args = parser.parse_args()
+
+    geo_text = GeoText()
+    texts = generate_texts(geo_text._geodb, args.documents)
+
+    start = time.time()
+    for text in texts:
+        geo_text.read(text)
+    loop_time = time.time() - start
+
+    start = time.time()
+    geo_text.read_many(texts)
+    batch_time = time.time() - start
+
+    for name, timing in (('read loop', loop_time), ('read_many', batch_time)):
+        print('{:10} {:8.2f}s {:10.0f} documents/s'.format(
+            name, timing, len(texts) / timing
+        ))
+
+
+if __name__ == '__main__':
+    main()
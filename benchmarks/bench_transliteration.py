@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Transliteration cost on a mixed-script corpus and during model build
+
+Compares `replace_non_ascii` (ASCII fast path and memoized transliteration)
+with plain `unidecode` of every text and prints the transliteration
+counters.
+
+Usage::
+
+    $ python benchmarks/bench_transliteration.py [--documents 100000]
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from unidecode import unidecode
+
+from geotext.tasks.db_tasks import create_databases
+from geotext.text_utils import replace_non_ascii, transliteration_stats
+
+WORDS = (
+    u'London Paris Berlin New York weather today great trip from to in '
+    u'Москва Воронеж Санкт-Петербург Київ 東京 大阪 北京 Zürich Kraków '
+    u'São Paulo Izumiōtsu Malmö Reykjavík İstanbul'
+).split()
+
+
+def generate_texts(documents_count, ascii_share=0.7, seed=0):
+    rnd = random.Random(seed)
+    ascii_words = [word for word in WORDS if not ord(max(word)) > 127]
+    texts = list()
+    for _ in range(documents_count):
+        words = ascii_words if rnd.random() < ascii_share else WORDS
+        texts.append(u' '.join(rnd.choice(words) for _ in range(12)))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--documents', type=int, default=100000)
+    args = parser.parse_args()
+
+    texts = generate_texts(args.documents)
+    start = time.time()
+    for text in texts:
+        unidecode(text)
+    unidecode_time = time.time() - start
+
+    transliteration_stats.reset()
+    start = time.time()
+    for text in texts:
+        replace_non_ascii(text)
+    cached_time = time.time() - start
+    print('corpus: unidecode {:.2f}s, replace_non_ascii {:.2f}s'.format(
+        unidecode_time, cached_time
+    ))
+    print('corpus:', transliteration_stats)
+
+    transliteration_stats.reset()
+    start = time.time()
+    create_databases()
+    print('model build: {:.2f}s'.format(time.time() - start))
+    print('model build:', transliteration_stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic synthetic corpora built from the bundled gazetteer
+
+The same seed and model always give the same texts, so benchmark results
+are comparable between runs and machines.
+"""
+import random
+
+TEMPLATES = (
+    'Just landed in {}!',
+    'Living in {} but missing {} so much',
+    'Greetings from {}, the weather is great',
+    '{} | {} | coffee lover',
+    'on my way to {}',
+    'nothing to see here, just a short tweet',
+)
+
+FILLER_WORDS = (
+    'the of and in a to from I we live visit my our friends near city river '
+    'north south report said was were will meeting market people today '
+    'government company week year new old'
+).split()
+
+
+# Common lowercase words that are also places names, e.g. china (porcelain)
+HOMOGRAPHS = (
+    'china turkey chile jordan georgia chad guinea nice reading mobile of '
+    'split march may august buffalo victoria phoenix aurora'
+).split()
+
+
+def get_place_names(geodb):
+    """
+    Names of the cities and countries of the model, in a stable order
+    """
+    return sorted(
+        place.name for place in geodb.city_db.all()
+    ) + sorted(
+        place.name for place in geodb.country_db.all()
+    )
+
+
+def generate_texts(geodb, documents_count, seed=0):
+    """
+    Tweet-sized texts mentioning up to two places each
+    """
+    rnd = random.Random(seed)
+    names = get_place_names(geodb)
+    texts = list()
+    for _ in range(documents_count):
+        template = rnd.choice(TEMPLATES)
+        texts.append(template.format(
+            *[rnd.choice(names) for _ in range(template.count('{}'))]
+        ))
+    return texts
+
+
+def generate_document(geodb, words_count, mentions_share=0.02, seed=0):
+    """
+    Long text of filler words with place names mixed in
+
+    Args:
+        mentions_share (float)  share of words replaced by a place name
+    """
+    rnd = random.Random(seed)
+    names = get_place_names(geodb)
+    words = list()
+    while len(words) < words_count:
+        if rnd.random() < mentions_share:
+            words.extend(rnd.choice(names).split())
+        else:
+            words.append(rnd.choice(FILLER_WORDS))
+        if rnd.random() < 0.05:
+            words[-1] += '.'
+    return ' '.join(words[:words_count])
+
+
+def generate_labeled_texts(geodb, documents_count, seed=0):
+    """
+    Prose-like sentences with capitalized place names and lowercase
+    homographs of places names mixed in
+
+    Returns:
+        list of (text, set of (start, end) of each place name in the text)
+    """
+    rnd = random.Random(seed)
+    names = get_place_names(geodb)
+    texts = list()
+    for _ in range(documents_count):
+        words = list()
+        mentions = set()
+        position = 0
+        for word_num in range(rnd.randint(8, 30)):
+            if rnd.random() < 0.08:
+                word = rnd.choice(names)
+                mentions.add((position, position + len(word)))
+            elif rnd.random() < 0.08:
+                word = rnd.choice(HOMOGRAPHS)
+            else:
+                word = rnd.choice(FILLER_WORDS)
+                if word_num == 0:
+                    word = word.capitalize()
+            words.append(word)
+            position += len(word) + 1
+        texts.append((' '.join(words) + '.', mentions))
+    return texts
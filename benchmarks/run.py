@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite: model load, short and long texts, batches and memory
+
+Every case runs in a fresh process on a deterministic synthetic corpus and
+reports its metrics as JSON. With `--baseline` results are compared to a
+previous run and the script fails if any metric got worse by more than
+`--tolerance`.
+
+Usage::
+
+    $ python benchmarks/run.py --output baseline.json
+    $ python benchmarks/run.py --baseline baseline.json [--tolerance 0.2]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from corpus import generate_document, generate_texts
+from geotext import GeoText, load_geotext_model
+from geotext.instrumentation import get_peak_rss_mb
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def bench_model_load_cold(args):
+    start = time.time()
+    load_geotext_model(snapshot_path=None).load()
+    return OrderedDict((('load_seconds', time.time() - start),))
+
+
+def bench_model_load_warm(args):
+    start = time.time()
+    geo_text = GeoText(load_geotext_model(args.snapshot_path).load())
+    load_time = time.time() - start
+    start = time.time()
+    geo_text.read('Voronezh and NY')
+    return OrderedDict((
+        ('load_seconds', load_time),
+        # Includes building the lookup structures
+        ('first_read_seconds', time.time() - start),
+    ))
+
+
+def bench_short_texts(args):
+    geo_text = GeoText(load_geotext_model(args.snapshot_path))
+    texts = generate_texts(geo_text._geodb, args.documents)
+    geo_text.read(texts[0])
+    latencies = list()
+    for text in texts:
+        start = time.time()
+        geo_text.read(text)
+        latencies.append(time.time() - start)
+    return OrderedDict((
+        ('p50_latency_us', _percentile(latencies, 0.5) * 1e6),
+        ('p95_latency_us', _percentile(latencies, 0.95) * 1e6),
+        ('p99_latency_us', _percentile(latencies, 0.99) * 1e6),
+    ))
+
+
+def bench_long_documents(args, window_size=None):
+    geo_text = GeoText(load_geotext_model(args.snapshot_path))
+    geo_text.read('warm up')
+    timings = list()
+    for seed in range(args.long_documents):
+        text = generate_document(geo_text._geodb, args.long_words, seed=seed)
+        start = time.time()
+        geo_text.read(text, window_size=window_size)
+        timings.append(time.time() - start)
+    return OrderedDict((
+        ('mean_latency_seconds', sum(timings) / len(timings)),
+        ('words_per_second', args.long_words * len(timings) / sum(timings)),
+    ))
+
+
+def bench_long_documents_windowed(args):
+    return bench_long_documents(args, window_size=1000)
+
+
+def bench_batch(args):
+    geo_text = GeoText(load_geotext_model(args.snapshot_path))
+    texts = generate_texts(geo_text._geodb, args.documents, seed=1)
+    geo_text.read(texts[0])
+    start = time.time()
+    geo_text.read_many(texts)
+    return OrderedDict((
+        ('documents_per_second', len(texts) / (time.time() - start)),
+    ))
+
+
+CASES = OrderedDict((
+    ('model_load_cold', bench_model_load_cold),
+    ('model_load_warm', bench_model_load_warm),
+    ('short_texts', bench_short_texts),
+    ('long_documents', bench_long_documents),
+    ('long_documents_windowed', bench_long_documents_windowed),
+    ('batch', bench_batch),
+))
+
+
+def _run_case(bench, args, output):
+    metrics = bench(args)
+    metrics['peak_rss_mb'] = get_peak_rss_mb()
+    output.put(metrics)
+
+
+def run_case(name, args):
+    # A fresh process per case, so caches and memory peaks of other cases
+    # don't affect it
+    output = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_run_case, args=(CASES[name], args, output)
+    )
+    process.start()
+    metrics = output.get()
+    process.join()
+    return metrics
+
+
+def is_higher_better(metric):
+    return metric.endswith('_per_second')
+
+
+def compare(results, baseline, tolerance):
+    """
+    List of (case, metric, baseline value, value) that got worse by more
+    than `tolerance` (a share of the baseline value)
+    """
+    regressions = list()
+    for case, metrics in results['cases'].items():
+        for metric, value in metrics.items():
+            try:
+                baseline_value = baseline['cases'][case][metric]
+            except KeyError:
+                continue
+            if is_higher_better(metric):
+                is_worse = value < baseline_value * (1 - tolerance)
+            else:
+                is_worse = value > baseline_value * (1 + tolerance)
+            if is_worse:
+                regressions.append((case, metric, baseline_value, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        'cases', nargs='*', metavar='CASE',
+        help='cases to run: {} (default: all)'.format(', '.join(CASES)),
+    )
+    parser.add_argument('--documents', type=int, default=10000)
+    parser.add_argument('--long-documents', type=int, default=3)
+    parser.add_argument('--long-words', type=int, default=50000)
+    parser.add_argument('--output', help='write results JSON to this file')
+    parser.add_argument('--baseline', help='results JSON to compare with')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='allowed slowdown as a share of the baseline value '
+             '(default: %(default)s)',
+    )
+    args = parser.parse_args(argv)
+    for name in args.cases:
+        if name not in CASES:
+            parser.error('unknown case: {}'.format(name))
+
+    snapshot_dir = tempfile.mkdtemp()
+    args.snapshot_path = os.path.join(snapshot_dir, 'model.pickle')
+    try:
+        # Write the snapshot the warm cases load
+        load_geotext_model(args.snapshot_path).load()
+        results = OrderedDict((
+            ('python', platform.python_version()),
+            ('platform', platform.platform()),
+            ('params', OrderedDict((
+                ('documents', args.documents),
+                ('long_documents', args.long_documents),
+                ('long_words', args.long_words),
+            ))),
+            ('cases', OrderedDict()),
+        ))
+        for name in args.cases or CASES:
+            results['cases'][name] = run_case(name, args)
+            print('{:24} {}'.format(name, ', '.join(
+                '{}={:.6g}'.format(metric, value)
+                for metric, value in results['cases'][name].items()
+            )), file=sys.stderr)
+    finally:
+        shutil.rmtree(snapshot_dir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for case, metric, baseline_value, value in regressions:
+            print('REGRESSION {} {}: {:.6g} -> {:.6g}'.format(
+                case, metric, baseline_value, value
+            ), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
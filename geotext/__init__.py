@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from geotext import GeoText, load_geotext_model
+from geotext import GeoText, load_geotext_model, load_mapped_geotext_model
 
 __author__ = 'Denis Kovalev'
 __email__ = 'aikikode@gmail.com'
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+from cli import main
+
+main()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Mentions counts of many documents, mergeable across processes
+
+    >>> aggregator = MentionAggregator(geo_text)
+    >>> for results in geo_text.iter_read_many(shard):
+    ...     aggregator.add(results)
+    >>> data = aggregator.to_bytes()  # send it to the reducer
+
+    >>> total = MentionAggregator(geo_text)
+    >>> for data in shards_data:
+    ...     total.merge(MentionAggregator.from_bytes(geo_text, data))
+    >>> total.top_k('countries', 3)
+    [(Country: United States, 4807), (Country: United Kingdom, 1290), ...]
+
+Places are counted by their `PlaceIndex` ids, so counters are plain integers
+and places are looked up only for the reported top ones.
+"""
+import heapq
+import struct
+from collections import Counter
+
+# Serialized aggregator: magic, format version, documents count, then for
+# each of `MentionAggregator.KINDS`: place index fingerprint, number of
+# counted places, their ids and their counts
+_MAGIC = b'GTMA'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHQ')
+_KIND_HEADER = struct.Struct('<II')
+
+
+class MentionAggregator(object):
+    """
+    Places mentions counts: countries as `GeoText.get_country_mentions`
+    counts them, states and cities found in each document
+
+    Aggregators of the same model can be merged in any order and grouping,
+    with the same result. An aggregator counts the places of the model
+    `geo_text` has when it's created: after `GeoText.swap_model` places
+    missing in that model can't be added (ValueError), aggregate the results
+    of the new model with a new aggregator.
+    Args:
+        geo_text (GeoText)  searcher the results come from
+    Attributes:
+        documents (int)  number of added results
+        counts (dict)  kind -> `Counter` of place id -> mentions count
+    """
+    KINDS = ('countries', 'states', 'cities')
+    # Databases the places of each kind are indexed in
+    _DATABASES = {
+        'countries': 'country_db',
+        'states': 'state_db',
+        'cities': 'city_db',
+    }
+
+    def __init__(self, geo_text):
+        self._geo_text = geo_text
+        self._indexes = dict(
+            (kind, geo_text._geodb.get_place_index(self._DATABASES[kind]))
+            for kind in self.KINDS
+        )
+        self.documents = 0
+        self.counts = dict((kind, Counter()) for kind in self.KINDS)
+
+    def add(self, results=None):
+        """
+        Count mentions of one document
+
+        Args:
+            results (Results)  results of the document, the last `read`
+                results of `geo_text` by default
+        """
+        if results is None:
+            results = self._geo_text.results
+        self.documents += 1
+        counts = self.counts['countries']
+        for country in self._geo_text._iter_country_mentions(results):
+            counts[self._get_id('countries', country)] += 1
+        for kind in ('states', 'cities'):
+            counts = self.counts[kind]
+            for place in getattr(results, kind):
+                counts[self._get_id(kind, place)] += 1
+        return self
+
+    def _get_id(self, kind, place):
+        try:
+            return self._indexes[kind].get_id(place)
+        except KeyError:
+            raise ValueError(
+                '{!r} is not in the model of the aggregator, aggregate the '
+                'results of another model separately'.format(place)
+            )
+
+    def merge(self, other):
+        """
+        Add the counts of another aggregator of the same model
+        """
+        for kind in self.KINDS:
+            if other._indexes[kind].fingerprint != (
+                self._indexes[kind].fingerprint
+            ):
+                raise ValueError(
+                    'Aggregators of different models: {} ids differ'.format(
+                        kind
+                    )
+                )
+        self.documents += other.documents
+        for kind in self.KINDS:
+            self.counts[kind].update(other.counts[kind])
+        return self
+
+    def top_k(self, kind='countries', k=10):
+        """
+        `k` most mentioned places of `kind` with their counts, places with
+        the same count are ordered by id
+        """
+        index = self._indexes[kind]
+        return [
+            (index.get_place(place_id), count)
+            for place_id, count in heapq.nlargest(
+                k, self.counts[kind].items(),
+                key=lambda item: (item[1], -item[0])
+            )
+        ]
+
+    def to_bytes(self):
+        parts = [_HEADER.pack(_MAGIC, _VERSION, self.documents)]
+        for kind in self.KINDS:
+            place_ids = sorted(
+                place_id for place_id, count in self.counts[kind].items()
+                if count
+            )
+            parts.append(_KIND_HEADER.pack(
+                self._indexes[kind].fingerprint, len(place_ids)
+            ))
+            parts.append(
+                struct.pack('<{}I'.format(len(place_ids)), *place_ids)
+            )
+            parts.append(struct.pack(
+                '<{}Q'.format(len(place_ids)),
+                *[self.counts[kind][place_id] for place_id in place_ids]
+            ))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, geo_text, data):
+        """
+        Aggregator serialized with `to_bytes` by an aggregator of the same
+        model, ValueError otherwise
+        """
+        aggregator = cls(geo_text)
+        try:
+            magic, version, aggregator.documents = _HEADER.unpack_from(data)
+            if (magic, version) != (_MAGIC, _VERSION):
+                raise ValueError(
+                    'Unknown format {!r} version {}'.format(magic, version)
+                )
+            offset = _HEADER.size
+            for kind in cls.KINDS:
+                fingerprint, size = _KIND_HEADER.unpack_from(data, offset)
+                offset += _KIND_HEADER.size
+                if fingerprint != aggregator._indexes[kind].fingerprint:
+                    raise ValueError(
+                        'Aggregator of a different model: {} ids '
+                        'differ'.format(kind)
+                    )
+                place_ids = struct.unpack_from(
+                    '<{}I'.format(size), data, offset
+                )
+                offset += 4 * size
+                counts = struct.unpack_from('<{}Q'.format(size), data, offset)
+                offset += 8 * size
+                aggregator.counts[kind].update(dict(zip(place_ids, counts)))
+        except struct.error as e:
+            raise ValueError('Corrupted aggregator: {}'.format(e))
+        return aggregator
+
+    def __repr__(self):
+        return '{}(documents={}, {})'.format(
+            type(self).__name__, self.documents, ', '.join(
+                '{}={}'.format(kind, len(self.counts[kind]))
+                for kind in self.KINDS
+            )
+        )
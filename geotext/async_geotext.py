@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Non-blocking location extraction for event-driven services
+
+`AsyncGeoText` runs reads in a pool of threads or processes and returns a
+`ReadFuture` right away, so the calling thread (e.g. an event loop) is never
+blocked by a long text. At most `max_pending` reads are in progress at once
+and at most `max_waiting` more wait in a queue until one of them is done.
+Submitting more raises `Full`, so memory usage is bounded. Producers apply
+backpressure without blocking their thread by waiting for the future of
+`wait_for_slot` before submitting more.
+
+All reads share one model: the thread pool uses a single `GeoText` instance
+and process workers inherit it on fork.
+"""
+import cPickle as pickle
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from Queue import Full
+
+import parallel
+from geotext import GeoText
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ReadFuture(object):
+    """
+    Result of a read that may not be done yet
+
+    Mirrors the `concurrent.futures.Future` interface.
+    """
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = list()
+        self._result = None
+        self._exception = None
+
+    def _set(self, result=None, exception=None):
+        with self._lock:
+            self._result = result
+            self._exception = exception
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, list()
+        for callback in callbacks:
+            self._call(callback)
+
+    def _call(self, callback):
+        # Callbacks run in a pool thread, which must go on whatever they do
+        try:
+            callback(self)
+        except Exception:
+            _LOGGER.exception('Exception calling callback for %r', self)
+
+    def done(self):
+        return self._done.is_set()
+
+    def add_done_callback(self, callback):
+        """
+        Call `callback(future)` when the read is done
+
+        The callback runs in a pool thread, so event loop users should
+        schedule their handling in the loop thread from it. Its exceptions
+        are logged and ignored.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
+
+    def exception(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise multiprocessing.TimeoutError()
+        return self._exception
+
+    def result(self, timeout=None):
+        exception = self.exception(timeout)
+        if exception is not None:
+            raise exception
+        return self._result
+
+
+def _run_safely(function, *args):
+    # Pool callbacks are only called on success, so errors are returned
+    try:
+        return True, function(*args)
+    except Exception as e:
+        return False, e
+
+
+def _run_pickled(data):
+    """
+    Process pool task: `_run_safely` with the pickled (function, args) and
+    its pickled result
+
+    Tasks and results are pickled by the caller and the task rather than by
+    the pool, which never calls back if that fails.
+    """
+    try:
+        function, args = pickle.loads(data)
+    except Exception as e:
+        outcome = False, e
+    else:
+        outcome = _run_safely(function, *args)
+    try:
+        return pickle.dumps(outcome, pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        return pickle.dumps((False, pickle.PicklingError(
+            'Can not send the read outcome back: {}'.format(e)
+        )), pickle.HIGHEST_PROTOCOL)
+
+
+class AsyncGeoText(object):
+    """
+    Find locations without blocking the caller
+
+        >>> async_geo_text = AsyncGeoText(workers=4, max_pending=100)
+        >>> future = async_geo_text.aread('Voronezh and NY')
+        >>> future.add_done_callback(lambda f: handle(f.result()))
+
+    Parameters
+    ----------
+    geo_text: GeoText, default None
+        Instance whose model is used for all reads, created with
+        `geo_text_kwargs` if not given
+
+    workers: int, default None
+        Number of pool threads or processes, defaults to the number of CPUs
+
+    use_processes: bool, default False
+        Read in worker processes instead of threads. Threads don't block the
+        caller, but share one CPU core because of the GIL, processes use
+        several cores.
+
+    max_pending: int, default None
+        Max number of reads in progress in the pool, defaults to 4 reads per
+        worker
+
+    max_waiting: int, default None
+        Max number of reads waiting for one in progress to finish, defaults
+        to `max_pending`
+    """
+    def __init__(self, geo_text=None, workers=None, use_processes=False,
+                 max_pending=None, max_waiting=None, **geo_text_kwargs):
+        self.geo_text = geo_text or GeoText(**geo_text_kwargs)
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if max_pending is None:
+            max_pending = 4 * workers
+        self.use_processes = use_processes
+        if use_processes:
+            self._pool = parallel.create_pool(workers, self.geo_text)
+        else:
+            self._pool = ThreadPool(workers)
+        self._max_pending = max_pending
+        if max_waiting is None:
+            max_waiting = max_pending
+        self._max_waiting = max_waiting
+        self._lock = threading.Lock()
+        # Number of reads in the pool
+        self._in_progress = 0
+        # (function, args, future) of the reads waiting for a slot
+        self._waiting = deque()
+        # Futures of `wait_for_slot`
+        self._slot_futures = list()
+
+    def _submit(self, function, args, wait):
+        future = ReadFuture()
+        with self._lock:
+            if self._in_progress < self._max_pending:
+                self._in_progress += 1
+            elif wait and len(self._waiting) < self._max_waiting:
+                self._waiting.append((function, args, future))
+                return future
+            else:
+                raise Full()
+        self._apply(function, args, future)
+        return future
+
+    def _apply(self, function, args, future):
+        """
+        Run the read in the pool, its slot is taken already
+        """
+        def on_done(outcome):
+            if self.use_processes:
+                try:
+                    outcome = pickle.loads(outcome)
+                except Exception as e:
+                    outcome = False, e
+            self._finish(future, outcome)
+
+        try:
+            if self.use_processes:
+                self._pool.apply_async(_run_pickled, (pickle.dumps(
+                    (function, args), pickle.HIGHEST_PROTOCOL
+                ),), callback=on_done)
+            else:
+                self._pool.apply_async(
+                    _run_safely, (function,) + args, callback=on_done
+                )
+        except Exception as e:
+            # E.g. the text can't be pickled or the pool is closed
+            self._finish(future, (False, e))
+
+    def _finish(self, future, outcome):
+        self._release()
+        succeeded, value = outcome
+        if succeeded:
+            future._set(value)
+        else:
+            future._set(exception=value)
+
+    def _release(self):
+        """
+        Pass the slot of a finished read to the next waiting one, or free it
+        """
+        with self._lock:
+            if self._waiting:
+                waiting_read = self._waiting.popleft()
+            else:
+                waiting_read = None
+                self._in_progress -= 1
+                slot_futures, self._slot_futures = self._slot_futures, list()
+        if waiting_read is not None:
+            self._apply(*waiting_read)
+            return
+        for future in slot_futures:
+            future._set()
+
+    def wait_for_slot(self):
+        """
+        Future that is done once a read can start right away, without
+        waiting for others
+
+        Event loop producers wait for it (e.g. with `add_done_callback`)
+        before submitting more texts, instead of blocking the loop.
+        Returns:
+            `ReadFuture` of None
+        """
+        future = ReadFuture()
+        with self._lock:
+            if self._in_progress >= self._max_pending:
+                self._slot_futures.append(future)
+                return future
+        future._set()
+        return future
+
+    def aread(self, text, min_population=0, skip_nationalities=False,
+              matcher=None, wait=True):
+        """
+        Submit `text` for reading, see `GeoText.read` for the parameters
+
+        Never blocks: while `max_pending` reads are in progress, the read
+        waits in a queue for one of them to finish. `Queue.Full` is raised
+        instead if `max_waiting` reads wait already or `wait` is False.
+        Returns:
+            `ReadFuture` of the text `GeoText.Results`
+        """
+        if matcher is None:
+            matcher = self.geo_text.matcher
+        args = (text, min_population, skip_nationalities, matcher)
+        if self.use_processes:
+            return self._submit(parallel._read_text, args, wait)
+        return self._submit(self._read_text, args, wait)
+
+    def aread_many(self, texts, min_population=0, skip_nationalities=False,
+                   matcher=None, wait=True):
+        """
+        Submit a batch of `texts` for reading as a single task
+
+        Returns:
+            `ReadFuture` of a list of `GeoText.Results`, see `read_many`
+        """
+        if matcher is None:
+            matcher = self.geo_text.matcher
+        args = (list(texts), min_population, skip_nationalities, matcher)
+        if self.use_processes:
+            return self._submit(parallel._read_chunk, args, wait)
+        return self._submit(self.geo_text.read_many, args, wait)
+
+    def _read_text(self, text, min_population, skip_nationalities, matcher):
+        return self.geo_text.read_many(
+            [text], min_population, skip_nationalities, matcher
+        )[0]
+
+    def close(self):
+        """
+        Finish the submitted reads and stop the pool
+        """
+        while True:
+            with self._lock:
+                if not self._waiting:
+                    break
+                future = self._waiting[-1][2]
+            # Waiting reads start as the ones before them finish
+            future.exception()
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self):
+        """
+        Stop the pool right away, pending reads are never done
+        """
+        with self._lock:
+            self._waiting.clear()
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Find locations in line-delimited texts or JSONL records
+
+Results are written to stdout as JSON lines, one per input line and in the
+same order. Input is streamed, so memory usage doesn't depend on its size.
+
+    $ geotext tweets.txt --min-population 100000 > locations.jsonl
+    $ cat posts.jsonl | geotext --jsonl --text-field body --workers 16
+"""
+import argparse
+import itertools
+import json
+import sys
+from collections import OrderedDict
+
+from geotext import GeoText
+from parallel import read_parallel, DEFAULT_CHUNK_SIZE
+
+
+def _read_lines(filenames):
+    for filename in filenames:
+        if filename == '-':
+            for line in sys.stdin:
+                yield line
+        else:
+            with open(filename, 'rb') as f:
+                for line in f:
+                    yield line
+
+
+def _decode_lines(lines):
+    for line_num, line in enumerate(lines, 1):
+        try:
+            yield line.decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise SystemExit(
+                'Input line {} is not valid UTF-8: {}'.format(line_num, e)
+            )
+
+
+def _parse_records(lines):
+    for line_num, line in enumerate(lines, 1):
+        try:
+            record = json.loads(line, object_pairs_hook=OrderedDict)
+        except ValueError as e:
+            raise SystemExit(
+                'Invalid JSON on input line {}: {}'.format(line_num, e)
+            )
+        if not isinstance(record, dict):
+            raise SystemExit(
+                'Input line {} is not a JSON object'.format(line_num)
+            )
+        yield record
+
+
+def _get_texts(records, text_field):
+    for line_num, record in enumerate(records, 1):
+        text = record.get(text_field)
+        if text is None:
+            yield ''
+        elif isinstance(text, basestring):
+            yield text
+        else:
+            raise SystemExit(
+                'Field {!r} on input line {} is not a string'.format(
+                    text_field, line_num
+                )
+            )
+
+
+def _serialize_country(country):
+    return OrderedDict((('code', country._key), ('name', country.name)))
+
+
+def _serialize_state(state):
+    return OrderedDict((
+        ('code', state._key), ('name', state.name),
+        ('country', state.country._key if state.country else None),
+    ))
+
+
+def _serialize_city(city):
+    return OrderedDict((
+        ('name', city.name), ('population', city.population),
+        ('state', city.state._key if city.state else None),
+        ('country', city.country._key if city.country else None),
+    ))
+
+
+def serialize_results(geo_text, results):
+    """
+    JSON serializable representation of `GeoText.Results`
+    """
+    def serialize(places, serialize_place):
+        return [
+            serialize_place(place)
+            for place in sorted(places, key=lambda place: place._key)
+        ]
+
+    return OrderedDict((
+        ('countries', serialize(results.countries, _serialize_country)),
+        ('nationalities', serialize(
+            results.nationalities, _serialize_country
+        )),
+        ('states', serialize(results.states, _serialize_state)),
+        ('cities', serialize(results.cities, _serialize_city)),
+        ('spans', [
+            [span.start, span.end, span.kind, span.place._key]
+            for span in results.spans
+        ]),
+        ('country_mentions', [
+            [country._key, count] for country, count in
+            geo_text.get_country_mentions(results).items()
+        ]),
+    ))
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='geotext', description=__doc__.strip().splitlines()[0],
+    )
+    parser.add_argument(
+        'files', nargs='*', default=['-'], metavar='FILE',
+        help='input files, stdin by default or if FILE is -',
+    )
+    parser.add_argument(
+        '--jsonl', action='store_true',
+        help='input lines are JSON objects: read text from --text-field and '
+             'output the object with results in --output-field',
+    )
+    parser.add_argument(
+        '--text-field', default='text',
+        help='JSONL field with the text, records without it are treated as '
+             'empty texts (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--output-field', default='geotext',
+        help='JSONL field to write results to (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--min-population', type=int, default=0,
+        help='ignore places with less population',
+    )
+    parser.add_argument(
+        '--skip-nationalities', action='store_true',
+        help="don't treat nationalities as countries mentions",
+    )
+    parser.add_argument(
+        '--matcher', choices=GeoText.MATCHERS, default=GeoText.MATCHER_NGRAM,
+    )
+    parser.add_argument(
+        '--case-mode', choices=GeoText.CASE_MODES,
+        default=GeoText.CASE_MODE_ANY,
+        help='"strict" searches capitalized words and acronyms only '
+             '(default: %(default)s)',
+    )
+    parser.add_argument(
+        '--cache-size', type=int, default=0,
+        help='number of distinct texts to remember results for in each '
+             'process, useful for inputs with many duplicates '
+             '(default: no cache)',
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='number of worker processes (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+        help='number of lines sent to a worker at once '
+             '(default: %(default)s)',
+    )
+    return parser
+
+
+def main(argv=None, stdout=None):
+    args = get_parser().parse_args(argv)
+    stdout = stdout or sys.stdout
+    lines = _decode_lines(_read_lines(args.files))
+    if args.jsonl:
+        records, text_records = itertools.tee(_parse_records(lines))
+        texts = _get_texts(text_records, args.text_field)
+    else:
+        records = None
+        texts = lines
+
+    # Model is loaded once, by `read_parallel` before it starts the worker
+    # processes, and inherited by them
+    geo_text = GeoText(
+        matcher=args.matcher, cache_size=args.cache_size,
+        case_mode=args.case_mode,
+    )
+    all_results = read_parallel(
+        texts, min_population=args.min_population,
+        skip_nationalities=args.skip_nationalities, workers=args.workers,
+        chunk_size=args.chunk_size, geo_text=geo_text,
+    )
+    if records is None:
+        for results in all_results:
+            json.dump(serialize_results(geo_text, results), stdout)
+            stdout.write('\n')
+    else:
+        for record, results in itertools.izip(records, all_results):
+            record[args.output_field] = serialize_results(geo_text, results)
+            json.dump(record, stdout)
+            stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,153 @@
 # -*- coding: utf-8 -*-
-
+import os
 import re
 from collections import namedtuple, Counter, OrderedDict
+from timeit import default_timer
+
+from instrumentation import ReadStats
+from matrix import CountsMatrixBuilder
 
 from models.candidate import CandidateDB
-from tasks.db_tasks import (
-    create_country_db, create_state_db, create_city_db, create_nationality_db,
-    create_city_abbreviations_db, create_country_abbreviations_db,
+from models.geodb import GeoDB
+from models.trie import TrieCandidateDB
+from models.mapped_place import (
+    open_mapped_model, read_mapped_sources, write_mapped_model,
+)
+from models.result_cache import ResultCache
+from tasks.db_tasks import create_database, create_databases
+from tasks.snapshot_tasks import (
+    iter_model_snapshot, save_model_snapshot, get_sources_hash,
+    SNAPSHOT_FILE, MAPPED_MODEL_FILE, _SNAPSHOT_ERRORS,
 )
-from text_utils import get_words_counts, replace_non_ascii
-
-def load_geotext_model():
-    GeoDB = namedtuple(
-        'GeoDB',
-        'country_db,state_db,city_db,nationality_db,city_abbreviation_db,'
-        'country_abbreviation_db'
-    )
-    country_db = create_country_db(ignore_abbreviations=True)
-    state_db = create_state_db(country_db)
-    city_db = create_city_db(state_db, country_db)
-    nationality_db = create_nationality_db(country_db)
-    city_abbreviation_db = create_city_abbreviations_db(city_db)
-    country_abbreviation_db = create_country_abbreviations_db(country_db)
-
-    db = GeoDB(
-        country_db, state_db, city_db, nationality_db,
-        city_abbreviation_db, country_abbreviation_db
-    )
-    return db
+from tokenizer import tokenize, to_unicode, _split, _transliterate
+from windowed import WindowedReader
+
+
+# Module level, so that results can be pickled
+Results = namedtuple(
+    'Results', 'countries,nationalities,states,cities,spans'
+)
+
+# Databases needed to read with `skip_nationalities`
+_DATABASES_WITHOUT_NATIONALITIES = tuple(
+    name for name in GeoDB._fields if name != 'nationality_db'
+)
+
+# Location mention: `text[start:end]` of the original text is a mention of
+# `place` found in the `kind` field of `Results` (e.g. 'cities')
+Span = namedtuple('Span', 'start,end,text,kind,place')
+
+
+def _get_floor_snapshot_path(snapshot_path, min_population_floor):
+    if not snapshot_path or not min_population_floor:
+        return snapshot_path
+    root, ext = os.path.splitext(snapshot_path)
+    return '{}-{}{}'.format(root, min_population_floor, ext)
+
+
+class _ModelLoader(object):
+    """
+    `GeoDB` loader: reads databases from the model snapshot one by one, or
+    builds them from the data files
+    """
+    def __init__(self, snapshot_path, min_population_floor):
+        self._snapshot_path = snapshot_path
+        self._min_population_floor = min_population_floor
+        # (name, database) pairs left in the snapshot
+        self._snapshot = None
+
+    def __call__(self, geodb, name):
+        if self._snapshot is None and self._snapshot_path:
+            self._snapshot = iter_model_snapshot(
+                self._snapshot_path, self._min_population_floor
+            )
+            if self._snapshot is None:
+                return self._rebuild_snapshot()
+        if self._snapshot is not None:
+            databases = dict()
+            try:
+                for database_name, database in self._snapshot:
+                    databases[database_name] = database
+                    if database_name == name:
+                        return databases
+            except _SNAPSHOT_ERRORS:
+                pass
+            # Truncated or corrupted snapshot: keep the databases read so
+            # far and build the others from the data files
+            self._drop_snapshot()
+            if databases:
+                # `GeoDB` asks for `name` again once it has these
+                return databases
+        return {
+            name: create_database(name, geodb, self._min_population_floor)
+        }
+
+    def _drop_snapshot(self):
+        self._snapshot = None
+        try:
+            # So that the next load rewrites it
+            os.remove(self._snapshot_path)
+        except OSError:
+            pass
+        self._snapshot_path = None
+
+    def _rebuild_snapshot(self):
+        databases = create_databases(self._min_population_floor)
+        try:
+            save_model_snapshot(
+                databases, self._snapshot_path, self._min_population_floor
+            )
+        except (IOError, OSError):
+            # Read-only installation: just don't cache the model
+            pass
+        return dict(zip(GeoDB._fields, databases))
+
+
+def load_geotext_model(snapshot_path=SNAPSHOT_FILE, min_population_floor=0):
+    """
+    Places databases, loaded on first access
+
+    Nothing is read until a database is used. Databases are then loaded one
+    by one from the compiled snapshot at `snapshot_path` if it is up to date
+    with the data files. Otherwise all of them are built from the data files
+    at once and the snapshot is rewritten.
+
+    Args:
+        snapshot_path (str)  compiled snapshot file name or None to build
+            each database from the data files when it's accessed
+        min_population_floor (int)  don't load cities with less population
+            at all. Such models take less memory and are faster to search,
+            but never find smaller cities, whatever `min_population` is
+            passed to `GeoText.read`. Each floor has its own snapshot, named
+            after `snapshot_path`.
+    """
+    return GeoDB(loader=_ModelLoader(
+        _get_floor_snapshot_path(snapshot_path, min_population_floor),
+        min_population_floor,
+    ))
+
+
+def load_mapped_geotext_model(path=MAPPED_MODEL_FILE,
+                              snapshot_path=SNAPSHOT_FILE):
+    """
+    Load read-only places databases backed by a memory-mapped file
+
+    All processes that load the same file share a single physical copy of the
+    places data, so prefer this model for multi-process servers. The file is
+    (re)built from `load_geotext_model` if it's missing or outdated.
+
+    Args:
+        path (str)  memory-mapped model file name
+        snapshot_path (str)  see `load_geotext_model`
+    """
+    sources = get_sources_hash()
+    try:
+        is_outdated = read_mapped_sources(path) != sources
+    except (IOError, EOFError, ValueError):
+        is_outdated = True
+    if is_outdated:
+        write_mapped_model(load_geotext_model(snapshot_path), path, sources)
+    return GeoDB(open_mapped_model(path))
 
 
 class GeoText(object):
@@ -40,187 +160,768 @@ class GeoText(object):
     >>> geo_text = GeoText()
     >>> geo_text.read('London is a great city')
     >>> geo_text.results
-    Results(countries=(), nationalities=(), states=(), cities=(City: London, England, United Kingdom,))
+    Results(countries=(), nationalities=(), states=(),
+            cities=(City: London, England, United Kingdom,),
+            spans=(Span(start=0, end=6, text=u'London', kind='cities',
+                        place=City: London, England, United Kingdom),))
     >>> city = geo_text.results.cities[0]
-    >>> city.__dict__
-    {'_key': 'London',
-     '_search_field': 'london',
-     'country': Country: United Kingdom,
-     'name': 'London',
-     'population': 7556900,
-     'state': State: England, United Kingdom}
+    >>> city.name, city.population, city.state, city.country
+    ('London', 7556900, State: England, United Kingdom,
+     Country: United Kingdom)
 
     >>> GeoText().read('New York, Texas, and also China').get_country_mentions()
     OrderedDict([(Country: United States, 2), (Country: China, 1)])
+
+    Long texts are processed faster by the trie matcher, which gives the same
+    results:
+
+    >>> geo_text = GeoText(matcher=GeoText.MATCHER_TRIE)
+    >>> geo_text.read('...').get_country_mentions()
+
+    Repeated texts (e.g. retweets) are looked up only once with a results
+    cache:
+
+    >>> geo_text = GeoText(cache_size=100000)
+    >>> geo_text.read('London, UK').read('London UK!')
+    >>> geo_text.result_cache
+    ResultCache(size=1, max_size=100000, hits=1, misses=1, evictions=0,
+                hit_rate=0.50)
     """
     LOCATION_REGEX = r"[A-Z]+[a-z]*(?:[ '-][A-Z]+[a-z]*)*"
+    _location_regex = re.compile(LOCATION_REGEX)
 
-    Results = namedtuple('Results', 'countries,nationalities,states,cities')
+    # Look up phrases of any words
+    CASE_MODE_ANY = 'any'
+    # Look up only phrases of capitalized words and acronyms, see
+    # `LOCATION_REGEX`
+    CASE_MODE_STRICT = 'strict'
+    CASE_MODES = (CASE_MODE_ANY, CASE_MODE_STRICT,)
 
-    def __init__(self, database=None, text='',):
-        self.results = GeoText.Results((), (), (), ())
+    # Look up every n-gram of the text
+    MATCHER_NGRAM = 'ngram'
+    # Look up only the n-grams found in the locations trie
+    MATCHER_TRIE = 'trie'
+    MATCHERS = (MATCHER_NGRAM, MATCHER_TRIE,)
+
+    # US states are searched for by their short codes, e.g. "CA", see
+    # `_search_location`
+    US_STATE_PREFIX = GeoDB.US_STATE_PREFIX
+
+    Results = Results
+    Span = Span
+    # `Results` fields indexes
+    _COUNTRIES, _NATIONALITIES, _STATES, _CITIES = range(4)
+
+    # Max number of phrases `read_many` remembers locations for
+    BATCH_CACHE_SIZE = 100000
+
+    # Number of characters of a long text split into words at once, see
+    # `read` with `window_size`
+    DOCUMENT_CHUNK_SIZE = 65536
+    # Max number of words of a streamed text searched at once, see `feed`
+    STREAM_WINDOW_SIZE = 1000
+
+    def __init__(self, database=None, text='', matcher=MATCHER_NGRAM,
+                 cache_size=0, min_population_floor=0, instrument=False,
+                 on_read=None, profiler=None, case_mode=CASE_MODE_ANY):
+        """
+        Args:
+            database (GeoDB or tuple of databases in `GeoDB` fields
+                order)  places databases, `load_geotext_model()` by default
+            text (str)  text to `read` right away
+            matcher (str)  one of `MATCHERS`
+            cache_size (int)  number of texts to remember locations for in
+                `result_cache`, shared by all reads of the instance. Texts
+                are the same if they have the same words after tokenization.
+                No cache if 0.
+            min_population_floor (int)  load the default model without
+                cities with less population, see `load_geotext_model`.
+                Ignored if `database` is given.
+            instrument (bool)  collect timings and counters of all reads
+                in `stats`, see `geotext.instrumentation`
+            on_read (callable)  `on_read(text, stats)` is called after
+                every read with `ReadStats` of that read, implies
+                `instrument`
+            profiler (PeriodicProfiler)  profiler to run reads with
+            case_mode (str)  one of `CASE_MODES`: with `CASE_MODE_STRICT`
+                lowercase words ("of", "nice") are never locations, which
+                makes reading prose faster and more precise, but misses
+                names written in lowercase and the ones with lowercase
+                words inside ("Rio de Janeiro")
+        """
+        self.results = GeoText.Results((), (), (), (), ())
+        # `WindowedReader` of the text being streamed, see `feed`
+        self._stream = None
+        self._stream_params = None
         self.text = text
+        self._check_matcher(matcher)
+        self.matcher = matcher
+        if case_mode not in self.CASE_MODES:
+            raise ValueError(
+                'Unknown case mode {!r}, use one of: {}'.format(
+                    case_mode, ', '.join(self.CASE_MODES)
+                )
+            )
+        self.case_mode = case_mode
         if database:
+            if not isinstance(database, GeoDB):
+                database = GeoDB(database)
             self._geodb = database
         else:
-            self._geodb = load_geotext_model()
-        self._max_location_length = self._get_locations_length()[0]
+            self._geodb = load_geotext_model(
+                min_population_floor=min_population_floor
+            )
+        self.result_cache = ResultCache(cache_size) if cache_size else None
+        self.stats = ReadStats() if instrument or on_read else None
+        self.on_read = on_read
+        self.profiler = profiler
         if text:
             self.read(text)
 
-    def _get_locations_length(self):
-        words_counts = set()
-        for collection in self._geodb:
-            words_counts |= get_words_counts(
-                [place._search_field for place in collection.all()]
+    @property
+    def results(self):
+        if self._results is None:
+            # Built on access, so feeding a stream costs nothing per
+            # location found before
+            self._results = self._get_reader_results(self._stream)
+        return self._results
+
+    @results.setter
+    def results(self, results):
+        self._results = results
+
+    @property
+    def model(self):
+        """
+        `GeoDB` the places are searched in
+        """
+        return self._geodb
+
+    def swap_model(self, model):
+        """
+        Search places in another model from now on, e.g. the one
+        `apply_delta` returns
+
+        Reads in progress are never blocked: each read (a text of
+        `read_many`, a streamed text) finishes with the model it started
+        with. Lookup structures the reads have used so far are compiled for
+        the new model before the swap, so the next reads don't wait for
+        them either.
+        Args:
+            model (GeoDB or tuple of databases in `GeoDB` fields order)
+        Returns:
+            the previous model
+        """
+        if not isinstance(model, GeoDB):
+            model = GeoDB(model)
+        model.compile_like(self._geodb)
+        previous_model, self._geodb = self._geodb, model
+        if self.result_cache is not None:
+            # Results of the previous model are never looked up again
+            self.result_cache.clear()
+        return previous_model
+
+    def prepare(self, matcher=None, skip_nationalities=False):
+        """
+        Load the databases reads with these params search and compile the
+        lookup structures they use, which are otherwise loaded on the first
+        read
+
+        Worker processes forked afterwards share them instead of each
+        loading its own copy.
+        Args:
+            matcher (str)  one of `MATCHERS`, the instance one by default
+            skip_nationalities (bool)  see `read`
+        Returns:
+            self
+        """
+        if matcher is None:
+            matcher = self.matcher
+        self._check_matcher(matcher)
+        databases = self._get_search_databases(skip_nationalities)
+        geodb = self._geodb.load(databases)
+        geodb.get_max_location_length(databases)
+        geodb.get_surface_forms(databases)
+        if matcher == self.MATCHER_TRIE:
+            geodb.get_trie(databases)
+        return self
+
+    @classmethod
+    def _check_matcher(cls, matcher):
+        if matcher not in cls.MATCHERS:
+            raise ValueError(
+                'Unknown matcher {!r}, use one of: {}'.format(
+                    matcher, ', '.join(cls.MATCHERS)
+                )
             )
-        return sorted(words_counts, reverse=True)
 
-    def _get_candidates(self, text):
-        text = replace_non_ascii(text)
-        # Remove dots from acronyms:
-        text = re.sub(r'\.(?![a-z]{2})', '', text, flags=re.IGNORECASE)
-        # Replace other symbols with spaces
-        # TODO: improve this, since DB has unicode symbols in cities
-        text = re.sub(r'[^\w]+', ' ', text).strip()
+    @staticmethod
+    def _get_search_databases(skip_nationalities):
+        """
+        Names of the databases `_search_location` looks places up in
+        """
+        if skip_nationalities:
+            return _DATABASES_WITHOUT_NATIONALITIES
+        return GeoDB._fields
 
+    def _get_candidate_db(self, words, matcher=MATCHER_NGRAM,
+                          skip_nationalities=False, geodb=None):
+        # TODO: improve tokenization, since DB has unicode symbols in cities
+        if geodb is None:
+            geodb = self._geodb
+        text = ' '.join(words)
+        databases = self._get_search_databases(skip_nationalities)
+        max_location_length = geodb.get_max_location_length(databases)
+        if self.case_mode == self.CASE_MODE_STRICT:
+            segments = self._get_capitalized_segments(words)
+        else:
+            segments = None
+        if matcher == self.MATCHER_TRIE:
+            return TrieCandidateDB(
+                text, geodb.get_trie(databases),
+                max_phrase_len=max_location_length, words=words,
+                segments=segments,
+            )
         return CandidateDB(
-            text, max_phrase_len=self._max_location_length
-        ).get_candidates()
+            text, max_phrase_len=max_location_length, words=words,
+            segments=segments,
+        )
 
-    def read(self, text, min_population=0, skip_nationalities=False):
-        self.text = text
-        candidates = self._get_candidates(text)
-        (
-            countries, nationalities, states, cities,
-        ) = self._get_locations_from_candidates(
-            candidates, min_population, skip_nationalities
+    @classmethod
+    def _get_capitalized_segments(cls, words):
+        """
+        (start, end) words indexes of runs of words matching
+        `LOCATION_REGEX`: capitalized words and acronyms
+        """
+        segments = list()
+        segment_start = None
+        match = cls._location_regex.match
+        for position, word in enumerate(words):
+            word_match = match(word)
+            if word_match is not None and word_match.end() == len(word):
+                if segment_start is None:
+                    segment_start = position
+            elif segment_start is not None:
+                segments.append((segment_start, position))
+                segment_start = None
+        if segment_start is not None:
+            segments.append((segment_start, len(words)))
+        return segments
+
+    def _extract(self, text, min_population, skip_nationalities, matcher,
+                 locations_cache=None, window_size=None, geodb=None):
+        if geodb is None:
+            # The whole read uses the model it started with, whatever
+            # `swap_model` does meanwhile
+            geodb = self._geodb
+        if self.stats is None and self.profiler is None:
+            return self._extract_locations(
+                text, min_population, skip_nationalities, matcher,
+                locations_cache, window_size=window_size, geodb=geodb
+            )
+        stats = ReadStats() if self.stats is not None else None
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            results = self._extract_locations(
+                text, min_population, skip_nationalities, matcher,
+                locations_cache, stats, window_size, geodb
+            )
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+        if stats is not None:
+            stats.reads = 1
+            self.stats.merge(stats)
+            if self.on_read is not None:
+                self.on_read(text, stats)
+        return results
+
+    def _extract_locations(self, text, min_population, skip_nationalities,
+                           matcher, locations_cache=None, stats=None,
+                           window_size=None, geodb=None):
+        if geodb is None:
+            geodb = self._geodb
+        text = to_unicode(text)
+        if window_size:
+            return self._extract_windowed(
+                text, min_population, skip_nationalities, matcher,
+                window_size, stats, geodb
+            )
+        if stats is None:
+            tokens = tokenize(text)
+        else:
+            started = default_timer()
+            transliterated = _transliterate(text)
+            started = stats.add_time('transliterate', started)
+            tokens = _split(*transliterated)
+            stats.add_time('tokenize', started)
+            stats.tokens = len(tokens)
+        words = [token.text for token in tokens]
+        result_cache = self.result_cache
+        cached = None
+        if result_cache is not None:
+            # Matches are kept in words indexes, so they're valid for any
+            # text with the same words. Results of reads that started before
+            # `swap_model` are kept under the old model and never found.
+            cache_key = (
+                ' '.join(words), min_population, skip_nationalities, geodb
+            )
+            cached = result_cache.get(cache_key)
+        if cached is None:
+            if stats is not None:
+                started = default_timer()
+            candidate_db = self._get_candidate_db(
+                words, matcher, skip_nationalities, geodb
+            )
+            locations, matches = self._get_locations_from_candidates(
+                candidate_db.get_candidates(), min_population,
+                skip_nationalities, locations_cache, stats, geodb
+            )
+            matches.sort(key=lambda match: match[:2])
+            if stats is not None:
+                # Candidates generation is interleaved with the lookups
+                stats.add_time('candidates', started)
+                stats.timings['candidates'] -= (
+                    stats.timings['lookup'] + stats.timings['mark_as_location']
+                )
+                stats.suppressed_candidates = candidate_db.suppressed_count
+            if result_cache is not None:
+                result_cache.put(cache_key, (locations, tuple(matches)))
+        else:
+            locations, matches = cached
+            if stats is not None:
+                stats.result_cache_hits = 1
+        if stats is not None:
+            started = default_timer()
+        spans = list()
+        for start, end, field_idx, place in matches:
+            span_start, span_end = tokens[start].start, tokens[end - 1].end
+            spans.append(Span(
+                span_start, span_end, text[span_start:span_end],
+                Results._fields[field_idx], place,
+            ))
+        if stats is not None:
+            stats.add_time('spans', started)
+        return GeoText.Results(*(locations + (tuple(spans),)))
+
+    def _extract_windowed(self, text, min_population, skip_nationalities,
+                          matcher, window_size, stats=None, geodb=None):
+        """
+        `_extract_locations` keeping only `window_size` words at a time
+        """
+        reader = WindowedReader(
+            self, min_population, skip_nationalities, matcher, window_size,
+            geodb=geodb
         )
-        self.results = GeoText.Results(
-            countries, nationalities, states, cities
+        for start in range(0, len(text), self.DOCUMENT_CHUNK_SIZE):
+            reader.feed(text[start:start + self.DOCUMENT_CHUNK_SIZE])
+        reader.finish()
+        if stats is not None:
+            stats.tokens = reader.tokens_count
+            for mention in reader.mentions:
+                stats.hits_by_field[Results._fields[mention[3]]] += 1
+        return self._get_reader_results(reader)
+
+    @staticmethod
+    def _get_reader_results(reader):
+        """
+        `Results` of the locations `WindowedReader` found so far
+        """
+        return GeoText.Results(*(
+            tuple(tuple(places) for places in reader.locations) + (tuple(
+                Span(start, end, text, Results._fields[field_idx], place)
+                for start, end, text, field_idx, place in reader.mentions
+            ),)
+        ))
+
+    def read(self, text, min_population=0, skip_nationalities=False,
+             matcher=None, window_size=None):
+        """
+        Find locations mentioned in `text`
+
+        Args:
+            text (str)  text to search for locations mentions
+            min_population (int)  ignore places with less population
+            skip_nationalities (bool)  don't treat nationalities as countries
+                mentions
+            matcher (str)  one of `MATCHERS` to use instead of the one given
+                to the constructor
+            window_size (int)  search long texts in windows of this many
+                words, so the memory used doesn't grow with the text length.
+                Results are the same as without windows, but
+                `result_cache` isn't used and only words counts and found
+                locations are counted in `stats`. See `WindowedReader`.
+        """
+        if matcher is None:
+            matcher = self.matcher
+        self._check_matcher(matcher)
+        self._stream = None
+        self.text = text
+        self.results = self._extract(
+            text, min_population, skip_nationalities, matcher,
+            window_size=window_size
         )
         return self
 
-    def get_country_mentions(self):
+    def feed(self, chunk, min_population=0, skip_nationalities=False,
+             matcher=None):
+        """
+        Find locations mentioned in the next piece of a streamed text
+
+        `results` has the locations found so far and is updated with every
+        piece, only the last words that may still be a part of a longer
+        location are searched when more text comes. Every word is searched
+        a constant number of times, however small the pieces are. The text
+        isn't kept in `text`, and streams aren't counted in `stats`.
+
+            >>> geo_text = GeoText()
+            >>> for chunk in transcript:
+            ...     geo_text.feed(chunk).get_country_mentions()
+            >>> geo_text.finalize().get_country_mentions()
+
+        Args:
+            chunk (str)  next piece of the text
+            min_population, skip_nationalities, matcher  see `read`, must
+                be the same for all pieces of a text
+        """
+        if matcher is None:
+            matcher = self.matcher
+        params = (min_population, skip_nationalities, matcher)
+        if self._stream is None:
+            self._check_matcher(matcher)
+            self._stream = WindowedReader(
+                self, min_population, skip_nationalities, matcher,
+                self.STREAM_WINDOW_SIZE, incremental=True
+            )
+            self._stream_params = params
+            self.text = None
+        elif params != self._stream_params:
+            raise ValueError(
+                'Search params changed in the middle of a text: {!r}, '
+                'expected {!r}'.format(params, self._stream_params)
+            )
+        self._stream.feed(chunk)
+        self.results = None
+        return self
+
+    def finalize(self):
+        """
+        Find locations in the rest of the text given to `feed`, so the next
+        `feed` starts a new text
+        """
+        if self._stream is not None:
+            self._stream.finish()
+            self.results = self._get_reader_results(self._stream)
+            self._stream = None
+        return self
+
+    def iter_read_many(self, texts, min_population=0,
+                       skip_nationalities=False, matcher=None):
+        """
+        Find locations mentioned in each of the `texts`
+
+        Same as calling `read` for every text, but locations found by the
+        same phrase are looked up only once per batch. `results` and `text`
+        attributes of the instance are not changed.
+
+        Returns:
+            generator of `Results` for each text, in the same order
+        """
+        if matcher is None:
+            matcher = self.matcher
+        self._check_matcher(matcher)
+        locations_cache = dict()
+        geodb = None
+        for text in texts:
+            if (
+                len(locations_cache) > self.BATCH_CACHE_SIZE or
+                geodb is not self._geodb
+            ):
+                # Texts after `swap_model` are read with the new model
+                locations_cache.clear()
+                geodb = self._geodb
+            yield self._extract(
+                text, min_population, skip_nationalities, matcher,
+                locations_cache, geodb=geodb
+            )
+
+    def read_many(self, texts, min_population=0, skip_nationalities=False,
+                  matcher=None):
+        """
+        List of `Results` for each of the `texts`, see `iter_read_many`
+        """
+        return list(self.iter_read_many(
+            texts, min_population, skip_nationalities, matcher
+        ))
+
+    def get_country_mentions(self, results=None):
+        """
+        Countries mentioned in the text with mentions counts
+
+        A city mention counts as a mention of its country, so does a state
+        mention unless it's the state of a mentioned city. Countries mentioned
+        by name or by nationality count only if none of their cities or
+        states are mentioned.
+        Args:
+            results (Results)  results to count mentions in instead of the
+                last `read` results, e.g. returned by `read_many`
+        """
+        if results is None:
+            results = self.results
+        return OrderedDict(
+            Counter(self._iter_country_mentions(results)).most_common()
+        )
+
+    @staticmethod
+    def _iter_country_mentions(results):
+        """
+        Country of each mention counted by `get_country_mentions`
+        """
         states_to_ignore = set()
         countries_to_ignore = set()
-        country_mentions = []
-        for city in self.results.cities:
-            country_mentions.append(city.country)
+        for city in results.cities:
+            yield city.country
             if city.state:
                 states_to_ignore.add(city.state)
             countries_to_ignore.add(city.country)
-        for state in self.results.states:
+        for state in results.states:
             if state in states_to_ignore:
                 continue
-            country_mentions.append(state.country)
+            yield state.country
             countries_to_ignore.add(state.country)
-        for country in self.results.countries:
+        for country in results.countries:
             if country in countries_to_ignore:
                 continue
-            country_mentions.append(country)
-        for nationality in self.results.nationalities:
+            yield country
+        for nationality in results.nationalities:
             if nationality in countries_to_ignore:
                 continue
-            country_mentions.append(nationality)
-        return OrderedDict(
-            Counter(country_mentions).most_common()
+            yield nationality
+
+    def get_country_index(self):
+        """
+        `PlaceIndex` giving every country of the model a stable integer id:
+        columns of `get_country_matrix`
+        """
+        return self._geodb.get_place_index('country_db')
+
+    def get_country_matrix(self, results, sparse=True):
+        """
+        Countries mentions counts of many documents as a matrix
+
+        Rows are documents and columns are countries of `get_country_index`,
+        counts are the same as `get_country_mentions` gives. Requires NumPy
+        (and SciPy for sparse matrices).
+
+            >>> matrix = geo_text.get_country_matrix(
+            ...     geo_text.iter_read_many(texts)
+            ... )
+            >>> mentions_per_country = matrix.sum(axis=0)
+            >>> documents_per_country = (matrix > 0).sum(axis=0)
+
+        Args:
+            results (iterable of Results)  results of each document, e.g.
+                `iter_read_many` of the texts
+            sparse (bool)  return `scipy.sparse.csr_matrix`, a dense
+                `numpy.ndarray` otherwise
+        """
+        index = self.get_country_index()
+        builder = CountsMatrixBuilder(len(index), sparse)
+        for document_results in results:
+            counts = dict()
+            for country in self._iter_country_mentions(document_results):
+                country_id = index.get_id(country)
+                counts[country_id] = counts.get(country_id, 0) + 1
+            builder.add_row(counts)
+        return builder.build()
+
+    def _search_location(self, text, min_population, skip_nationalities,
+                         geodb=None):
+        """
+        Find the location the text stands for
+
+        Used for memory-mapped models, in-memory ones are searched with the
+        `SurfaceFormTable` compiled from the same steps.
+
+        Returns:
+            (index of the `Results` field, place) or None if not found
+        """
+        if geodb is None:
+            geodb = self._geodb
+        # We apply the following priorities:
+        # 1) Cities abbreviations: NYC or LA (since e.g. LA usually
+        #    means Los Angeles, not Louisiana)
+        # 2) US short states names: "CA" (California)
+        # 3) Countries + country codes: "GB", "RU"
+        # 4) Nationalities (treated as countries found)
+        # 5) Countries abbreviations: other shortcuts, like "USA" or "UK"
+        # 6) Cities
+        # 7) Full text state names: "Texas"
+
+        # 1
+        city_abbrev_match = geodb.city_abbreviation_db.search(text)
+        if (
+            city_abbrev_match and
+            city_abbrev_match.place.population >= min_population
+        ):
+            return self._CITIES, city_abbrev_match.place
+
+        # 2
+        state_match = geodb.state_db.search(
+            self.US_STATE_PREFIX + text
         )
+        if (
+            state_match and
+            state_match.country.population >= min_population
+        ):
+            return self._STATES, state_match
 
-    def _get_locations_from_candidates(
-        self, candidates, min_population, skip_nationalities
-    ):
-        countries, nationalities, states, cities = set(), set(), set(), set()
-        for candidate in candidates:
-            # When iterating over the candidates we apply the following
-            # priorities:
-            # 1) Cities abbreviations: NYC or LA (since e.g. LA usually
-            #    means Los Angeles, not Louisiana)
-            # 2) US short states names: "CA" (California)
-            # 3) Countries + country codes: "GB", "RU"
-            # 4) Nationalities (treated as countries found)
-            # 5) Countries abbreviations: other shortcuts, like "USA" or "UK"
-            # 6) Cities
-            # 7) Full text state names: "Texas"
-
-            # 1
-            city_abbrev_match = self._geodb.city_abbreviation_db.search(
-                candidate.text
-            )
-            if (
-                city_abbrev_match and
-                city_abbrev_match.place.population >= min_population
-            ):
-                    cities.add(city_abbrev_match.place)
-                    candidate.mark_as_location()
-                    continue
+        # 3
+        country_match = (
+            geodb.country_db.search(text) or
+            geodb.country_db.search(text.lower())
+        )
+        if country_match and country_match.population >= min_population:
+            return self._COUNTRIES, country_match
 
-            # 2
-            state_match = (
-                self._geodb.state_db.search('US.{}'.format(candidate.text))
+        # 4
+        if not skip_nationalities:
+            nationality_match = geodb.nationality_db.search(
+                text.lower()
             )
             if (
-                state_match and
-                state_match.country.population >= min_population
+                nationality_match and
+                nationality_match.place.population >= min_population
             ):
-                states.add(state_match)
-                candidate.mark_as_location()
-                continue
+                return self._NATIONALITIES, nationality_match.place
 
-            # 3
-            country_match = (
-                self._geodb.country_db.search(candidate.text) or
-                self._geodb.country_db.search(candidate.text.lower())
-            )
-            if country_match and country_match.population >= min_population:
-                countries.add(country_match)
-                candidate.mark_as_location()
-                continue
+        # 5
+        country_abbrev_match = geodb.country_abbreviation_db.search(
+            text
+        )
+        if (
+            country_abbrev_match and
+            country_abbrev_match.place.population >= min_population
+        ):
+            return self._COUNTRIES, country_abbrev_match.place
 
-            # 4
-            if not skip_nationalities:
-                nationality_match = self._geodb.nationality_db.search(
-                    candidate.text.lower()
-                )
-                if (
-                    nationality_match and
-                    nationality_match.place.population >= min_population
-                ):
-                    nationalities.add(nationality_match.place)
-                    candidate.mark_as_location()
-                    continue
-
-            # 5
-            country_abbrev_match = self._geodb.country_abbreviation_db.search(
-                candidate.text
-            )
-            if (
-                country_abbrev_match and
-                country_abbrev_match.place.population >= min_population
-            ):
-                countries.add(country_abbrev_match.place)
-                candidate.mark_as_location()
-                continue
+        # 6
+        city_match = geodb.city_db.search(text.lower())
+        if city_match and city_match.population >= min_population:
+            return self._CITIES, city_match
 
-            # 6
-            city_match = self._geodb.city_db.search(candidate.text.lower())
-            if city_match and city_match.population >= min_population:
-                cities.add(city_match)
-                candidate.mark_as_location()
-                continue
+        # 7
+        state_match = geodb.state_db.search(
+            self.US_STATE_PREFIX + text.lower()
+        )
+        if (
+            state_match and
+            state_match.country.population >= min_population
+        ):
+            return self._STATES, state_match
+        return None
 
-            # 7
-            state_match = (
-                self._geodb.state_db.search('US.{}'.format(candidate.text.lower()))
+    def _get_locations_from_candidates(
+        self, candidates, min_population, skip_nationalities,
+        locations_cache=None, stats=None, geodb=None
+    ):
+        """
+        Args:
+            locations_cache (dict)  candidate text -> `_search_location`
+                result cache to share between calls with the same params,
+                not used if the model has a `SurfaceFormTable`, which is
+                as fast as the cache
+            stats (ReadStats)  read stats to count lookups and hits in
+            geodb (GeoDB)  model to search, the current one by default
+        Returns:
+            tuple of places tuples for each `Results` field,
+            list of (candidate start, candidate end, `Results` field index,
+            place) for each found location
+        """
+        if geodb is None:
+            geodb = self._geodb
+        surface_forms = geodb.get_surface_forms(
+            self._get_search_databases(skip_nationalities)
+        )
+        locations = (set(), set(), set(), set())
+        matches = list()
+        if stats is not None:
+            return self._get_locations_with_stats(
+                candidates, min_population, skip_nationalities,
+                locations_cache, stats, surface_forms, geodb
             )
-            if (
-                state_match and
-                state_match.country.population >= min_population
-            ):
-                states.add(state_match)
+        for candidate in candidates:
+            if surface_forms is not None:
+                location = surface_forms.lookup(candidate.text, min_population)
+            elif locations_cache is None:
+                location = self._search_location(
+                    candidate.text, min_population, skip_nationalities, geodb
+                )
+            else:
+                try:
+                    location = locations_cache[candidate.text]
+                except KeyError:
+                    location = locations_cache[candidate.text] = (
+                        self._search_location(
+                            candidate.text, min_population,
+                            skip_nationalities, geodb,
+                        )
+                    )
+            if location:
+                locations[location[0]].add(location[1])
+                matches.append(
+                    (candidate.start, candidate.end) + location
+                )
                 candidate.mark_as_location()
-                continue
-        return (
-            tuple(countries), tuple(nationalities), tuple(states),
-            tuple(cities),
-        )
+        return tuple(tuple(places) for places in locations), matches
+
+    def _get_locations_with_stats(
+        self, candidates, min_population, skip_nationalities,
+        locations_cache, stats, surface_forms, geodb
+    ):
+        """
+        `_get_locations_from_candidates` counting and timing the lookups
+        """
+        locations = (set(), set(), set(), set())
+        matches = list()
+        for candidate in candidates:
+            stats.candidates += 1
+            started = default_timer()
+            step_name = None
+            if surface_forms is not None:
+                stats.lookups += 1
+                location = surface_forms.lookup(
+                    candidate.text, min_population, return_step=True
+                )
+                if location:
+                    step_name = location[2]
+                    location = location[:2]
+            elif locations_cache is None:
+                stats.lookups += 1
+                location = self._search_location(
+                    candidate.text, min_population, skip_nationalities, geodb
+                )
+            else:
+                try:
+                    location = locations_cache[candidate.text]
+                except KeyError:
+                    stats.lookups += 1
+                    location = locations_cache[candidate.text] = (
+                        self._search_location(
+                            candidate.text, min_population,
+                            skip_nationalities, geodb,
+                        )
+                    )
+            started = stats.add_time('lookup', started)
+            if location:
+                locations[location[0]].add(location[1])
+                matches.append(
+                    (candidate.start, candidate.end) + location
+                )
+                candidate.mark_as_location()
+                stats.add_time('mark_as_location', started)
+                stats.hits_by_field[Results._fields[location[0]]] += 1
+                if step_name is not None:
+                    stats.hits_by_step[step_name] += 1
+        return tuple(tuple(places) for places in locations), matches
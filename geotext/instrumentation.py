@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in timings and counters of `GeoText` reads
+
+    >>> geo_text = GeoText(instrument=True)
+    >>> geo_text.read_many(texts)
+    >>> geo_text.stats
+    ReadStats(reads=2, tokens=8, candidates=27, ..., total_time=0.000871s)
+    >>> geo_text.stats.timings
+    OrderedDict([('transliterate', 1.1e-05), ('tokenize', 2.6e-05), ...])
+
+Slow reads can be caught with a callback getting the stats of each read:
+
+    >>> def on_read(text, stats):
+    ...     if stats.total_time > 0.1:
+    ...         log.warning('Slow read: %r', stats)
+    >>> geo_text = GeoText(on_read=on_read)
+
+Reads of an instance created without them pay nothing for instrumentation.
+"""
+import cProfile
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from timeit import default_timer
+
+# Read stages in the order they run
+STAGES = (
+    # Converting the text to ASCII
+    'transliterate',
+    # Splitting the ASCII text into words
+    'tokenize',
+    # Generating phrases to look up and skipping the ones inside locations
+    'candidates',
+    # Looking the phrases up in places databases
+    'lookup',
+    # Marking found locations, so the phrases inside them are skipped
+    'mark_as_location',
+    # Mapping found locations to the text
+    'spans',
+)
+
+
+def get_peak_rss_mb(children=False):
+    """
+    Peak resident memory in MB of this process, or of its largest
+    terminated child process if `children`
+    """
+    # Not available on Windows, and only tools need it
+    import resource
+    peak_rss = resource.getrusage(
+        resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    ).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if sys.platform == 'darwin':
+        peak_rss /= 1024.0
+    return peak_rss / 1024.0
+
+
+class ReadStats(object):
+    """
+    Timings (in seconds) and counters of one or several reads
+
+    Stats of several reads are summed up with `merge`, which is safe to call
+    from several threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.reads = 0
+        # Reads answered by `GeoText.result_cache`
+        self.result_cache_hits = 0
+        self.tokens = 0
+        # Phrases looked up
+        self.candidates = 0
+        # Phrases skipped since they are parts of a found location
+        self.suppressed_candidates = 0
+        # Lookups that didn't hit the `read_many` batch cache
+        self.lookups = 0
+        # Found locations by `Results` field, e.g. 'cities'
+        self.hits_by_field = Counter()
+        # Found locations by the priority step that found them (see
+        # `geotext.models.surface_forms.CASCADE`), e.g. '6:city_db'. Only
+        # counted for in-memory models.
+        self.hits_by_step = Counter()
+        self.timings = OrderedDict((stage, 0.0) for stage in STAGES)
+
+    def add_time(self, stage, started):
+        """
+        Add the time since `started` to `stage`
+
+        Returns:
+            current timer value, to be used as the start of the next stage
+        """
+        now = default_timer()
+        self.timings[stage] += now - started
+        return now
+
+    @property
+    def total_time(self):
+        return sum(self.timings.values())
+
+    def merge(self, other):
+        with self._lock:
+            self.reads += other.reads
+            self.result_cache_hits += other.result_cache_hits
+            self.tokens += other.tokens
+            self.candidates += other.candidates
+            self.suppressed_candidates += other.suppressed_candidates
+            self.lookups += other.lookups
+            self.hits_by_field.update(other.hits_by_field)
+            self.hits_by_step.update(other.hits_by_step)
+            for stage, timing in other.timings.items():
+                self.timings[stage] += timing
+
+    def as_dict(self):
+        """
+        JSON serializable stats
+        """
+        return OrderedDict((
+            ('reads', self.reads),
+            ('result_cache_hits', self.result_cache_hits),
+            ('tokens', self.tokens),
+            ('candidates', self.candidates),
+            ('suppressed_candidates', self.suppressed_candidates),
+            ('lookups', self.lookups),
+            ('hits_by_field', dict(self.hits_by_field)),
+            ('hits_by_step', dict(self.hits_by_step)),
+            ('timings', OrderedDict(self.timings)),
+            ('total_time', self.total_time),
+        ))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            '{}(reads={}, tokens={}, candidates={}, suppressed_candidates={}, '
+            'lookups={}, hits={}, total_time={:.6f}s)'.format(
+                type(self).__name__, self.reads, self.tokens,
+                self.candidates, self.suppressed_candidates, self.lookups,
+                sum(self.hits_by_field.values()), self.total_time,
+            )
+        )
+
+
+class PeriodicProfiler(object):
+    """
+    Profile reads with cProfile and dump the profile every `interval` seconds
+
+        >>> profiler = PeriodicProfiler('/tmp/geotext-{}.prof')
+        >>> geo_text = GeoText(profiler=profiler)
+
+    Every dump covers the reads since the previous one and is written to
+    `path` formatted with the dump number. Dumps are readable by `pstats`,
+    snakeviz, etc. Only reads of the thread that runs them are profiled, so
+    give each thread its own `GeoText` with a profiler.
+
+    Args:
+        path (str)  dump file name template, e.g. '/tmp/geotext-{}.prof'
+        interval (float)  seconds between dumps
+    """
+    def __init__(self, path, interval=60.0):
+        self.path = path
+        self.interval = interval
+        self.dumps_count = 0
+        self._profile = cProfile.Profile()
+        self._dumped_at = time.time()
+
+    def enable(self):
+        self._profile.enable()
+
+    def disable(self):
+        self._profile.disable()
+        if time.time() - self._dumped_at >= self.interval:
+            self.dump()
+
+    def dump(self):
+        """
+        Write the profile of the reads since the previous dump
+
+        Returns:
+            dump file name
+        """
+        path = self.path.format(self.dumps_count)
+        self._profile.dump_stats(path)
+        self._profile = cProfile.Profile()
+        self._dumped_at = time.time()
+        self.dumps_count += 1
+        return path
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Mentions counts of many documents as a NumPy array or a SciPy sparse matrix
+
+NumPy and SciPy are optional, install them with `pip install geotext[matrix]`.
+Rows are collected in compact arrays and converted only in `build`, so a
+matrix of millions of documents costs a few bytes per mention until then.
+"""
+from array import array
+
+_INSTALL_HINT = (
+    '{} is required for mentions matrices: pip install geotext[matrix]'
+)
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(_INSTALL_HINT.format('NumPy'))
+    return numpy
+
+
+def _import_csr_matrix():
+    try:
+        from scipy.sparse import csr_matrix
+    except ImportError:
+        raise ImportError(_INSTALL_HINT.format('SciPy'))
+    return csr_matrix
+
+
+class CountsMatrixBuilder(object):
+    """
+    Documents x columns counts matrix built row by row
+
+        >>> builder = CountsMatrixBuilder(columns_count=3, sparse=False)
+        >>> builder.add_row({0: 2, 2: 1})
+        >>> builder.add_row({})
+        >>> builder.build()
+        array([[2, 0, 1],
+               [0, 0, 0]], dtype=int32)
+
+    Args:
+        columns_count (int)  number of columns, e.g. `len(place_index)`
+        sparse (bool)  build `scipy.sparse.csr_matrix`, `numpy.ndarray`
+            otherwise
+    """
+    def __init__(self, columns_count, sparse=True):
+        # Fail before the rows are collected
+        self._numpy = _import_numpy()
+        self._csr_matrix = _import_csr_matrix() if sparse else None
+        self.columns_count = columns_count
+        # Compressed sparse rows: columns and counts of row i are at
+        # [_indptr[i], _indptr[i + 1]) of `_indices` and `_counts`
+        self._indptr = array('i', [0])
+        self._indices = array('i')
+        self._counts = array('i')
+
+    @property
+    def rows_count(self):
+        return len(self._indptr) - 1
+
+    def add_row(self, counts):
+        """
+        Args:
+            counts (dict)  column -> count, columns not in it are 0
+        """
+        for column in sorted(counts):
+            self._indices.append(column)
+            self._counts.append(counts[column])
+        self._indptr.append(len(self._indices))
+
+    def build(self):
+        """
+        Returns:
+            `scipy.sparse.csr_matrix` or `numpy.ndarray` of int32 counts
+        """
+        numpy = self._numpy
+        shape = (self.rows_count, self.columns_count)
+        indptr = numpy.frombuffer(self._indptr, dtype=numpy.intc)
+        indices = numpy.frombuffer(self._indices, dtype=numpy.intc)
+        counts = numpy.frombuffer(self._counts, dtype=numpy.intc)
+        if self._csr_matrix is not None:
+            return self._csr_matrix(
+                (counts.copy(), indices.copy(), indptr.copy()), shape=shape
+            )
+        matrix = numpy.zeros(shape, dtype=numpy.int32)
+        rows = numpy.repeat(numpy.arange(shape[0]), numpy.diff(indptr))
+        matrix[rows, indices] = counts
+        return matrix
@@ -4,71 +4,94 @@
 class Candidate(object):
     """
     Location candidate to review and search location DB for
+
+    Candidate is a phrase of the text: its words from `start` (inclusive) to
+    `end` (exclusive).
     """
-    def __init__(self, text):
+    def __init__(self, text, start, end, candidate_db):
         self.text = text
-        self.parents = set()
-        self.children = set()
+        self.start = start
+        self.end = end
+        self._candidate_db = candidate_db
         # Whether this candidate is a valid location
         self.is_location = False
-        # Whether any of candidate parent and their parents and so on is
-        # a valid location
-        self.has_parent_location = False
-
-    def add_parent(self, parent):
-        self.parents.add(parent)
-        parent.children.add(self)
-
-    def get_all_children(self):
-        result = self.children.copy()
-        for child in self.children:
-            result |= child.get_all_children()
-        return result
 
     def mark_as_location(self):
         self.is_location = True
-        for child in self.get_all_children():
-            child.has_parent_location = True
+        self._candidate_db.mark_as_location(self.start, self.end)
 
     def __repr__(self):
         return '{}: "{}"'.format(type(self).__name__, self.text)
 
 
 class CandidateDB(object):
-    def __init__(self, text, max_phrase_len=0):
+    def __init__(self, text, max_phrase_len=0, words=None, segments=None):
         """
-        Build candidates tree
+        Location candidates: all the phrases of the text, longer ones first
+
+        Phrases contained in a phrase marked as a location are skipped, so
+        only the longest location is found, e.g. "New York City", but not
+        "York" in it.
         Args:
             text (str)  original text to search for locations mentions
             max_phrase_len (int)  max chunk length to split text into when
                 creating location candidates
+            words (list of str)  words of the text if already split,
+                `text.split()` by default
+            segments (list)  (start, end) words indexes of the parts of the
+                text to take phrases from, in the text order: phrases never
+                cross segments boundaries. The whole text by default.
         """
         self.text = text
-        self.db = list(list())
-        words = text.split()
-        if not max_phrase_len or max_phrase_len > len(words):
-            max_phrase_len = len(words)
-        for level, phrase_len in enumerate(range(max_phrase_len, 0, -1)):
-            self.db.append(list())
-            for start_idx in range(0, len(words) - phrase_len + 1):
-                candidate_words = words[start_idx:start_idx + phrase_len]
-                candidate = Candidate(' '.join(candidate_words))
-                self.db[level].append(candidate)
-                for parent_idx in (start_idx, start_idx - 1,):
-                    if level < 1 or parent_idx < 0:
-                        continue
-                    try:
-                        parent = self.db[level - 1][parent_idx]
-                        candidate.add_parent(parent)
-                    except IndexError:
-                        pass
+        self._words = text.split() if words is None else words
+        if not max_phrase_len or max_phrase_len > len(self._words):
+            max_phrase_len = len(self._words)
+        self._max_phrase_len = max_phrase_len
+        if segments is None:
+            segments = [(0, len(self._words))]
+        self._segments = segments
+        # Words index -> end of the longest location starting there
+        self._location_ends = [0] * len(self._words)
+        # Number of phrases skipped as parts of locations
+        self.suppressed_count = 0
+
+    def mark_as_location(self, start, end):
+        if end > self._location_ends[start]:
+            self._location_ends[start] = end
+
+    def is_in_location(self, start, end):
+        """
+        Whether the phrase is a part of a phrase marked as a location
+        """
+        # Locations are never longer than `_max_phrase_len`, so a location
+        # containing the phrase can't start earlier
+        location_ends = self._location_ends
+        for location_start in range(
+            max(0, end - self._max_phrase_len), start + 1
+        ):
+            if location_ends[location_start] >= end:
+                return True
+        return False
+
+    def _get_phrases(self):
+        """
+        (start, end) words indexes of the phrases to check, longer first
+        """
+        segments = self._segments
+        for phrase_len in range(self._max_phrase_len, 0, -1):
+            for segment_start, segment_end in segments:
+                for start in range(
+                    segment_start, segment_end - phrase_len + 1
+                ):
+                    yield start, start + phrase_len
 
     def get_candidates(self):
-        for level in self.db:
-            for candidate in level:
-                if not candidate.has_parent_location:
-                    yield candidate
+        words = self._words
+        for start, end in self._get_phrases():
+            if not self.is_in_location(start, end):
+                yield Candidate(' '.join(words[start:end]), start, end, self)
+            else:
+                self.suppressed_count += 1
 
     def __repr__(self):
         return '{}: "{}"'.format(type(self).__name__, self.text)
-
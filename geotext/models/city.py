@@ -3,6 +3,8 @@ from geotext.models.place import Place
 
 
 class City(Place):
+    __slots__ = ('state', 'country')
+
     def __init__(self, key, name, search_field, population, state, country):
         super(City, self).__init__(key, name, search_field, population)
         self.state = state
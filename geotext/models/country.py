@@ -3,4 +3,4 @@ from geotext.models.place import Place
 
 
 class Country(Place):
-    pass
+    __slots__ = ()
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import Counter
+
+from geotext.models.mapped_place import MappedPlaceDB
+from geotext.models.place_index import PlaceIndex
+from geotext.models.surface_forms import SurfaceFormTable, US_STATE_PREFIX
+from geotext.models.trie import TokenTrie
+
+
+class GeoDB(object):
+    """
+    Places databases, each one loaded on first access
+
+        >>> geodb = GeoDB(loader=load_database)
+        >>> geodb.country_db  # loads countries only
+        >>> geodb.loaded
+        ('country_db',)
+
+    Args:
+        databases (list)  already loaded databases in `_fields` order
+        loader (callable)  `loader(geodb, name)` loads the database `name`
+            and returns a dict of database name -> database with it and any
+            other databases loaded along the way. It may access other
+            databases of `geodb` it depends on.
+    """
+    _fields = (
+        'country_db', 'state_db', 'city_db', 'nationality_db',
+        'city_abbreviation_db', 'country_abbreviation_db',
+    )
+
+    # US states are looked up by their codes with this prefix, e.g. "US.CA",
+    # and the prefix is added by the searcher
+    US_STATE_PREFIX = US_STATE_PREFIX
+
+    country_db = property(lambda self: self._get('country_db'))
+    state_db = property(lambda self: self._get('state_db'))
+    city_db = property(lambda self: self._get('city_db'))
+    nationality_db = property(lambda self: self._get('nationality_db'))
+    city_abbreviation_db = property(
+        lambda self: self._get('city_abbreviation_db')
+    )
+    country_abbreviation_db = property(
+        lambda self: self._get('country_abbreviation_db')
+    )
+
+    def __init__(self, databases=(), loader=None):
+        if databases and len(databases) != len(self._fields):
+            raise ValueError('Expected {} databases, got {}'.format(
+                len(self._fields), len(databases)
+            ))
+        if not databases and loader is None:
+            raise ValueError('Either databases or loader is required')
+        self._databases = dict(zip(self._fields, databases))
+        self._loader = loader
+        self._lock = threading.RLock()
+        # Database name -> `Counter` of its places search fields lengths in
+        # words, so they can be updated place by place, see `replace`
+        self._locations_lengths = dict()
+        # Databases names -> trie of their lookup keys
+        self._tries = dict()
+        # Databases names -> `SurfaceFormTable` of their places
+        self._surface_forms = dict()
+        # Database name -> `PlaceIndex` of its places
+        self._place_indexes = dict()
+
+    def _get(self, name):
+        try:
+            return self._databases[name]
+        except KeyError:
+            pass
+        with self._lock:
+            # Loaders may return the databases `name` depends on first
+            while name not in self._databases:
+                loaded = self._loader(self, name)
+                for loaded_name, database in loaded.items():
+                    self._databases.setdefault(loaded_name, database)
+            return self._databases[name]
+
+    @property
+    def loaded(self):
+        """
+        Names of the databases loaded so far
+        """
+        return tuple(name for name in self._fields if name in self._databases)
+
+    def load(self, names=None):
+        """
+        Load databases `names`, all of them by default
+        """
+        for name in names or self._fields:
+            self._get(name)
+        return self
+
+    def get_max_location_length(self, names=None):
+        """
+        Max number of words in a place name in databases `names`
+
+        Lengths are computed once for each database, when it's needed for
+        the first time.
+        """
+        max_length = 0
+        for name in names or self._fields:
+            lengths = self.get_locations_lengths(name)
+            if lengths:
+                max_length = max(max_length, max(lengths))
+        return max_length
+
+    def get_locations_lengths(self, name):
+        """
+        `Counter` of the lengths in words of the search fields of the places
+        of database `name`
+        """
+        try:
+            return self._locations_lengths[name]
+        except KeyError:
+            pass
+        lengths = self._locations_lengths[name] = Counter(
+            len(search_field.split())
+            for search_field in self._get(name).get_search_fields()
+        )
+        return lengths
+
+    def compile_like(self, other):
+        """
+        Compile the lengths, tries and surface forms `other` has compiled so
+        far, e.g. before the model replaces `other` in a running searcher
+        """
+        with other._lock:
+            lengths_names = list(other._locations_lengths)
+            tries_names = list(other._tries)
+            surface_forms_names = list(other._surface_forms)
+        for name in lengths_names:
+            self.get_locations_lengths(name)
+        for names in tries_names:
+            self.get_trie(names)
+        for names in surface_forms_names:
+            self.get_surface_forms(names)
+        return self
+
+    def replace(self, databases, locations_lengths=None):
+        """
+        New `GeoDB` with some of the databases replaced
+
+        The other databases and everything compiled from them only (lengths,
+        tries, surface forms, place indexes) are shared with this one, which
+        is left unchanged. All the databases are loaded.
+        Args:
+            databases (dict)  database name -> new database
+            locations_lengths (dict)  database name -> `Counter` of the
+                new database search fields lengths, as
+                `get_locations_lengths` gives, counted on first use if not
+                given
+        """
+        unknown = set(databases) - set(self._fields)
+        if unknown:
+            raise ValueError('Unknown databases: {}'.format(
+                ', '.join(sorted(unknown))
+            ))
+        geodb = GeoDB(tuple(
+            databases[name] if name in databases else self._get(name)
+            for name in self._fields
+        ))
+        with self._lock:
+            for name, lengths in self._locations_lengths.items():
+                if name not in databases:
+                    geodb._locations_lengths[name] = lengths
+            geodb._locations_lengths.update(locations_lengths or ())
+            for cache, new_cache in (
+                (self._tries, geodb._tries),
+                (self._surface_forms, geodb._surface_forms),
+            ):
+                for names, value in cache.items():
+                    if not set(names) & set(databases):
+                        new_cache[names] = value
+            for name, index in self._place_indexes.items():
+                if name not in databases:
+                    geodb._place_indexes[name] = index
+        return geodb
+
+    def get_trie(self, names=None):
+        """
+        `TokenTrie` of all the strings places of `names` databases are
+        searched by
+        """
+        names = tuple(names or self._fields)
+        try:
+            return self._tries[names]
+        except KeyError:
+            pass
+        trie = TokenTrie()
+        for name in names:
+            for key in self._get(name).get_lookup_keys():
+                if key.startswith(self.US_STATE_PREFIX):
+                    trie.add(key[len(self.US_STATE_PREFIX):])
+                trie.add(key)
+        self._tries[names] = trie
+        return trie
+
+    def get_surface_forms(self, names=None):
+        """
+        `SurfaceFormTable` of `names` databases or None for memory-mapped
+        databases: compiling it would create every place object in every
+        process, while mapped models only create the places found
+        """
+        names = tuple(names or self._fields)
+        try:
+            return self._surface_forms[names]
+        except KeyError:
+            pass
+        if any(isinstance(self._get(name), MappedPlaceDB) for name in names):
+            table = None
+        else:
+            table = SurfaceFormTable(self, names)
+        self._surface_forms[names] = table
+        return table
+
+    def get_place_index(self, name):
+        """
+        `PlaceIndex` of the places of database `name`
+        """
+        try:
+            return self._place_indexes[name]
+        except KeyError:
+            pass
+        index = self._place_indexes[name] = PlaceIndex(self._get(name).all())
+        return index
+
+    def __iter__(self):
+        for name in self._fields:
+            yield self._get(name)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        return self._get(self._fields[index])
+
+    def __getstate__(self):
+        # Loaders may hold open files, so pickle the loaded databases
+        return tuple(self)
+
+    def __setstate__(self, databases):
+        self.__init__(databases)
+
+    def __repr__(self):
+        return '{}(loaded={})'.format(type(self).__name__, self.loaded)
+
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+Read-only places databases backed by a memory-mapped file
+
+All strings and place records are stored in flat tables inside one file that
+is mapped into memory read-only, so every process using the same file shares
+a single physical copy of the gazetteer via the OS page cache. Unlike Python
+objects, mapped pages are never written to by reference counting, so the
+sharing survives `fork()`.
+
+`Place` objects are only created for places that are actually returned by
+`search()` or `__getitem__` and are memoized per process, so the same place is
+always represented by the same object.
+"""
+import marshal
+import mmap
+import os
+import struct
+
+from geotext.models.city import City
+from geotext.models.country import Country
+from geotext.models.place import Place, get_country, get_rank_population
+from geotext.models.place_link import PlaceLink
+from geotext.models.state import State
+
+MAGIC = b'GEOTEXTM'
+MAPPED_VERSION = 2
+
+# Place kinds stored in records
+_KINDS = (Place, Country, State, City, PlaceLink)
+
+# kind, key, name, search field (string ids), population (-1 if unknown),
+# two references to other places as (table, record) pairs, -1 if not set
+_RECORD = struct.Struct('<BiiiqbIbI')
+_REFERENCE_NONE = 0xFFFFFFFF
+_INDEX = struct.Struct('<I')
+_HEADER_SIZE = struct.Struct('<I')
+
+
+def _to_bytes(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+class _StringTableWriter(object):
+    def __init__(self):
+        self.ids = dict()
+        self.strings = list()
+
+    def add(self, value):
+        value = _to_bytes(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def write_mapped_model(databases, path, sources=()):
+    """
+    Compile places databases into a file readable by `open_mapped_model`
+
+    Parameters
+    ----------
+    databases: tuple
+        `PlaceDB` instances, as returned by `create_databases`
+
+    path: string
+        Output file name
+
+    sources: tuple, default ()
+        Value identifying databases source data, stored in file header and
+        returned by `read_mapped_sources`
+    """
+    strings = _StringTableWriter()
+    # Assign every place a (table, record) position first, so references
+    # can be resolved whatever the order of the databases
+    positions = dict()
+    tables = list()
+    for table_idx, db in enumerate(databases):
+        places = list()
+        for place in db.all():
+            if id(place) not in positions:
+                positions[id(place)] = (table_idx, len(places))
+                places.append(place)
+        tables.append(places)
+
+    def get_reference(place):
+        if place is None:
+            return -1, _REFERENCE_NONE
+        if id(place) not in positions:
+            raise ValueError('{!r} is not in the databases'.format(place))
+        return positions[id(place)]
+
+    sections = list()
+    offset = 0
+    tables_info = list()
+    for table_idx, (db, places) in enumerate(zip(databases, tables)):
+        records = list()
+        for place in places:
+            if isinstance(place, City):
+                references = (place.state, place.country)
+            elif isinstance(place, State):
+                references = (place.country, None)
+            elif isinstance(place, PlaceLink):
+                references = (place.place, None)
+            else:
+                references = (None, None)
+            kind = max(
+                idx for idx, cls in enumerate(_KINDS) if isinstance(place, cls)
+            )
+            records.append(_RECORD.pack(
+                kind, strings.add(place._key), strings.add(place.name),
+                strings.add(place._search_field),
+                -1 if place.population is None else place.population,
+                *(get_reference(references[0]) + get_reference(references[1]))
+            ))
+        record_ids = dict((id(place), idx) for idx, place in enumerate(places))
+        keys = sorted(
+            (record_ids[id(place)] for place in db._objects_by_key.values()),
+            key=lambda idx: _to_bytes(places[idx]._key)
+        )
+        # Places with the same search field keep their population order
+        texts = sorted(
+            (_to_bytes(text), rank, record_ids[id(place)])
+            for text, postings in db._objects_by_text.items()
+            for rank, place in enumerate(postings)
+        )
+        table_info = {
+            'ignore_abbreviations': bool(db.ignore_abbreviations),
+            'count': len(records),
+        }
+        for name, data in (
+            ('records', b''.join(records)),
+            ('keys', b''.join(_INDEX.pack(idx) for idx in keys)),
+            ('texts', b''.join(
+                _INDEX.pack(strings.add(text)) + _INDEX.pack(idx)
+                for text, _, idx in texts
+            )),
+        ):
+            table_info[name] = offset
+            sections.append(data)
+            offset += len(data)
+        table_info['keys_count'] = len(keys)
+        table_info['texts_count'] = len(texts)
+        tables_info.append(table_info)
+
+    string_offsets = [0]
+    for value in strings.strings:
+        string_offsets.append(string_offsets[-1] + len(value))
+    header = {
+        'version': MAPPED_VERSION,
+        'sources': sources,
+        'tables': tables_info,
+        'strings_count': len(strings.strings),
+        'string_offsets': offset,
+        'string_data': offset + _INDEX.size * len(string_offsets),
+    }
+    sections.append(b''.join(_INDEX.pack(idx) for idx in string_offsets))
+    sections.append(b''.join(strings.strings))
+
+    header_data = marshal.dumps(header)
+    # Processes may have the file mapped already: never overwrite it in place
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_HEADER_SIZE.pack(len(header_data)))
+            f.write(header_data)
+            for data in sections:
+                f.write(data)
+        os.rename(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError('Not a mapped geotext model')
+    header_size, = _HEADER_SIZE.unpack(f.read(_HEADER_SIZE.size))
+    header = marshal.loads(f.read(header_size))
+    if header.get('version') != MAPPED_VERSION:
+        raise ValueError('Unsupported mapped geotext model version')
+    return header, len(MAGIC) + _HEADER_SIZE.size + header_size
+
+
+def read_mapped_sources(path):
+    """
+    `sources` value the mapped model at `path` was written with
+    """
+    with open(path, 'rb') as f:
+        return _read_header(f)[0]['sources']
+
+
+class _MappedModel(object):
+    """
+    Memory-mapped file shared by all the databases of one model
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header, data_offset = _read_header(f)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data_offset = data_offset
+        self._string_offsets = data_offset + header['string_offsets']
+        self._string_data = data_offset + header['string_data']
+        self.tables = [
+            MappedPlaceDB(self, table_idx, table_info)
+            for table_idx, table_info in enumerate(header['tables'])
+        ]
+
+    def get_string(self, string_id):
+        start, end = struct.unpack_from(
+            '<II', self._map, self._string_offsets + _INDEX.size * string_id
+        )
+        return self._map[self._string_data + start:self._string_data + end]
+
+    def get_index(self, offset, idx, width=1):
+        return _INDEX.unpack_from(
+            self._map, self._data_offset + offset + _INDEX.size * width * idx
+        )[0]
+
+    def get_record(self, offset, idx):
+        return _RECORD.unpack_from(
+            self._map, self._data_offset + offset + _RECORD.size * idx
+        )
+
+    def get_place(self, table_idx, record_idx):
+        if record_idx == _REFERENCE_NONE:
+            return None
+        return self.tables[table_idx]._get_place(record_idx)
+
+
+class MappedPlaceDB(object):
+    """
+    Read-only geographic place database stored in a memory-mapped file
+
+    Has the same lookup interface as `PlaceDB`.
+    """
+    def __init__(self, model, table_idx, table_info):
+        self._model = model
+        self._table_idx = table_idx
+        self._info = table_info
+        self.ignore_abbreviations = table_info['ignore_abbreviations']
+        self._places = dict()
+
+    def _get_place(self, idx):
+        place = self._places.get(idx)
+        if place is None:
+            place = self._places[idx] = self._create_place(idx)
+        return place
+
+    def _create_place(self, idx):
+        model = self._model
+        (
+            kind, key_id, name_id, search_field_id, population,
+            ref_table, ref_idx, ref2_table, ref2_idx,
+        ) = model.get_record(self._info['records'], idx)
+        key = model.get_string(key_id)
+        name = model.get_string(name_id)
+        search_field = model.get_string(search_field_id)
+        population = None if population < 0 else population
+        cls = _KINDS[kind]
+        if cls is City:
+            return City(
+                key, name, search_field, population,
+                model.get_place(ref_table, ref_idx),
+                model.get_place(ref2_table, ref2_idx),
+            )
+        elif cls is State:
+            state = State(
+                key, name, search_field, model.get_place(ref_table, ref_idx)
+            )
+            state.population = population
+            return state
+        elif cls is PlaceLink:
+            link = PlaceLink(
+                key, name, search_field, model.get_place(ref_table, ref_idx)
+            )
+            link.population = population
+            return link
+        return cls(key, name, search_field, population)
+
+    def _find(self, text, count, get_value):
+        text = _to_bytes(text)
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if get_value(middle) < text:
+                low = middle + 1
+            else:
+                high = middle
+        if low < count and get_value(low) == text:
+            return low
+        return None
+
+    def _search_by_key(self, key):
+        model = self._model
+        offset = self._info['keys']
+
+        def get_key(idx):
+            record = model.get_record(
+                self._info['records'], model.get_index(offset, idx)
+            )
+            return model.get_string(record[1])
+
+        idx = self._find(key, self._info['keys_count'], get_key)
+        if idx is None:
+            return None
+        return self._get_place(model.get_index(offset, idx))
+
+    def _get_text(self, idx):
+        return self._model.get_string(
+            self._model.get_index(self._info['texts'], idx, width=2)
+        )
+
+    def _iter_by_text(self, text):
+        """
+        Places with the search field `text`, most populated first
+        """
+        count = self._info['texts_count']
+        idx = self._find(text, count, self._get_text)
+        if idx is None:
+            return
+        text = _to_bytes(text)
+        while idx < count and self._get_text(idx) == text:
+            yield self._get_place(self._model.get_index(
+                self._info['texts'] + _INDEX.size, idx, width=2
+            ))
+            idx += 1
+
+    def _search_by_text(self, text):
+        return next(self._iter_by_text(text), None)
+
+    def add(self, place):
+        raise TypeError('{} is read-only'.format(type(self).__name__))
+
+    def search(self, text):
+        if not self.ignore_abbreviations:
+            return self._search_by_key(text) or self._search_by_text(text)
+        else:
+            return self._search_by_text(text)
+
+    def search_all(self, text, min_population=0, country=None, limit=None):
+        """
+        See `PlaceDB.search_all`
+        """
+        places = list()
+        for place in self._iter_by_text(text):
+            if limit is not None and len(places) >= limit:
+                break
+            if get_rank_population(place) < min_population:
+                break
+            if country is None or (
+                get_country(place) is not None and
+                get_country(place)._key == country
+            ):
+                places.append(place)
+        return places
+
+    def all(self):
+        for idx in range(self._info['count']):
+            yield self._get_place(idx)
+
+    def get_search_fields(self):
+        model = self._model
+        for idx in range(self._info['count']):
+            record = model.get_record(self._info['records'], idx)
+            yield model.get_string(record[3])
+
+    def get_lookup_keys(self):
+        model = self._model
+        for idx in range(self._info['keys_count']):
+            record = model.get_record(
+                self._info['records'], model.get_index(self._info['keys'], idx)
+            )
+            yield model.get_string(record[1])
+        previous_text = None
+        for idx in range(self._info['texts_count']):
+            text = self._get_text(idx)
+            if text != previous_text:
+                yield text
+            previous_text = text
+
+    def __getitem__(self, item):
+        return self._search_by_key(item) or self._search_by_text(item)
+
+    def __contains__(self, item):
+        if isinstance(item, Place):
+            return self._search_by_key(item._key) is not None
+        return self[item] is not None
+
+
+def open_mapped_model(path):
+    """
+    Open places databases written by `write_mapped_model`
+
+    Returns
+    -------
+    A list of `MappedPlaceDB` in the same order they were written
+    """
+    return _MappedModel(path).tables
@@ -1,10 +1,25 @@
 # -*- coding: utf-8 -*-
+from bisect import bisect_left
+
+
+def _intern(value):
+    # Only byte strings can be interned
+    return intern(value) if type(value) is str else value
 
 
 class Place(object):
     """
     Geographic place
+
+    Places have no `__dict__`: there are hundreds of thousands of them, so
+    attributes are stored in slots and strings are interned, e.g. every
+    "London" key, name and search field is the same object.
     """
+    __slots__ = ('_key', 'name', 'population', '_search_field')
+
+    # Class -> all its slots, including the inherited ones
+    _all_slots = dict()
+
     def __init__(self, key, name, search_field, population=None):
         """
         :param key:  unique key that identifies this place in the database
@@ -15,47 +30,264 @@ class Place(object):
           search field may be "washington dc". This field depends on the text
           processing algo you are using
         """
-        self._key = key
-        self.name = name
+        self._key = _intern(key)
+        self.name = _intern(name)
         self.population = population
-        self._search_field = search_field
+        self._search_field = _intern(search_field)
+
+    @classmethod
+    def _get_slots(cls):
+        try:
+            return cls._all_slots[cls]
+        except KeyError:
+            slots = cls._all_slots[cls] = tuple(
+                slot for klass in reversed(cls.__mro__)
+                for slot in klass.__dict__.get('__slots__', ())
+            )
+            return slots
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self._get_slots())
+
+    def __setstate__(self, state):
+        # Unpickled strings aren't interned
+        for slot, value in zip(self._get_slots(), state):
+            setattr(self, slot, _intern(value))
 
     def __repr__(self):
         return '{}: {}'.format(type(self).__name__, self.name)
 
 
+def _get_parent(place):
+    # Place a link refers to, or the country of a city or a state
+    if hasattr(place, 'place'):
+        return place.place
+    return getattr(place, 'country', None)
+
+
+def get_rank_population(place):
+    """
+    Population places are ranked and filtered by
+
+    Places without population (states, links to other places) are ranked by
+    the population of the place they refer to, the same way `GeoText`
+    filters them by `min_population`.
+    """
+    while place is not None and place.population is None:
+        place = _get_parent(place)
+    return place.population if place is not None else 0
+
+
+def get_country(place):
+    """
+    Country the place is in (or the country itself), None if unknown
+    """
+    while place is not None and (
+        hasattr(place, 'place') or hasattr(place, 'country')
+    ):
+        place = _get_parent(place)
+    return place
+
+
 class PlaceDB(object):
     """
     Geographic place database
+
+    Several places may have the same search field, e.g. "springfield". All
+    of them are kept in a posting list sorted by population, largest first,
+    so `search` returns the most populated one and `search_all` returns the
+    others without scanning the database.
+
+    Posting lists places are added to are lists, with the populations of
+    their places cached to find where a place goes with `bisect`. `finish`
+    turns them into tuples once the database is built.
     """
     def __init__(self, ignore_abbreviations=False):
+        # Key -> the most populated place with this key
         self._objects_by_key = dict()
+        # Search field -> tuple of places sorted by population
         self._objects_by_text = dict()
+        # (search field, country key) -> tuple of places sorted by population
+        self._objects_by_text_and_country = dict()
         self.ignore_abbreviations = ignore_abbreviations
+        # Search field or (search field, country key) of a posting list
+        # being built -> negated rank populations of its places, ascending
+        self._populations = dict()
+
+    def _insert(self, objects, postings_key, place):
+        postings = objects.get(postings_key, ())
+        populations = self._populations.get(postings_key)
+        if populations is None:
+            # Tuples may be shared with copies of the database
+            postings = objects[postings_key] = list(postings)
+            populations = self._populations[postings_key] = [
+                -get_rank_population(item) for item in postings
+            ]
+        # Among places with the same population the later added one goes
+        # first, as it used to replace the previous one
+        population = -get_rank_population(place)
+        idx = bisect_left(populations, population)
+        populations.insert(idx, population)
+        postings.insert(idx, place)
 
     def add(self, place):
-        self._objects_by_key[place._key] = place
-        # TODO: store multiple places under one search field as it's not unique
-        self._objects_by_text[place._search_field] = place
+        known_place = self._objects_by_key.get(place._key)
+        if (
+            known_place is None or
+            get_rank_population(place) >= get_rank_population(known_place)
+        ):
+            self._objects_by_key[place._key] = place
+        text = place._search_field
+        self._insert(self._objects_by_text, text, place)
+        country = get_country(place)
+        if country is not None:
+            self._insert(
+                self._objects_by_text_and_country, (text, country._key), place
+            )
+
+    def finish(self):
+        """
+        Turn the posting lists built so far into tuples, e.g. once all the
+        places are added
+
+        Places can still be added afterwards, but each one copies the
+        posting list it goes to.
+        """
+        for postings_key in self._populations:
+            # Search fields are strings
+            if isinstance(postings_key, tuple):
+                objects = self._objects_by_text_and_country
+            else:
+                objects = self._objects_by_text
+            objects[postings_key] = tuple(objects[postings_key])
+        self._populations.clear()
+        return self
+
+    def remove(self, place):
+        """
+        Remove the place, KeyError if it's not in the database
+        """
+        text = place._search_field
+        postings = self._objects_by_text.get(text, ())
+        if place not in postings:
+            raise KeyError(place)
+        self._objects_by_text[text] = self._discard(postings, place)
+        self._populations.pop(text, None)
+        if not self._objects_by_text[text]:
+            del self._objects_by_text[text]
+        country = get_country(place)
+        if country is not None:
+            text_and_country = (text, country._key)
+            self._objects_by_text_and_country[text_and_country] = (
+                self._discard(
+                    self._objects_by_text_and_country[text_and_country],
+                    place,
+                )
+            )
+            self._populations.pop(text_and_country, None)
+            if not self._objects_by_text_and_country[text_and_country]:
+                del self._objects_by_text_and_country[text_and_country]
+        if self._objects_by_key.get(place._key) is place:
+            # Places with the same key have the same search field, and
+            # the first one of the postings is the one `add` would keep
+            for known_place in self._objects_by_text.get(text, ()):
+                if known_place._key == place._key:
+                    self._objects_by_key[place._key] = known_place
+                    break
+            else:
+                del self._objects_by_key[place._key]
+
+    @staticmethod
+    def _discard(postings, place):
+        return tuple(item for item in postings if item is not place)
+
+    def copy(self):
+        """
+        Database with the same places: postings are immutable, so adding or
+        removing places of the copy doesn't change this database
+        """
+        self.finish()
+        database = type(self)(self.ignore_abbreviations)
+        database._objects_by_key = self._objects_by_key.copy()
+        database._objects_by_text = self._objects_by_text.copy()
+        database._objects_by_text_and_country = (
+            self._objects_by_text_and_country.copy()
+        )
+        return database
+
+    def __getstate__(self):
+        self.finish()
+        state = self.__dict__.copy()
+        del state['_populations']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._populations = dict()
+
+    def _search_by_text(self, text):
+        postings = self._objects_by_text.get(text)
+        return postings[0] if postings else None
 
     def search(self, text):
         if not self.ignore_abbreviations:
-            return self._objects_by_key.get(text) or self._objects_by_text.get(
-                text
+            return (
+                self._objects_by_key.get(text) or self._search_by_text(text)
             )
         else:
-            return self._objects_by_text.get(text)
+            return self._search_by_text(text)
+
+    def search_all(self, text, min_population=0, country=None, limit=None):
+        """
+        All places with the search field `text`, most populated first
+
+        Args:
+            text (str)  search field to look up
+            min_population (int)  skip places with less population, see
+                `get_rank_population`
+            country (str)  only return places in the country with this key
+            limit (int)  max number of places to return
+        Returns:
+            list of places
+        """
+        if country is None:
+            postings = self._objects_by_text.get(text, ())
+        else:
+            postings = self._objects_by_text_and_country.get(
+                (text, country), ()
+            )
+        places = list()
+        for place in postings:
+            if limit is not None and len(places) >= limit:
+                break
+            # Postings are sorted, so all the next places are smaller
+            if get_rank_population(place) < min_population:
+                break
+            places.append(place)
+        return places
 
     def all(self):
-        for item in self._objects_by_key.values():
-            yield item
+        for postings in self._objects_by_text.values():
+            for item in postings:
+                yield item
+
+    def get_search_fields(self):
+        for item in self.all():
+            yield item._search_field
+
+    def get_lookup_keys(self):
+        """
+        All the strings `search()` may find a place by
+        """
+        for key in self._objects_by_key:
+            yield key
+        for text in self._objects_by_text:
+            yield text
 
     def __getitem__(self, item):
-        return self._objects_by_key.get(item) or self._objects_by_text.get(
-            item
-        )
+        return self._objects_by_key.get(item) or self._search_by_text(item)
 
     def __contains__(self, item):
         if isinstance(item, Place):
-            return item._key in self._objects_by_key
+            return item in self._objects_by_text.get(item._search_field, ())
         return item in self._objects_by_key or item in self._objects_by_text
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import zlib
+
+
+def get_place_identity(place):
+    """
+    Values telling the place apart from the other places of its database
+
+    Keys aren't unique: cities are keyed by name, so e.g. every Springfield
+    has the same key. Identities are made of values only, so the same place
+    has the same identity in every process, whatever object it's loaded to.
+    """
+    state = getattr(place, 'state', None)
+    country = getattr(place, 'country', None)
+    return (
+        place._key,
+        state._key if state is not None else None,
+        country._key if country is not None else None,
+        place.population,
+    )
+
+
+class PlaceIndex(object):
+    """
+    Stable integer ids of the places of a database
+
+    Ids are positions of the places sorted by their identities, so they are
+    the same in every process and every build of the model from the same
+    data. They are meant to be array indexes, e.g. columns of a documents x
+    countries matrix, or compact keys of counters to send between processes.
+
+        >>> index = PlaceIndex(geodb.country_db.all())
+        >>> index.get_id(geodb.country_db['GB'])
+        233
+        >>> index.get_place(233)
+        Country: United Kingdom
+
+    Args:
+        places (iterable of Place)  places to index, duplicates are ignored
+    """
+    def __init__(self, places):
+        places_by_identity = dict(
+            (get_place_identity(place), place) for place in places
+        )
+        identities = sorted(places_by_identity)
+        self._places = tuple(
+            places_by_identity[identity] for identity in identities
+        )
+        self._ids = dict(
+            (identity, place_id)
+            for place_id, identity in enumerate(identities)
+        )
+        # Checksum of all the identities: indexes with the same fingerprint
+        # give the same ids to the same places
+        self.fingerprint = zlib.crc32(repr(identities)) & 0xffffffff
+
+    def get_id(self, place):
+        """
+        Id of the place, KeyError if it's not indexed
+        """
+        return self._ids[get_place_identity(place)]
+
+    def get_place(self, place_id):
+        return self._places[place_id]
+
+    def __contains__(self, place):
+        return get_place_identity(place) in self._ids
+
+    def __iter__(self):
+        return iter(self._places)
+
+    def __len__(self):
+        return len(self._places)
+
+    def __repr__(self):
+        return '{}(places={})'.format(type(self).__name__, len(self))
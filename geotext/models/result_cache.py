@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+
+class ResultCache(object):
+    """
+    Bounded least recently used cache, safe to share between threads
+
+    Counts lookups that found a value (`hits`), lookups that didn't
+    (`misses`) and values dropped to stay within `max_size` (`evictions`).
+    Args:
+        max_size (int)  max number of values to keep
+    """
+    def __init__(self, max_size):
+        if max_size < 1:
+            raise ValueError(
+                'Cache size must be positive: {}'.format(max_size)
+            )
+        self.max_size = max_size
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._values.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            # Move to the most recently used end
+            self._values[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._values.pop(key, None)
+            self._values[key] = value
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return (
+            '{}(size={}, max_size={}, hits={}, misses={}, evictions={}, '
+            'hit_rate={:.2f})'.format(
+                type(self).__name__, len(self), self.max_size, self.hits,
+                self.misses, self.evictions, self.hit_rate,
+            )
+        )
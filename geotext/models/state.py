@@ -3,6 +3,8 @@ from geotext.models.place import Place
 
 
 class State(Place):
+    __slots__ = ('country',)
+
     def __init__(self, key, name, search_field, country):
         super(State, self).__init__(key, name, search_field)
         self.country = country
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+All the strings places are mentioned by, compiled into a single lookup table
+
+`GeoText` looks every candidate phrase up in several databases in a fixed
+priority order (see `GeoText._search_location`): some steps search the exact
+text, others its lowercase version, US states are searched with a code
+prefix, and a step is skipped if the place it finds is too small. The table
+maps the lowercase version of every string any step can find a place by to
+the entries of all the steps that may find it, in priority order, so a phrase
+costs a single dict lookup whatever the steps are.
+"""
+# US states are looked up by their codes with this prefix, e.g. "US.CA"
+US_STATE_PREFIX = 'US.'
+
+# `GeoText.Results` fields indexes
+COUNTRIES, NATIONALITIES, STATES, CITIES = range(4)
+
+
+def _get_own_population(place):
+    return place.population
+
+
+def _get_link_population(link):
+    return link.place.population
+
+
+def _get_country_population(place):
+    return place.country.population
+
+
+def _get_link_place(link):
+    return link.place
+
+
+def _get_place(place):
+    return place
+
+
+# Priority cascade steps: (database name, prefix added to the text, whether
+# the text is searched as is (True) or lowercased (False), results field,
+# function returning the found place, function returning the population
+# checked against `min_population`)
+CASCADE = (
+    # 1) Cities abbreviations: NYC or LA (since e.g. LA usually means
+    #    Los Angeles, not Louisiana)
+    (
+        'city_abbreviation_db', '', (True,), CITIES, _get_link_place,
+        _get_link_population,
+    ),
+    # 2) US short states names: "CA" (California)
+    (
+        'state_db', US_STATE_PREFIX, (True,), STATES, _get_place,
+        _get_country_population,
+    ),
+    # 3) Countries + country codes: "GB", "RU"
+    (
+        'country_db', '', (True, False), COUNTRIES, _get_place,
+        _get_own_population,
+    ),
+    # 4) Nationalities (treated as countries found)
+    (
+        'nationality_db', '', (False,), NATIONALITIES, _get_link_place,
+        _get_link_population,
+    ),
+    # 5) Countries abbreviations: other shortcuts, like "USA" or "UK"
+    (
+        'country_abbreviation_db', '', (True,), COUNTRIES, _get_link_place,
+        _get_link_population,
+    ),
+    # 6) Cities
+    ('city_db', '', (False,), CITIES, _get_place, _get_own_population),
+    # 7) Full text state names: "Texas"
+    (
+        'state_db', US_STATE_PREFIX, (False,), STATES, _get_place,
+        _get_country_population,
+    ),
+)
+
+
+def _get_step_name(step):
+    return '{}:{}'.format(step + 1, CASCADE[step][0])
+
+
+class SurfaceFormTable(object):
+    """
+    Lookup table giving the same results as the priority cascade
+
+    Args:
+        geodb (GeoDB)  places databases
+        names (list of str)  names of the databases to search, cascade steps
+            using other databases are skipped. All databases by default.
+    """
+    def __init__(self, geodb, names=None):
+        # Lowercase form -> tuple of entries: (step, exact text or None if
+        # any case matches, results field, place, population to check)
+        self._forms = dict()
+        for step, (
+            name, prefix, exact_matches, field_idx, get_place, get_population,
+        ) in enumerate(CASCADE):
+            if names is not None and name not in names:
+                continue
+            database = getattr(geodb, name)
+            lookup_keys = set(
+                key[len(prefix):] for key in database.get_lookup_keys()
+                if key.startswith(prefix)
+            )
+            # Within a step the exact text is searched before the lowercase
+            # one, and the first found place decides
+            for exact_match in exact_matches:
+                for form in sorted(lookup_keys):
+                    if not exact_match and form != form.lower():
+                        # Lowercased texts never match it
+                        continue
+                    match = database.search(prefix + form)
+                    if match is None:
+                        continue
+                    self._forms.setdefault(form.lower(), list()).append((
+                        step, form if exact_match else None, field_idx,
+                        get_place(match), get_population(match),
+                    ))
+        for form, entries in self._forms.items():
+            self._forms[form] = tuple(entries)
+
+    def lookup(self, text, min_population=0, return_step=False):
+        """
+        (`Results` field index, place) the text stands for or None
+
+        Args:
+            return_step (bool)  return the name of the `CASCADE` step that
+                found the place as well, e.g. '6:city_db'
+        """
+        entries = self._forms.get(text.lower())
+        if entries is None:
+            return None
+        decided_step = None
+        for step, exact_text, field_idx, place, population in entries:
+            if step == decided_step:
+                continue
+            if exact_text is not None and exact_text != text:
+                continue
+            if population >= min_population:
+                if return_step:
+                    return field_idx, place, _get_step_name(step)
+                return field_idx, place
+            # The step found a place too small, go on with the next step
+            decided_step = step
+        return None
+
+    def __len__(self):
+        return len(self._forms)
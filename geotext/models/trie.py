@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from geotext.models.candidate import CandidateDB
+
+# Trie node key marking the end of a phrase. Never clashes with tokens since
+# those are always strings.
+_PHRASE_END = None
+
+
+class TokenTrie(object):
+    """
+    Trie of phrases split into lower-case words
+
+    Finds all the known phrases in a list of words in a single left-to-right
+    pass: for every word only the phrases starting with it are walked, which
+    is far less work than looking up every n-gram of the text.
+    """
+    def __init__(self, phrases=()):
+        self._root = dict()
+        self.max_phrase_len = 0
+        for phrase in phrases:
+            self.add(phrase)
+
+    def add(self, phrase):
+        words = phrase.lower().split()
+        if not words:
+            return
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, dict())
+        node[_PHRASE_END] = True
+        self.max_phrase_len = max(self.max_phrase_len, len(words))
+
+    def find_all(self, words):
+        """
+        Positions of all known phrases in `words`
+
+        Args:
+            words (list of str)  lower-case words of the text
+        Returns:
+            generator of (start, end) words indexes of the found phrases,
+            `words[start:end]` being the phrase
+        """
+        root = self._root
+        for start in range(len(words)):
+            node = root
+            for end in range(start, len(words)):
+                node = node.get(words[end])
+                if node is None:
+                    break
+                if _PHRASE_END in node:
+                    yield start, end + 1
+
+
+class TrieCandidateDB(CandidateDB):
+    def __init__(self, text, trie, max_phrase_len=0, words=None,
+                 segments=None):
+        """
+        Location candidates: all the phrases of `text` known to `trie`
+
+        Candidates are the same as those of `CandidateDB` that may match a
+        location, in the same order: longer phrases first. Phrases contained
+        in a phrase marked as a location are skipped.
+        Args:
+            text (str)  original text to search for locations mentions
+            trie (TokenTrie)  known locations phrases
+            max_phrase_len (int)  max candidate length in words
+            words (list of str)  see `CandidateDB`
+            segments (list)  see `CandidateDB`
+        """
+        if not max_phrase_len or max_phrase_len > trie.max_phrase_len:
+            max_phrase_len = trie.max_phrase_len
+        super(TrieCandidateDB, self).__init__(
+            text, max_phrase_len, words, segments
+        )
+        self._trie = trie
+
+    def _get_phrases(self):
+        max_phrase_len = self._max_phrase_len
+        return sorted(
+            (
+                (segment_start + start, segment_start + end)
+                for segment_start, segment_end in self._segments
+                for start, end in self._trie.find_all([
+                    word.lower()
+                    for word in self._words[segment_start:segment_end]
+                ])
+                if end - start <= max_phrase_len
+            ),
+            key=lambda phrase: (phrase[0] - phrase[1], phrase[0])
+        )
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Find locations in large corpora using a pool of worker processes
+
+    >>> from geotext.parallel import read_parallel
+    >>> for results in read_parallel(open('corpus.txt'), workers=8):
+    ...     print(results.cities)
+
+Documents are sent to the workers in chunks and results are yielded in the
+order of the input documents as soon as they are ready. At most
+`max_chunks_in_flight` chunks are being processed or waiting to be consumed
+at any time, so memory usage doesn't depend on the corpus size.
+"""
+import itertools
+import multiprocessing
+from collections import deque
+
+from geotext import GeoText
+
+DEFAULT_CHUNK_SIZE = 256
+
+# `GeoText` instance used by the worker process
+_geo_text = None
+
+
+def _init_worker(geo_text):
+    global _geo_text
+    # Forked workers share the model of `geo_text`, others get a pickled
+    # copy of it
+    _geo_text = geo_text
+
+
+def _read_chunk(texts, min_population, skip_nationalities, matcher):
+    return _geo_text.read_many(
+        texts, min_population=min_population,
+        skip_nationalities=skip_nationalities, matcher=matcher,
+    )
+
+
+def _read_text(text, min_population, skip_nationalities, matcher):
+    return _read_chunk([text], min_population, skip_nationalities, matcher)[0]
+
+
+def create_pool(workers=None, geo_text=None, matcher=None,
+                skip_nationalities=False, **geo_text_kwargs):
+    """
+    Process pool with `GeoText` instance loaded in every worker
+
+    Workers run `_read_chunk` and `_read_text` tasks. See `read_parallel`
+    for the parameters: the model is loaded and prepared for reads with
+    `matcher` and `skip_nationalities` (see `GeoText.prepare`) before the
+    workers are forked, so they inherit it.
+    """
+    if geo_text is None:
+        geo_text = GeoText(**geo_text_kwargs)
+    geo_text.prepare(matcher, skip_nationalities)
+    # Workers started later, e.g. to replace the ones that exited, get the
+    # instance the same way
+    return multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(geo_text,)
+    )
+
+
+def _get_chunks(texts, chunk_size):
+    texts = iter(texts)
+    while True:
+        chunk = list(itertools.islice(texts, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_parallel(
+    texts, min_population=0, skip_nationalities=False, matcher=None,
+    workers=None, chunk_size=DEFAULT_CHUNK_SIZE, max_chunks_in_flight=None,
+    geo_text=None, **geo_text_kwargs
+):
+    """
+    Find locations mentioned in each of the `texts` using several processes
+
+    Parameters
+    ----------
+    texts: iterable of strings
+        Documents to find locations in. Consumed lazily.
+
+    min_population, skip_nationalities, matcher:
+        See `GeoText.read`
+
+    workers: int, default None
+        Number of worker processes, defaults to the number of CPUs. If 1, the
+        documents are processed in the current process.
+
+    chunk_size: int, default 256
+        Number of documents sent to a worker at once. Larger chunks mean less
+        inter-process communication, smaller ones - lower latency and memory
+        usage.
+
+    max_chunks_in_flight: int, default None
+        Max number of chunks being processed or waiting to be yielded,
+        defaults to twice the number of workers
+
+    geo_text: GeoText, default None
+        Instance to read with. Its model is loaded before the worker
+        processes start, and on platforms that fork them it's inherited by
+        the workers instead of being loaded by each of them.
+
+    geo_text_kwargs:
+        `GeoText` constructor arguments to create the instance with if
+        `geo_text` is not given
+
+    Returns
+    -------
+    A generator of `GeoText.Results` for each document in the input order.
+    Places in results are copies made by the worker processes: compare them
+    by their `_key`, not by identity, across documents.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if max_chunks_in_flight is None:
+        max_chunks_in_flight = 2 * workers
+    chunks = _get_chunks(texts, chunk_size)
+    geo_text = geo_text or GeoText(**geo_text_kwargs)
+
+    if workers == 1:
+        for chunk in chunks:
+            for results in geo_text.read_many(
+                chunk, min_population, skip_nationalities, matcher
+            ):
+                yield results
+        return
+
+    pool = create_pool(workers, geo_text, matcher, skip_nationalities)
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(pool.apply_async(
+                _read_chunk,
+                (chunk, min_population, skip_nationalities, matcher)
+            ))
+            if len(pending) >= max_chunks_in_flight:
+                for results in pending.popleft().get():
+                    yield results
+        while pending:
+            for results in pending.popleft().get():
+                yield results
+        pool.close()
+    except BaseException:
+        # Including GeneratorExit if the caller stopped reading early
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Build a places model from full-scale GeoNames dumps
+
+`create_databases` parses the bundled `cities15000.txt` in one go, which
+doesn't scale to `cities500.txt` or `allCountries.txt` (12M+ rows). The
+builder streams the dump in chunks of lines, parses and normalizes them in
+worker processes and keeps only the most populated of the places with the
+same name in the same state, so memory depends on the number of places
+kept, not on the dump size. Countries, states, nationalities and
+abbreviations come from the bundled data files.
+
+The model is written as a memory-mapped file, see `write_mapped_model`::
+
+    $ python -m geotext.tasks.build_tasks allCountries.txt \\
+        --output geonames.mmap --min-population 500 --workers 8
+    rows=12237403 cities=184013 duplicates=12671 rows_per_second=...
+
+    >>> GeoText(open_mapped_model('geonames.mmap'))
+"""
+from __future__ import print_function
+
+import argparse
+import itertools
+import multiprocessing
+import sys
+import time
+from collections import deque, OrderedDict
+
+from geotext.instrumentation import get_peak_rss_mb
+from geotext.models.city import City
+from geotext.models.mapped_place import write_mapped_model
+from geotext.models.place import PlaceDB
+from geotext.tasks.db_tasks import (
+    CITIES_FILE, create_country_db, create_state_db, create_nationality_db,
+    create_city_abbreviations_db, create_country_abbreviations_db,
+)
+from geotext.tasks.snapshot_tasks import get_sources_hash, SOURCE_FILES
+from geotext.text_utils import (
+    replace_non_ascii, fix_location_name, canonize_location_name,
+)
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# GeoNames dump columns, see
+# http://download.geonames.org/export/dump/readme.txt
+_NAME, _FEATURE_CLASS, _COUNTRY_CODE, _ADMIN1_CODE, _POPULATION = (
+    1, 6, 8, 10, 14
+)
+# Feature class of cities, villages, etc.
+_POPULATED_PLACE = 'P'
+
+
+def parse_cities_chunk(lines, min_population=0):
+    """
+    Parse populated places lines of a GeoNames dump
+
+    Parameters
+    ----------
+    lines: list of strings
+        Raw dump lines
+
+    min_population: int, default 0
+        Skip places with less population
+
+    Returns
+    -------
+    A tuple of the number of lines parsed and a list of (search field, name,
+    country code, admin1 code, population) of the places kept
+    """
+    rows = list()
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        columns = line.rstrip('\n').split('\t')
+        if columns[_FEATURE_CLASS] != _POPULATED_PLACE:
+            continue
+        population = int(columns[_POPULATION] or 0)
+        if population < min_population:
+            continue
+        name = fix_location_name(
+            replace_non_ascii(columns[_NAME].decode('utf-8'))
+        )
+        rows.append((
+            canonize_location_name(name), name, columns[_COUNTRY_CODE],
+            columns[_ADMIN1_CODE], population,
+        ))
+    return len(lines), rows
+
+
+def _parse_chunk(args):
+    return parse_cities_chunk(*args)
+
+
+def _get_chunks(lines, chunk_size):
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_parsed_chunks(filename, min_population=0, workers=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    `parse_cities_chunk` results for the chunks of the dump, in file order
+
+    At most twice as many chunks as there are workers are read ahead, so
+    memory usage doesn't depend on the dump size.
+
+    Parameters
+    ----------
+    workers: int, default None
+        Number of worker processes, defaults to the number of CPUs. If 1,
+        lines are parsed in the current process.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    with open(filename, 'rb') as f:
+        chunks = _get_chunks(f, chunk_size)
+        if workers == 1:
+            for chunk in chunks:
+                yield parse_cities_chunk(chunk, min_population)
+            return
+        pool = multiprocessing.Pool(workers)
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(pool.apply_async(
+                    _parse_chunk, ((chunk, min_population),)
+                ))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+
+def build_model(filename, min_population=0, workers=None,
+                chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    """
+    Build places databases with the cities of a GeoNames dump
+
+    Places with the same name in the same state (e.g. a city and its
+    sections) are the same place: only the most populated one is kept.
+
+    Parameters
+    ----------
+    filename: string
+        GeoNames dump, e.g. `cities500.txt` or `allCountries.txt`
+
+    min_population, workers, chunk_size:
+        See `iter_parsed_chunks`
+
+    stats: dict, default None
+        Filled with the build counters and timings if given
+
+    Returns
+    -------
+    A tuple of databases, as `create_databases` returns
+    """
+    started = time.time()
+    country_db = create_country_db(ignore_abbreviations=True)
+    state_db = create_state_db(country_db)
+    # (search field, country code, admin1 code) -> most populated row
+    cities = dict()
+    rows_count = duplicates_count = 0
+    for lines_count, rows in iter_parsed_chunks(
+        filename, min_population, workers, chunk_size
+    ):
+        rows_count += lines_count
+        for row in rows:
+            key = (row[0], row[2], row[3])
+            known_row = cities.get(key)
+            if known_row is not None:
+                duplicates_count += 1
+                if known_row[4] >= row[4]:
+                    continue
+            cities[key] = row
+    parsed = time.time()
+
+    city_db = PlaceDB()
+    unknown_countries_count = 0
+    for search_field, name, country_code, state_code_part, population in (
+        cities.itervalues()
+    ):
+        country = country_db[country_code]
+        if country is None:
+            unknown_countries_count += 1
+            continue
+        if state_code_part:
+            state = state_db['{}.{}'.format(country_code, state_code_part)]
+        else:
+            state = None
+        city_db.add(
+            City(name, name, search_field, population, state, country)
+        )
+    city_db.finish()
+    cities_count = len(cities)
+    del cities
+    databases = (
+        country_db, state_db, city_db, create_nationality_db(country_db),
+        create_city_abbreviations_db(city_db),
+        create_country_abbreviations_db(country_db),
+    )
+    if stats is not None:
+        stats.update((
+            ('rows', rows_count),
+            ('cities', cities_count - unknown_countries_count),
+            ('duplicates', duplicates_count),
+            ('unknown_countries', unknown_countries_count),
+            ('parse_seconds', parsed - started),
+            ('rows_per_second', rows_count / max(parsed - started, 1e-9)),
+            ('build_seconds', time.time() - started),
+        ))
+    return databases
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Build a memory-mapped places model from a GeoNames dump'
+    )
+    parser.add_argument('dump', help='e.g. cities500.txt or allCountries.txt')
+    parser.add_argument('--output', '-o', required=True, help='model file')
+    parser.add_argument(
+        '--min-population', type=int, default=0,
+        help='skip places with less population',
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help='number of parsing processes (default: number of CPUs)',
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+        help='number of lines parsed at once (default: %(default)s)',
+    )
+    args = parser.parse_args(args)
+
+    stats = OrderedDict()
+    databases = build_model(
+        args.dump, args.min_population, args.workers, args.chunk_size, stats
+    )
+    started = time.time()
+    sources = (args.dump,) + tuple(
+        filename for filename in SOURCE_FILES if filename != CITIES_FILE
+    )
+    write_mapped_model(databases, args.output, get_sources_hash(sources))
+    stats['write_seconds'] = time.time() - started
+    stats['peak_rss_mb'] = get_peak_rss_mb()
+    # Workers are terminated by now, so they're counted
+    stats['peak_worker_rss_mb'] = get_peak_rss_mb(children=True)
+    print(' '.join(
+        ('{}={:.6g}' if isinstance(value, float) else '{}={}').format(
+            name, value
+        )
+        for name, value in stats.items()
+    ), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
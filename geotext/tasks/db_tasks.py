@@ -29,7 +29,7 @@ NATIONALITIES_FILE = get_data_path('nationalities.txt')
 
 def _read_data_file(
     filename, usecols=(0, 1), sep='\t', comment='#', encoding='utf-8',
-    population_field_num=None, filter_method=None
+    population_field_num=None, filter_method=None, keep_duplicates=False
 ):
     """
     Parse data files from the data directory
@@ -69,12 +69,17 @@ def _read_data_file(
         Only lines that pass this filter are used
         Method receives one param: line split by defined separator into a list
 
+    keep_duplicates: bool, default False
+        Return all the lines, even the ones with the same name, instead of
+        resolving conflicts. `population_field_num` is ignored then.
+
     Returns
     -------
     A list of tuples with specified fields of input file
     """
 
     d = dict()
+    rows = list()
     with open(filename, 'rb') as f:
         location_population = dict()
         for line in f:
@@ -88,6 +93,9 @@ def _read_data_file(
                 for idx in usecols
                 ]
             values[0] = fix_location_name(values[0])
+            if keep_duplicates:
+                rows.append(values)
+                continue
             key = canonize_location_name(values[0])
 
             if population_field_num is not None:
@@ -99,7 +107,7 @@ def _read_data_file(
                 location_population[key] = population
 
             d[key] = values
-    return d.values()
+    return rows if keep_duplicates else d.values()
 
 
 def create_country_db(ignore_abbreviations=False):
@@ -113,7 +121,7 @@ def create_country_db(ignore_abbreviations=False):
                 canonize_location_name(country_name), int(population)
             )
         )
-    return country_db
+    return country_db.finish()
 
 
 def create_state_db(country_db):
@@ -126,18 +134,25 @@ def create_state_db(country_db):
                 country_db[country_code]
             )
         )
-    return state_db
+    return state_db.finish()
 
 
-def create_city_db(state_db, country_db):
+def create_city_db(state_db, country_db, min_population=0):
     city_db = PlaceDB()
     # Field 14 is population, see
     # http://download.geonames.org/export/dump/readme.txt
-    # for reference
+    # for reference. Cities with the same name are all kept, `PlaceDB`
+    # ranks them by population.
+    if min_population:
+        def filter_method(columns):
+            return int(columns[14]) >= min_population
+    else:
+        filter_method = None
     for (
         city_name, country_code, state_code_part, population,
     ) in _read_data_file(
-        CITIES_FILE, usecols=[1, 8, 10, 14], population_field_num=14,
+        CITIES_FILE, usecols=[1, 8, 10, 14], filter_method=filter_method,
+        keep_duplicates=True,
     ):
         if state_code_part:
             state_code = '{}.{}'.format(country_code, state_code_part)
@@ -151,7 +166,7 @@ def create_city_db(state_db, country_db):
                 int(population), state, country
             )
         )
-    return city_db
+    return city_db.finish()
 
 
 def create_nationality_db(country_db):
@@ -167,7 +182,7 @@ def create_nationality_db(country_db):
                 canonize_location_name(nationality_name), country
             )
         )
-    return nationality_db
+    return nationality_db.finish()
 
 
 def create_city_abbreviations_db(city_db):
@@ -176,12 +191,15 @@ def create_city_abbreviations_db(city_db):
         city_abbrevation, city_name,
     ) in _read_data_file(CITIES_ABBREVIATIONS_FILE):
         city = city_db[canonize_location_name(city_name)]
+        if city is None:
+            # The city was dropped by the population floor
+            continue
         city_abbreviations_db.add(
             PlaceLink(
                 city_abbrevation, city_abbrevation, city_abbrevation, city
             )
         )
-    return city_abbreviations_db
+    return city_abbreviations_db.finish()
 
 
 def create_country_abbreviations_db(country_db):
@@ -196,5 +214,63 @@ def create_country_abbreviations_db(country_db):
                 country
             )
         )
-    return country_abbreviations_db
+    return country_abbreviations_db.finish()
+
 
+def create_database(name, geodb, min_population=0):
+    """
+    Build a single places database from the data files
+
+    Parameters
+    ----------
+    name: string
+        `GeoDB` field name of the database
+
+    geodb: GeoDB
+        Databases the new one refers to are taken from it
+
+    min_population: int, default 0
+        See `create_databases`
+    """
+    if name == 'country_db':
+        return create_country_db(ignore_abbreviations=True)
+    if name == 'state_db':
+        return create_state_db(geodb.country_db)
+    if name == 'city_db':
+        return create_city_db(
+            geodb.state_db, geodb.country_db, min_population
+        )
+    if name == 'nationality_db':
+        return create_nationality_db(geodb.country_db)
+    if name == 'city_abbreviation_db':
+        return create_city_abbreviations_db(geodb.city_db)
+    if name == 'country_abbreviation_db':
+        return create_country_abbreviations_db(geodb.country_db)
+    raise ValueError('Unknown database: {}'.format(name))
+
+
+def create_databases(min_population=0):
+    """
+    Build all places databases from the data files
+
+    Parameters
+    ----------
+    min_population: int, default 0
+        Skip cities with less population, as well as their abbreviations.
+        Countries and states are always kept, since cities refer to them.
+
+    Returns
+    -------
+    A tuple of (country_db, state_db, city_db, nationality_db,
+    city_abbreviation_db, country_abbreviation_db)
+    """
+    country_db = create_country_db(ignore_abbreviations=True)
+    state_db = create_state_db(country_db)
+    city_db = create_city_db(state_db, country_db, min_population)
+    nationality_db = create_nationality_db(country_db)
+    city_abbreviation_db = create_city_abbreviations_db(city_db)
+    country_abbreviation_db = create_country_abbreviations_db(country_db)
+    return (
+        country_db, state_db, city_db, nationality_db,
+        city_abbreviation_db, country_abbreviation_db,
+    )
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+Apply GeoNames daily delta files to a loaded model
+
+GeoNames publishes the places modified and deleted every day in
+`modifications-YYYY-MM-DD.txt` (dump rows) and `deletes-YYYY-MM-DD.txt`
+(geonameid, name, comment). `apply_delta` makes a new model with the cities
+and states of these files updated, without changing the given one, so it
+can be swapped into a running `GeoText`::
+
+    >>> geonameids = read_geonameids()
+    >>> model, geonameids = apply_delta(
+    ...     geo_text.model, geonameids,
+    ...     read_modifications('modifications-2026-10-16.txt'),
+    ...     read_deletes('deletes-2026-10-16.txt'),
+    ... )
+    >>> geo_text.swap_model(model)
+
+Places don't store their GeoNames ids, so the places of the model are found
+by the ids of the data files the model was built from, see `read_geonameids`.
+"""
+from collections import Counter
+
+from geotext.models.city import City
+from geotext.models.geodb import GeoDB
+from geotext.models.place import PlaceDB
+from geotext.models.place_link import PlaceLink
+from geotext.models.state import State
+from geotext.tasks.build_tasks import (
+    _NAME, _FEATURE_CLASS, _COUNTRY_CODE, _ADMIN1_CODE, _POPULATION,
+    _POPULATED_PLACE,
+)
+from geotext.tasks.db_tasks import CITIES_FILE, STATES_FILE
+from geotext.text_utils import (
+    replace_non_ascii, fix_location_name, canonize_location_name,
+)
+
+_GEONAME_ID, _FEATURE_CODE = 0, 7
+# Feature class and code of first-order administrative divisions: states
+_ADMINISTRATIVE_DIVISION = 'A'
+_STATE_FEATURE_CODE = 'ADM1'
+
+
+def _get_state_code(country_code, admin1_code):
+    if not admin1_code:
+        return None
+    return '{}.{}'.format(country_code, admin1_code)
+
+
+def _get_city_identity(search_field, country_code, admin1_code, population):
+    return (
+        'city_db',
+        (search_field, country_code,
+         _get_state_code(country_code, admin1_code), population),
+    )
+
+
+def _read_lines(filename):
+    with open(filename, 'rb') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            yield line.rstrip('\r\n').split('\t')
+
+
+def read_geonameids(cities_filename=CITIES_FILE, states_filename=STATES_FILE):
+    """
+    GeoNames ids of the cities and states of a model built from the data
+    files
+
+    Parameters
+    ----------
+    cities_filename: string, default bundled `cities15000.txt`
+        Dump the cities of the model come from, e.g. the one given to
+        `build_tasks`
+
+    states_filename: string, default bundled `admin1CodesASCII.txt`
+
+    Returns
+    -------
+    A dict of geonameid -> place identity: ('city_db', (search field,
+    country code, state key, population)) or ('state_db', state key)
+    """
+    geonameids = dict()
+    for columns in _read_lines(cities_filename):
+        name = fix_location_name(
+            replace_non_ascii(columns[_NAME].decode('utf-8'))
+        )
+        geonameids[int(columns[_GEONAME_ID])] = _get_city_identity(
+            canonize_location_name(name), columns[_COUNTRY_CODE],
+            columns[_ADMIN1_CODE], int(columns[_POPULATION] or 0),
+        )
+    # Columns: code, name, ascii name, geonameid
+    for columns in _read_lines(states_filename):
+        geonameids[int(columns[3])] = ('state_db', columns[0])
+    return geonameids
+
+
+def read_modifications(filename):
+    """
+    Rows of a `modifications-*.txt` file (or of any dump)
+
+    Returns
+    -------
+    A generator of (geonameid, feature class, feature code, name, country
+    code, admin1 code, population)
+    """
+    for columns in _read_lines(filename):
+        yield (
+            int(columns[_GEONAME_ID]), columns[_FEATURE_CLASS],
+            columns[_FEATURE_CODE], fix_location_name(
+                replace_non_ascii(columns[_NAME].decode('utf-8'))
+            ),
+            columns[_COUNTRY_CODE], columns[_ADMIN1_CODE],
+            int(columns[_POPULATION] or 0),
+        )
+
+
+def read_deletes(filename):
+    """
+    GeoNames ids of a `deletes-*.txt` file
+    """
+    for columns in _read_lines(filename):
+        yield int(columns[_GEONAME_ID])
+
+
+class _ModelUpdate(object):
+    """
+    Copies of the updated databases of a model and their changes
+    """
+    def __init__(self, geodb, geonameids):
+        self.geodb = geodb
+        self.geonameids = dict(geonameids)
+        self.databases = dict()
+        self.lengths = dict()
+        # Replaced place -> new place or None if it's removed
+        self.replaced = dict()
+        self.counts = Counter()
+
+    def get_database(self, name):
+        try:
+            return self.databases[name]
+        except KeyError:
+            pass
+        database = getattr(self.geodb, name)
+        if not isinstance(database, PlaceDB):
+            raise TypeError(
+                '{} is read-only, build a new model instead'.format(
+                    type(database).__name__
+                )
+            )
+        self.databases[name] = database.copy()
+        self.lengths[name] = Counter(self.geodb.get_locations_lengths(name))
+        return self.databases[name]
+
+    def lookup_database(self, name):
+        """
+        Database `name` to search, without copying it
+        """
+        if name in self.databases:
+            return self.databases[name]
+        return getattr(self.geodb, name)
+
+    def get_state(self, state_code):
+        if state_code is None:
+            return None
+        state = self.lookup_database('state_db')[state_code]
+        # States are also found by their names
+        if state is None or state._key != state_code:
+            return None
+        return state
+
+    def get_replacement(self, place):
+        """
+        Place that replaces `place` after all the updates, None if it's
+        removed
+        """
+        while place is not None and place in self.replaced:
+            place = self.replaced[place]
+        return place
+
+    def find(self, identity):
+        name, key = identity
+        if name == 'state_db':
+            return self.get_state(key)
+        search_field, country_code, state_code, population = key
+        for place in self.lookup_database(name).search_all(
+            search_field, country=country_code
+        ):
+            # Cities of states missing in the model have no state
+            state_key = place.state._key if place.state is not None else None
+            if (
+                state_key in (state_code, None) and
+                place.population == population
+            ):
+                return place
+        return None
+
+    def add(self, name, place):
+        self.get_database(name).add(place)
+        self.lengths[name][len(place._search_field.split())] += 1
+
+    def remove(self, name, place):
+        self.get_database(name).remove(place)
+        lengths = self.lengths[name]
+        length = len(place._search_field.split())
+        lengths[length] -= 1
+        if not lengths[length]:
+            # `GeoDB.get_max_location_length` takes the max of the keys
+            del lengths[length]
+
+    def replace(self, name, place, new_place, new_name=None):
+        """
+        Replace `place` of database `name` with `new_place` of database
+        `new_name` (`name` by default), remove it if `new_place` is None
+        """
+        self.remove(name, place)
+        if new_place is not None:
+            self.add(new_name or name, new_place)
+        # Links and cities can't refer to a place of another kind, e.g. a
+        # city that became a state
+        self.replaced[place] = (
+            new_place if type(new_place) is type(place) else None
+        )
+
+
+def apply_delta(geodb, geonameids, modifications=(), deletes=(),
+                min_population=0, stats=None):
+    """
+    New model with the cities and states of GeoNames delta files updated
+
+    Modified places are replaced with new objects and the cities of a
+    replaced state and the abbreviations of a replaced city are replaced
+    too, so `geodb` and its places are never changed: reads in progress can
+    go on with it. Only the updated databases are copied, and the others and
+    everything compiled from them only are shared with `geodb`. Lengths of
+    places names are updated place by place, see `GeoDB.replace`.
+
+    Parameters
+    ----------
+    geodb: GeoDB or tuple of databases in `GeoDB` fields order
+        In-memory model, memory-mapped models are read-only
+
+    geonameids: dict
+        GeoNames ids of the model places, see `read_geonameids`
+
+    modifications: iterable, default ()
+        Rows of `read_modifications`. Populated places become cities and
+        first-order administrative divisions become states, the places of
+        the other rows are removed from the model.
+
+    deletes: iterable, default ()
+        GeoNames ids of the places to remove, see `read_deletes`
+
+    min_population: int, default 0
+        Remove cities with less population, as the model was built with
+
+    stats: dict, default None
+        Filled with the numbers of added, modified, removed and skipped
+        places if given
+
+    Returns
+    -------
+    A tuple of the new `GeoDB` and the GeoNames ids of its places
+    """
+    if not isinstance(geodb, GeoDB):
+        geodb = GeoDB(geodb)
+    update = _ModelUpdate(geodb, geonameids)
+    country_db = geodb.country_db
+    # States first, so the cities of the same delta refer to the new ones
+    modifications = sorted(
+        modifications, key=lambda row: row[2] != _STATE_FEATURE_CODE
+    )
+    for (
+        geonameid, feature_class, feature_code, name, country_code,
+        admin1_code, population,
+    ) in modifications:
+        identity = update.geonameids.pop(geonameid, None)
+        place = update.find(identity) if identity is not None else None
+        country = country_db[country_code]
+        if feature_class == _ADMINISTRATIVE_DIVISION and (
+            feature_code == _STATE_FEATURE_CODE
+        ):
+            database_name = 'state_db'
+            key = _get_state_code(country_code, admin1_code)
+            new_identity = ('state_db', key)
+            if country is not None and key is not None:
+                new_place = State(
+                    key, name, canonize_location_name(name), country
+                )
+            else:
+                new_place = None
+        elif feature_class == _POPULATED_PLACE:
+            database_name = 'city_db'
+            search_field = canonize_location_name(name)
+            new_identity = _get_city_identity(
+                search_field, country_code, admin1_code, population
+            )
+            if country is not None and population >= min_population:
+                new_place = City(
+                    name, name, search_field, population,
+                    update.get_state(
+                        _get_state_code(country_code, admin1_code)
+                    ),
+                    country,
+                )
+            else:
+                new_place = None
+        else:
+            database_name = identity[0] if identity is not None else None
+            new_place = None
+        if place is None:
+            if new_place is None:
+                update.counts['skipped'] += 1
+                continue
+            update.add(database_name, new_place)
+            update.counts['added'] += 1
+        else:
+            update.replace(identity[0], place, new_place, database_name)
+            update.counts['modified' if new_place else 'removed'] += 1
+        if new_place is not None:
+            update.geonameids[geonameid] = new_identity
+
+    for geonameid in deletes:
+        identity = update.geonameids.pop(geonameid, None)
+        place = update.find(identity) if identity is not None else None
+        if place is None:
+            update.counts['skipped'] += 1
+            continue
+        update.replace(identity[0], place, None)
+        update.counts['removed'] += 1
+
+    _update_cities_states(update)
+    _update_links(update, 'city_abbreviation_db')
+    for database in update.databases.values():
+        database.finish()
+    new_geodb = geodb.replace(update.databases, update.lengths)
+    if stats is not None:
+        for name in ('added', 'modified', 'removed', 'skipped'):
+            stats[name] = update.counts[name]
+    return new_geodb, update.geonameids
+
+
+def _update_cities_states(update):
+    """
+    Replace the cities of the replaced states
+    """
+    states = dict(
+        (state, new_state) for state, new_state in update.replaced.items()
+        if isinstance(state, State)
+    )
+    if not states:
+        return
+    for city in list(update.lookup_database('city_db').all()):
+        if city.state not in states:
+            continue
+        update.replace('city_db', city, City(
+            city._key, city.name, city._search_field, city.population,
+            update.get_replacement(city.state), city.country,
+        ))
+
+
+def _update_links(update, name):
+    """
+    Point the links of database `name` to the replaced places, remove the
+    links to the removed ones
+    """
+    if not update.replaced:
+        return
+    links = [
+        link for link in update.lookup_database(name).all()
+        if link.place in update.replaced
+    ]
+    for link in links:
+        new_place = update.get_replacement(link.place)
+        update.replace(name, link, PlaceLink(
+            link._key, link.name, link._search_field, new_place,
+        ) if new_place is not None else None)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled on-disk snapshot of the places databases
+
+Parsing the GeoNames data files is the slowest part of `GeoText` start-up, so
+the built databases are pickled into a single versioned file. The snapshot
+header stores hashes of the source data files and the snapshot is considered
+stale as soon as any of them changes.
+
+Databases are pickled one after another, so they can be loaded one at a time:
+loading a database only unpickles it and the databases stored before it.
+
+Build the snapshot ahead of time with::
+
+    $ python -m geotext.tasks.snapshot_tasks
+"""
+import cPickle as pickle
+import hashlib
+import os
+
+from itertools import izip
+
+from geotext.models.geodb import GeoDB
+from geotext.tasks.db_tasks import (
+    get_data_path, create_databases, COUNTRIES_FILE, STATES_FILE, CITIES_FILE,
+    NATIONALITIES_FILE, CITIES_ABBREVIATIONS_FILE,
+    COUNTRIES_ABBREVIATIONS_FILE,
+)
+
+# Bump this whenever places models or databases layout changes so that
+# snapshots pickled by older versions are rebuilt
+SNAPSHOT_VERSION = 4
+
+SNAPSHOT_FILE = os.environ.get(
+    'GEOTEXT_SNAPSHOT', get_data_path('geotext_model.pickle')
+)
+
+MAPPED_MODEL_FILE = os.environ.get(
+    'GEOTEXT_MAPPED_MODEL', get_data_path('geotext_model.mmap')
+)
+
+# Order of `GeoDB` databases in the model snapshot: every database refers only
+# to the ones before it, and nationalities, which are often skipped, are last
+MODEL_SNAPSHOT_ORDER = (
+    'country_db', 'state_db', 'city_db', 'city_abbreviation_db',
+    'country_abbreviation_db', 'nationality_db',
+)
+
+SOURCE_FILES = (
+    COUNTRIES_FILE, STATES_FILE, CITIES_FILE, NATIONALITIES_FILE,
+    CITIES_ABBREVIATIONS_FILE, COUNTRIES_ABBREVIATIONS_FILE,
+)
+
+
+def get_file_hash(filename, block_size=1 << 20):
+    file_hash = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def get_sources_hash(sources=SOURCE_FILES):
+    """
+    Tuple of (file name, sha1) pairs identifying the data files state
+    """
+    return tuple(
+        (os.path.basename(filename), get_file_hash(filename))
+        for filename in sources
+    )
+
+
+def _get_header(sources, key):
+    return {
+        'version': SNAPSHOT_VERSION,
+        'sources': get_sources_hash(sources),
+        'key': key,
+    }
+
+
+def save_snapshot(databases, path=SNAPSHOT_FILE, sources=SOURCE_FILES,
+                  key=None):
+    """
+    Pickle places databases to `path`
+
+    The file is written to a temporary location first and then renamed, so
+    concurrent readers never see a partially written snapshot.
+
+    Parameters
+    ----------
+    databases: tuple
+        Places databases as returned by `create_databases`
+
+    path: string
+        Snapshot file name
+
+    sources: list of strings
+        Data files the databases were built from
+
+    key: object, default None
+        Any additional picklable value the databases depend on (e.g. build
+        options). Snapshot is only loaded back if the same key is requested.
+    """
+    header = _get_header(sources, key)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+            # Objects shared between databases are pickled only once, since
+            # the pickler remembers the objects it has already written
+            pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+            pickler.dump(len(databases))
+            for database in databases:
+                pickler.dump(database)
+        os.rename(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+_SNAPSHOT_ERRORS = (
+    EOFError, pickle.UnpicklingError, AttributeError, ImportError,
+    IndexError, TypeError, ValueError,
+)
+
+
+def _iter_databases(f, unpickler, count):
+    with f:
+        for _ in range(count):
+            yield unpickler.load()
+
+
+def iter_snapshot(path=SNAPSHOT_FILE, sources=SOURCE_FILES, key=None):
+    """
+    Places databases pickled by `save_snapshot`, unpickled one at a time
+
+    The file is kept open until all the databases are read or the iterator
+    is dropped.
+
+    Returns
+    -------
+    An iterator of places databases or None if the snapshot doesn't exist,
+    was built by another snapshot version, from other data files or with
+    another key.
+    """
+    if not os.path.exists(path):
+        return None
+    f = open(path, 'rb')
+    try:
+        header = pickle.load(f)
+        if header != _get_header(sources, key):
+            f.close()
+            return None
+        unpickler = pickle.Unpickler(f)
+        count = unpickler.load()
+    except _SNAPSHOT_ERRORS:
+        # Corrupted or incompatible snapshot: rebuild it
+        f.close()
+        return None
+    return _iter_databases(f, unpickler, count)
+
+
+def load_snapshot(path=SNAPSHOT_FILE, sources=SOURCE_FILES, key=None):
+    """
+    Load places databases pickled by `save_snapshot`
+
+    Returns
+    -------
+    A tuple of places databases or None, see `iter_snapshot`
+    """
+    databases = iter_snapshot(path, sources, key)
+    if databases is None:
+        return None
+    try:
+        return tuple(databases)
+    except _SNAPSHOT_ERRORS:
+        return None
+
+
+def get_model_snapshot_key(min_population_floor=0):
+    return {
+        'order': MODEL_SNAPSHOT_ORDER,
+        'min_population_floor': min_population_floor,
+    }
+
+
+def save_model_snapshot(databases, path=SNAPSHOT_FILE, min_population_floor=0):
+    """
+    Save `GeoDB` databases in `MODEL_SNAPSHOT_ORDER`
+
+    Parameters
+    ----------
+    databases: GeoDB or tuple
+        Databases in `GeoDB` fields order, e.g. as returned by
+        `create_databases`
+
+    min_population_floor: int
+        Population floor the databases were built with
+    """
+    databases = dict(izip(GeoDB._fields, databases))
+    save_snapshot(
+        [databases[name] for name in MODEL_SNAPSHOT_ORDER], path,
+        key=get_model_snapshot_key(min_population_floor),
+    )
+
+
+def iter_model_snapshot(path=SNAPSHOT_FILE, min_population_floor=0):
+    """
+    Iterator of (`GeoDB` field name, database) pairs saved by
+    `save_model_snapshot` or None, see `iter_snapshot`
+    """
+    databases = iter_snapshot(
+        path, key=get_model_snapshot_key(min_population_floor)
+    )
+    if databases is None:
+        return None
+    return izip(MODEL_SNAPSHOT_ORDER, databases)
+
+
+def build_snapshot(path=SNAPSHOT_FILE, min_population_floor=0):
+    """
+    Build places databases from the data files and save the snapshot
+    """
+    databases = create_databases(min_population_floor)
+    save_model_snapshot(databases, path, min_population_floor)
+    return databases
+
+
+if __name__ == '__main__':
+    build_snapshot()
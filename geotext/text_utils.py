@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 import re
+import time
+
 from unidecode import unidecode
 
 
@@ -13,10 +15,126 @@ def get_words_counts(phrases_list):
     return set(map(len, map(lambda phrase: phrase.split(), phrases_list)))
 
 
+class TransliterationStats(object):
+    """
+    Transliteration counters, see `transliteration_stats`
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Texts returned as is, since they're ASCII already
+        self.ascii_texts = 0
+        # Texts with non-ASCII characters
+        self.non_ascii_texts = 0
+        # Non-ASCII character sequences found in / missing from the cache
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Seconds spent transliterating cache misses
+        self.transliteration_time = 0.0
+
+    @property
+    def hit_rate(self):
+        lookups = self.cache_hits + self.cache_misses
+        return float(self.cache_hits) / lookups if lookups else 0.0
+
+    @property
+    def time_saved(self):
+        """
+        Estimated seconds saved by the cache hits
+        """
+        if not self.cache_misses:
+            return 0.0
+        return (
+            self.cache_hits * self.transliteration_time / self.cache_misses
+        )
+
+    def __repr__(self):
+        return (
+            '{}(ascii_texts={}, non_ascii_texts={}, cache_hits={}, '
+            'cache_misses={}, hit_rate={:.2f}, time_saved={:.3f}s)'.format(
+                type(self).__name__, self.ascii_texts, self.non_ascii_texts,
+                self.cache_hits, self.cache_misses, self.hit_rate,
+                self.time_saved,
+            )
+        )
+
+
+transliteration_stats = TransliterationStats()
+
+# Max number of non-ASCII sequences to remember transliterations for
+TRANSLITERATION_CACHE_SIZE = 100000
+_transliteration_cache = dict()
+
+_NON_ASCII_REGEX = re.compile(u'[^\x00-\x7f]+')
+
+
+def to_unicode(text, encoding='utf-8'):
+    if isinstance(text, unicode):
+        return text
+    return unicode(text, encoding=encoding)
+
+
+def transliterate(chars):
+    """
+    ASCII transliteration of each of the non-ASCII characters
+
+    Results are memoized: texts usually have few distinct non-ASCII words
+    (city names, etc.) that are repeated a lot.
+    Args:
+        chars (unicode)  non-ASCII characters sequence, e.g. a word
+    Returns:
+        tuple of str, one per character
+    """
+    try:
+        result = _transliteration_cache[chars]
+        transliteration_stats.cache_hits += 1
+        return result
+    except KeyError:
+        pass
+    start = time.time()
+    result = tuple(unidecode(char) for char in chars)
+    transliteration_stats.transliteration_time += time.time() - start
+    transliteration_stats.cache_misses += 1
+    if len(_transliteration_cache) >= TRANSLITERATION_CACHE_SIZE:
+        _transliteration_cache.clear()
+    _transliteration_cache[chars] = result
+    return result
+
+
+def iter_ascii_chunks(text):
+    """
+    Split unicode text into ASCII and non-ASCII parts
+
+    Returns:
+        generator of (text position, ASCII part, None) for ASCII parts and
+        (text position, None, transliteration of each character) for
+        non-ASCII ones
+    """
+    position = 0
+    for match in _NON_ASCII_REGEX.finditer(text):
+        if match.start() > position:
+            yield (
+                position, text[position:match.start()].encode('ascii'), None
+            )
+        yield match.start(), None, transliterate(match.group())
+        position = match.end()
+    if position < len(text):
+        yield position, text[position:].encode('ascii'), None
+
+
 def replace_non_ascii(text):
-    if type(text) == unicode:
-        return unidecode(text)
-    return unidecode(unicode(text, encoding='utf-8'))
+    text = to_unicode(text)
+    try:
+        text = text.encode('ascii')
+        transliteration_stats.ascii_texts += 1
+        return text
+    except UnicodeEncodeError:
+        transliteration_stats.non_ascii_texts += 1
+    return ''.join(
+        ascii_part if ascii_part is not None else ''.join(transliterations)
+        for _, ascii_part, transliterations in iter_ascii_chunks(text)
+    )
 
 
 def fix_location_name(name):
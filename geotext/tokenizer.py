@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Split text into words, keeping their positions in the original text
+
+Words are transliterated to ASCII, dots are removed from acronyms ("D.C." ->
+"DC") and any other symbols separate words. All of this is done in a single
+pass over the text, and every token keeps the span of the original text it
+was made of, so found locations can be highlighted without rescanning the
+text.
+"""
+import re
+from collections import namedtuple
+
+from text_utils import (
+    iter_ascii_chunks, to_unicode, transliteration_stats,
+)
+
+Token = namedtuple('Token', 'text,start,end')
+
+# Word characters and dots, except the ones followed by two letters:
+# "Washington D.C." -> "Washington", "D.C.", but "e.mail" -> "e", "mail"
+_TOKEN_REGEX = re.compile(r'(?:\w|\.(?![a-z]{2}))+', flags=re.IGNORECASE)
+
+
+def _transliterate(text):
+    """
+    ASCII version of the text and original text position of each character
+    """
+    try:
+        ascii_text = text.encode('ascii')
+        transliteration_stats.ascii_texts += 1
+        return ascii_text, None
+    except UnicodeEncodeError:
+        transliteration_stats.non_ascii_texts += 1
+    chars = list()
+    positions = list()
+    for position, ascii_part, transliterations in iter_ascii_chunks(text):
+        if ascii_part is not None:
+            chars.append(ascii_part)
+            positions.extend(range(position, position + len(ascii_part)))
+            continue
+        for char_position, ascii_chars in enumerate(
+            transliterations, position
+        ):
+            chars.append(ascii_chars)
+            positions.extend([char_position] * len(ascii_chars))
+    return ''.join(chars), positions
+
+
+def tokenize(text):
+    """
+    Split text into words
+
+    Args:
+        text (unicode or utf-8 str)  text to split
+    Returns:
+        list of `Token`s: ASCII word with its start and end (exclusive)
+        position in the text (in characters, as if it were unicode)
+    """
+    return _split(*_transliterate(to_unicode(text)))
+
+
+def get_last_word_start(text):
+    """
+    Position in the text of the last word that more text coming after it
+    may change, None if there are no words
+
+    Words before it are the same whatever comes next, so `tokenize` of the
+    text up to it and of the rest give the same tokens as of the whole text.
+    """
+    ascii_text, positions = _transliterate(to_unicode(text))
+    start = None
+    for match in _TOKEN_REGEX.finditer(ascii_text):
+        position = match.start()
+        # The text can only be cut between characters, not inside a
+        # transliteration of one
+        if not (
+            positions is None or position == 0 or
+            positions[position - 1] != positions[position]
+        ):
+            continue
+        start = position if positions is None else positions[position]
+    return start
+
+
+def _split(ascii_text, positions):
+    """
+    Tokens of the transliterated text, see `tokenize`
+    """
+    tokens = list()
+    for match in _TOKEN_REGEX.finditer(ascii_text):
+        word = match.group()
+        # Skip dots at the token boundaries
+        start = match.start() + len(word) - len(word.lstrip('.'))
+        end = match.end() - len(word) + len(word.rstrip('.'))
+        if start >= end:
+            continue
+        word = word.replace('.', '')
+        if positions is None:
+            tokens.append(Token(word, start, end))
+        else:
+            tokens.append(
+                Token(word, positions[start], positions[end - 1] + 1)
+            )
+    return tokens
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Locations search in long texts with memory bounded by the window size
+
+`GeoText` looks up phrases of the whole text at once, longer phrases first, so
+it keeps all the words of the text and per-word state. `WindowedReader` gets
+the text piece by piece and decides locations in windows of `window_size`
+words, keeping only one window at a time.
+
+A phrase is skipped only if it's a part of a location found by a longer
+phrase, and every phrase containing a phrase starting at word `i` lies within
+words `[i - L + 1, i + L)`, where `L` is the longest location length in words.
+So locations starting within words `[a, a + window_size)` are decided by the
+phrases of words `[a - L + 1, a + window_size + L - 1)` exactly as if the
+whole text was searched at once.
+"""
+from tokenizer import Token, get_last_word_start, tokenize, to_unicode
+
+
+def _is_separator(char):
+    """
+    Whether the character is never a part of a word, see `tokenizer`
+    """
+    return char.isspace() or (
+        char < u'\x80' and not (char.isalnum() or char in u'_.')
+    )
+
+
+class WindowedReader(object):
+    """
+    Find locations in text fed piece by piece
+
+        >>> reader = WindowedReader(geo_text, window_size=1000)
+        >>> for chunk in chunks:
+        ...     reader.feed(chunk)
+        >>> reader.finish()
+        >>> reader.mentions
+        [(0, 6, u'London', 3, City: London, England, United Kingdom), ...]
+
+    The text is split into words only up to its last character that can't
+    be a part of a word, so words are never cut at pieces boundaries. Text
+    without such characters (e.g. transliterated CJK text) is split before
+    its last word once it's longer than `MAX_WORD_LENGTH` characters per
+    word of the longest location, and only a single word longer than that
+    is cut.
+    Args:
+        geo_text (GeoText)  searcher to look locations up with
+        min_population (int)  see `GeoText.read`
+        skip_nationalities (bool)  see `GeoText.read`
+        matcher (str)  one of `GeoText.MATCHERS`
+        window_size (int)  number of words to decide locations for at once
+        incremental (bool)  after every `feed` decide all the locations the
+            rest of the text can't change, instead of complete windows only,
+            so only the last words that may still be a part of a longer
+            location are held back
+        geodb (GeoDB)  model to search, the current model of `geo_text` by
+            default: the whole text is searched with the same model even
+            if `GeoText.swap_model` replaces it meanwhile
+    Attributes:
+        locations (tuple of sets)  places found so far for each `Results`
+            field
+        mentions (list)  (start, end, text, `Results` field index, place) of
+            each location found so far, in the text order
+        tokens_count (int)  number of words split so far
+    """
+    # Max length of the text kept unsplit, in characters per word of the
+    # longest location
+    MAX_WORD_LENGTH = 100
+
+    def __init__(self, geo_text, min_population=0, skip_nationalities=False,
+                 matcher=None, window_size=1000, incremental=False,
+                 geodb=None):
+        if window_size < 1:
+            raise ValueError(
+                'Window size must be positive: {}'.format(window_size)
+            )
+        self._geo_text = geo_text
+        self._min_population = min_population
+        self._skip_nationalities = skip_nationalities
+        self._matcher = matcher or geo_text.matcher
+        self._window_size = window_size
+        self._incremental = incremental
+        self._geodb = geodb if geodb is not None else geo_text._geodb
+        self._max_location_length = max(
+            self._geodb.get_max_location_length(
+                geo_text._get_search_databases(skip_nationalities)
+            ), 1
+        )
+        self.locations = (set(), set(), set(), set())
+        self.mentions = list()
+        self.tokens_count = 0
+        # Pieces of the text from `_text_offset` not split into words yet
+        self._pending = list()
+        self._pending_length = 0
+        self._max_pending_length = (
+            self.MAX_WORD_LENGTH * self._max_location_length
+        )
+        self._text_offset = 0
+        # Text of the kept tokens, starting at `_kept_text_offset`
+        self._kept_text = u''
+        self._kept_text_offset = 0
+        # Tokens from word `_tokens_offset` (with positions in the whole
+        # text), kept to decide locations of the next window
+        self._tokens = list()
+        self._tokens_offset = 0
+        # Locations of words before this one are decided
+        self._decided = 0
+        self.finished = False
+
+    def feed(self, text):
+        """
+        Add the next piece of the text and search locations in all the
+        windows it completes
+        """
+        if self.finished:
+            raise ValueError('Reader is finished')
+        text = to_unicode(text)
+        # Only the new piece is scanned: the pending text has no separators
+        split_end = len(text)
+        while split_end and not _is_separator(text[split_end - 1]):
+            split_end -= 1
+        if split_end:
+            self._pending.append(text[:split_end])
+            self._add_pending()
+            text = text[split_end:]
+        if text:
+            self._pending.append(text)
+            self._pending_length += len(text)
+        if self._pending_length > self._max_pending_length:
+            pending = u''.join(self._pending)
+            # Cut a single word only if it's too long to keep
+            split_end = get_last_word_start(pending) or len(pending)
+            self._pending = [pending[:split_end]]
+            self._add_pending()
+            if split_end < len(pending):
+                self._pending = [pending[split_end:]]
+                self._pending_length = len(pending) - split_end
+        window_end = (
+            self._decided + self._window_size + self._max_location_length - 1
+        )
+        while self._tokens_offset + len(self._tokens) >= window_end:
+            self._read_window(self._decided + self._window_size)
+            window_end += self._window_size
+        if self._incremental:
+            # The words from here on may still be parts of phrases with
+            # the words to come
+            self._read_window(
+                self._tokens_offset + len(self._tokens)
+                - self._max_location_length + 1
+            )
+        self._drop_decided()
+
+    def finish(self):
+        """
+        Search locations in the rest of the text
+        """
+        if self.finished:
+            return
+        self._add_pending()
+        self._read_window(self._tokens_offset + len(self._tokens))
+        self._drop_decided()
+        self.finished = True
+
+    def _add_pending(self):
+        """
+        Split all the pending text into words
+        """
+        text = u''.join(self._pending)
+        self._pending = list()
+        self._pending_length = 0
+        if text:
+            self._add_text(text)
+            self._text_offset += len(text)
+
+    def _add_text(self, text):
+        offset = self._text_offset
+        if not self._tokens:
+            self._kept_text = u''
+            self._kept_text_offset = offset
+        self._kept_text += text
+        tokens = tokenize(text)
+        self.tokens_count += len(tokens)
+        self._tokens.extend(
+            Token(token.text, token.start + offset, token.end + offset)
+            for token in tokens
+        )
+
+    def _read_window(self, decided_end):
+        """
+        Decide locations starting before word `decided_end`
+        """
+        decided = self._decided
+        if decided_end <= decided:
+            return
+        max_location_length = self._max_location_length
+        first = max(self._tokens_offset, decided - max_location_length + 1)
+        tokens = self._tokens[
+            first - self._tokens_offset:
+            decided_end + max_location_length - 1 - self._tokens_offset
+        ]
+        geo_text = self._geo_text
+        candidate_db = geo_text._get_candidate_db(
+            [token.text for token in tokens], self._matcher,
+            self._skip_nationalities, self._geodb,
+        )
+        _, matches = geo_text._get_locations_from_candidates(
+            candidate_db.get_candidates(), self._min_population,
+            self._skip_nationalities, geodb=self._geodb,
+        )
+        matches.sort(key=lambda match: match[:2])
+        text = self._kept_text
+        text_offset = self._kept_text_offset
+        for start, end, field_idx, place in matches:
+            start += first
+            if not decided <= start < decided_end:
+                continue
+            span_start = tokens[start - first].start
+            span_end = tokens[end - 1].end
+            self.locations[field_idx].add(place)
+            self.mentions.append((
+                span_start, span_end,
+                text[span_start - text_offset:span_end - text_offset],
+                field_idx, place,
+            ))
+        self._decided = decided_end
+
+    def _drop_decided(self):
+        """
+        Keep only the words the next window needs
+        """
+        first = max(
+            self._tokens_offset,
+            self._decided - self._max_location_length + 1,
+        )
+        del self._tokens[:first - self._tokens_offset]
+        self._tokens_offset = first
+        if self._tokens:
+            cut = self._tokens[0].start - self._kept_text_offset
+            self._kept_text = self._kept_text[cut:]
+            self._kept_text_offset += cut
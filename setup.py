@@ -15,6 +15,11 @@ requirements = [
     'Unidecode==0.4.20',
 ]
 
+extras_requirements = {
+    # Mentions matrices, see `GeoText.get_country_matrix`
+    'matrix': ['numpy', 'scipy', ],
+}
+
 test_requirements = [
     'pytest',
 ]
@@ -32,6 +37,10 @@ setup(
     include_package_data=True,
     package_data={'geotext': ['geotext/data/*.txt', ], },
     install_requires=requirements,
+    extras_require=extras_requirements,
+    entry_points={
+        'console_scripts': ['geotext = geotext.cli:main', ],
+    },
     license="MIT",
     zip_safe=False,
     keywords='geotext',
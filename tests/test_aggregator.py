@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+
+import pytest
+
+from geotext import GeoText, load_geotext_model
+from geotext.aggregator import MentionAggregator
+from geotext.models.city import City
+
+TEXTS = [
+    'New York, Texas, and also China',
+    'nothing here',
+    'London is a great city, unlike Moscow and Berlin',
+    'I flew from London to New York and then to LA, CA',
+    'Germans and the French',
+]
+
+
+@pytest.fixture(scope='module')
+def geo_text():
+    return GeoText()
+
+
+def _aggregate(geo_text, texts):
+    aggregator = MentionAggregator(geo_text)
+    for results in geo_text.iter_read_many(texts):
+        aggregator.add(results)
+    return aggregator
+
+
+def test_counts(geo_text):
+    aggregator = _aggregate(geo_text, TEXTS)
+    assert aggregator.documents == len(TEXTS)
+    expected = Counter()
+    cities = Counter()
+    for text in TEXTS:
+        geo_text.read(text)
+        expected.update(geo_text.get_country_mentions())
+        cities.update(city.name for city in geo_text.results.cities)
+    assert dict(aggregator.top_k('countries', k=len(expected))) == expected
+    top_countries = aggregator.top_k('countries', k=2)
+    assert [count for _, count in top_countries] == [
+        count for _, count in expected.most_common(2)
+    ]
+    assert {
+        (city.name, count) for city, count in aggregator.top_k('cities', 100)
+    } == set(cities.items())
+    assert aggregator.add(geo_text.results).documents == len(TEXTS) + 1
+
+
+def test_merge_is_associative(geo_text):
+    shards = [_aggregate(geo_text, [text]) for text in TEXTS]
+    left = _aggregate(geo_text, [])
+    for shard in shards:
+        left.merge(MentionAggregator.from_bytes(geo_text, shard.to_bytes()))
+    right = _aggregate(geo_text, [])
+    for shard in reversed(shards):
+        right.merge(shard)
+    whole = _aggregate(geo_text, TEXTS)
+    assert left.counts == right.counts == whole.counts
+    assert left.documents == right.documents == whole.documents
+    assert left.to_bytes() == whole.to_bytes()
+
+
+def test_bytes_across_models(geo_text):
+    aggregator = _aggregate(geo_text, TEXTS)
+    other_geo_text = GeoText(load_geotext_model())
+    restored = MentionAggregator.from_bytes(
+        other_geo_text, aggregator.to_bytes()
+    )
+    assert restored.counts == aggregator.counts
+    top_place, count = restored.top_k('countries', 1)[0]
+    assert top_place is not aggregator.top_k('countries', 1)[0][0]
+    assert (top_place.name, count) == (
+        aggregator.top_k('countries', 1)[0][0].name,
+        aggregator.top_k('countries', 1)[0][1],
+    )
+
+
+def test_other_model(geo_text, tmpdir):
+    aggregator = _aggregate(geo_text, TEXTS)
+    floor_geo_text = GeoText(load_geotext_model(
+        str(tmpdir.join('model.pickle')), min_population_floor=1000000
+    ))
+    with pytest.raises(ValueError):
+        MentionAggregator.from_bytes(floor_geo_text, aggregator.to_bytes())
+    with pytest.raises(ValueError):
+        MentionAggregator(floor_geo_text).merge(aggregator)
+    with pytest.raises(ValueError):
+        MentionAggregator.from_bytes(geo_text, aggregator.to_bytes()[:-1])
+
+
+def test_swapped_model():
+    geo_text = GeoText()
+    aggregator = _aggregate(geo_text, TEXTS)
+    london_count = aggregator.top_k('cities', 1)[0]
+    model = geo_text.model
+    city_db = model.city_db.copy()
+    city_db.add(City(
+        'Zelenogradsk', 'Zelenogradsk', 'zelenogradsk', 13000, None,
+        model.country_db['RU'],
+    ))
+    geo_text.swap_model(model.replace({'city_db': city_db}))
+    # Places of both models are counted
+    aggregator.add(geo_text.read('London').results)
+    assert aggregator.top_k('cities', 1) == [
+        (london_count[0], london_count[1] + 1),
+    ]
+    with pytest.raises(ValueError):
+        aggregator.add(geo_text.read('Zelenogradsk').results)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import threading
+from Queue import Full
+
+import pytest
+
+from geotext import GeoText
+from geotext.async_geotext import AsyncGeoText, ReadFuture
+
+
+@pytest.mark.parametrize('use_processes', [False, True])
+def test_aread(use_processes):
+    with AsyncGeoText(
+        GeoText(), workers=2, use_processes=use_processes
+    ) as async_geo_text:
+        future = async_geo_text.aread('Voronezh and NY')
+        batch_future = async_geo_text.aread_many(
+            ['London is a great city', ''], min_population=10000000
+        )
+        assert sorted(
+            city.name for city in future.result(timeout=10).cities
+        ) == ['New York', 'Voronezh']
+        assert [
+            results.cities for results in batch_future.result(timeout=10)
+        ] == [(), ()]
+
+
+def test_aread_error():
+    with AsyncGeoText(GeoText(), workers=1) as async_geo_text:
+        future = async_geo_text.aread(None)
+        with pytest.raises(Exception):
+            future.result(timeout=10)
+        # The failed read doesn't hold its pending slot
+        assert async_geo_text.aread('NY').result(timeout=10).cities
+
+
+def test_backpressure():
+    geo_text = GeoText()
+    release = threading.Event()
+    read_many = geo_text.read_many
+
+    def blocked_read_many(*args, **kwargs):
+        release.wait()
+        return read_many(*args, **kwargs)
+
+    geo_text.read_many = blocked_read_many
+    async_geo_text = AsyncGeoText(geo_text, workers=1, max_pending=2)
+    futures = [async_geo_text.aread('NY'), async_geo_text.aread('LA')]
+    with pytest.raises(Full):
+        async_geo_text.aread('SF', wait=False)
+    release.set()
+    assert [len(future.result(timeout=10).cities) for future in futures] == [
+        1, 1,
+    ]
+    async_geo_text.close()
+
+
+def test_wait_for_slot():
+    geo_text = GeoText()
+    release = threading.Event()
+    read_many = geo_text.read_many
+
+    def blocked_read_many(*args, **kwargs):
+        release.wait()
+        return read_many(*args, **kwargs)
+
+    geo_text.read_many = blocked_read_many
+    async_geo_text = AsyncGeoText(geo_text, workers=1, max_pending=1)
+    futures = [async_geo_text.aread('NY')]
+    slot = async_geo_text.wait_for_slot()
+    # Neither waits for the read in progress
+    futures.append(async_geo_text.aread('LA'))
+    assert not slot.done() and not futures[1].done()
+    release.set()
+    assert [len(future.result(timeout=10).cities) for future in futures] == [
+        1, 1,
+    ]
+    assert slot.result(timeout=10) is None
+    assert async_geo_text.wait_for_slot().done()
+    async_geo_text.close()
+
+
+def _get_function():
+    return lambda: 'NY'
+
+
+def test_aread_send_error():
+    with AsyncGeoText(
+        GeoText(), workers=1, use_processes=True, max_pending=1
+    ) as async_geo_text:
+        # Functions can't be pickled to be sent to the worker process
+        future = async_geo_text.aread(lambda: 'NY')
+        with pytest.raises(Exception):
+            future.result(timeout=10)
+        # Nor back from it
+        future = async_geo_text._submit(_get_function, (), True)
+        with pytest.raises(Exception):
+            future.result(timeout=10)
+        assert async_geo_text.aread('NY').result(timeout=10).cities
+
+
+def test_future_callbacks():
+    future = ReadFuture()
+    done = list()
+    future.add_done_callback(done.append)
+    assert not future.done() and not done
+    future._set('result')
+    future.add_done_callback(done.append)
+    assert done == [future, future]
+    assert future.result() == 'result'
+
+
+def test_failing_callback():
+    geo_text = GeoText()
+    release = threading.Event()
+    read_many = geo_text.read_many
+
+    def blocked_read_many(*args, **kwargs):
+        release.wait()
+        return read_many(*args, **kwargs)
+
+    geo_text.read_many = blocked_read_many
+    with AsyncGeoText(geo_text, workers=1) as async_geo_text:
+        future = async_geo_text.aread('NY')
+        # Called in the pool thread, then right away
+        future.add_done_callback(lambda future: 1 / 0)
+        release.set()
+        assert future.result(timeout=10).cities
+        future.add_done_callback(lambda future: 1 / 0)
+        # The pool still calls back the next reads
+        assert async_geo_text.aread('LA').result(timeout=10).cities
+
+
+def test_max_waiting():
+    geo_text = GeoText()
+    release = threading.Event()
+    read_many = geo_text.read_many
+
+    def blocked_read_many(*args, **kwargs):
+        release.wait()
+        return read_many(*args, **kwargs)
+
+    geo_text.read_many = blocked_read_many
+    async_geo_text = AsyncGeoText(
+        geo_text, workers=1, max_pending=2, max_waiting=3
+    )
+    futures = list()
+    full_count = 0
+    for _ in range(100):
+        try:
+            futures.append(async_geo_text.aread('NY'))
+        except Full:
+            full_count += 1
+    assert (len(futures), full_count) == (5, 95)
+    assert len(async_geo_text._waiting) == 3
+    release.set()
+    assert all(future.result(timeout=10).cities for future in futures)
+    async_geo_text.close()
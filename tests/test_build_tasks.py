@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from geotext import GeoText
+from geotext.models.mapped_place import open_mapped_model
+from geotext.tasks.build_tasks import build_model, main
+from geotext.tasks.db_tasks import CITIES_FILE, create_databases
+
+
+def _get_line(geonameid, name, country_code, admin1_code, population,
+              feature_class='P'):
+    columns = [''] * 19
+    columns[0], columns[1], columns[2] = str(geonameid), name, name
+    columns[6], columns[7] = feature_class, 'PPL'
+    columns[8], columns[10], columns[14] = (
+        country_code, admin1_code, str(population)
+    )
+    return '\t'.join(columns) + '\n'
+
+
+@pytest.fixture
+def dump(tmpdir):
+    path = tmpdir.join('cities.txt')
+    with open(CITIES_FILE, 'rb') as f:
+        lines = f.readlines()
+    lines += [
+        # Section of the same city in the same state
+        _get_line(1, 'Voronezh', 'RU', '86', 1000),
+        # Another Springfield
+        _get_line(2, 'Springfield', 'US', 'MO', 169176),
+        _get_line(3, 'Thames', 'GB', 'ENG', 0, feature_class='H'),
+        _get_line(4, 'Nowhere', 'XX', '', 100),
+        _get_line(5, u'Zelenogradsk City'.encode('utf-8'), 'RU', '23', 10),
+        _get_line(6, u'Châtellerault'.encode('utf-8'), 'FR', '75', 10),
+    ]
+    path.write(''.join(lines), mode='wb')
+    return str(path)
+
+
+def _get_cities(databases):
+    return sorted(
+        (city.name, city.population, city.country._key)
+        for city in databases[2].all()
+    )
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_build_model(dump, workers):
+    stats = dict()
+    databases = build_model(dump, workers=workers, chunk_size=7, stats=stats)
+    expected = _get_cities(create_databases()) + [
+        ('Chatellerault', 10, 'FR'), ('Zelenogradsk', 10, 'RU'),
+        ('Springfield', 169176, 'US'),
+    ]
+    assert _get_cities(databases) == sorted(expected)
+    assert stats['rows'] == len(open(dump).readlines())
+    assert (stats['duplicates'], stats['unknown_countries']) == (1, 1)
+    assert stats['rows_per_second'] > 0
+    springfields = databases[2].search_all('springfield')
+    assert {city.state.name for city in springfields} == {
+        'Massachusetts', 'Illinois', 'Missouri',
+    }
+
+
+def test_min_population(dump):
+    databases = build_model(dump, min_population=1000000, workers=1)
+    assert all(city.population >= 1000000 for city in databases[2].all())
+    # Abbreviations of the dropped cities are dropped too
+    assert all(
+        link.place.population >= 1000000 for link in databases[4].all()
+    )
+
+
+def test_main(dump, tmpdir, capsys):
+    output = str(tmpdir.join('model.mmap'))
+    main([dump, '--output', output, '--workers', '2', '--chunk-size', '5'])
+    stats = capsys.readouterr()[1]
+    assert 'rows_per_second=' in stats and 'peak_worker_rss_mb=' in stats
+    geo_text = GeoText(open_mapped_model(output))
+    assert [
+        city.name for city in geo_text.read(u'Châtellerault').results.cities
+    ] == ['Chatellerault']
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from geotext.models.candidate import CandidateDB
+
+
+def test_candidates_order():
+    candidate_db = CandidateDB('a b c', max_phrase_len=2)
+    assert [
+        (candidate.text, candidate.start, candidate.end)
+        for candidate in candidate_db.get_candidates()
+    ] == [
+        ('a b', 0, 2), ('b c', 1, 3), ('a', 0, 1), ('b', 1, 2), ('c', 2, 3),
+    ]
+
+
+def test_location_suppresses_contained_phrases():
+    candidate_db = CandidateDB('new york city is big')
+    found = list()
+    for candidate in candidate_db.get_candidates():
+        if candidate.text in ('new york city', 'york', 'city is', 'big'):
+            candidate.mark_as_location()
+            found.append(candidate.text)
+    # Overlapping, but not contained phrases are still found
+    assert found == ['new york city', 'city is', 'big']
+    assert candidate_db.is_in_location(1, 2)
+    assert not candidate_db.is_in_location(3, 5)
+
+
+def test_segments():
+    candidate_db = CandidateDB(
+        'a b c d e', max_phrase_len=2, segments=[(0, 2), (3, 5)]
+    )
+    assert [
+        (candidate.start, candidate.end)
+        for candidate in candidate_db.get_candidates()
+    ] == [(0, 2), (3, 5), (0, 1), (1, 2), (3, 4), (4, 5)]
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import json
+from StringIO import StringIO
+
+import pytest
+
+from geotext.cli import main
+
+
+def _run(tmpdir, lines, *args):
+    input_file = tmpdir.join('input.txt')
+    input_file.write('\n'.join(lines) + '\n', mode='wb')
+    stdout = StringIO()
+    main([str(input_file)] + list(args), stdout=stdout)
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_lines(tmpdir, workers):
+    output = _run(
+        tmpdir, ['Voronezh and NY', '', 'London is a great city'],
+        '--workers', workers, '--chunk-size', '1',
+    )
+    assert [sorted(result['country_mentions']) for result in output] == [
+        [['RU', 1], ['US', 1]], [], [['GB', 1]],
+    ]
+    assert output[2]['cities'] == [{
+        'name': 'London', 'population': 7556900, 'state': 'GB.ENG',
+        'country': 'GB',
+    }]
+
+
+def test_jsonl(tmpdir):
+    output = _run(
+        tmpdir,
+        ['{"id": 1, "body": "I am from Voronezh"}', '{"id": 2}'],
+        '--jsonl', '--text-field', 'body', '--output-field', 'places',
+        '--min-population', '1000000',
+    )
+    assert [record['id'] for record in output] == [1, 2]
+    assert output[0]['places']['cities'] == []
+    assert output[1]['places']['country_mentions'] == []
+
+
+@pytest.mark.parametrize('lines,args,message', [
+    (['{}', 'not json'], ['--jsonl'], 'Invalid JSON on input line 2'),
+    (['{}', '[]'], ['--jsonl'], 'Input line 2 is not a JSON object'),
+    (
+        ['{"text": "NY"}', '{"text": 5}'], ['--jsonl'],
+        "Field 'text' on input line 2 is not a string",
+    ),
+    (['NY', '\xff'], [], 'Input line 2 is not valid UTF-8'),
+    (['{}', '{"text": "\xff"}'], ['--jsonl'], 'Input line 2 is not valid'),
+])
+def test_invalid_input(tmpdir, lines, args, message):
+    with pytest.raises(SystemExit) as e:
+        _run(tmpdir, lines, *args)
+    assert str(e.value).startswith(message)
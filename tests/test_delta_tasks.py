@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from geotext import GeoText
+from geotext.models.geodb import GeoDB
+from geotext.models.mapped_place import (
+    open_mapped_model, write_mapped_model,
+)
+from geotext.tasks.db_tasks import create_databases
+from geotext.tasks.delta_tasks import (
+    apply_delta, read_deletes, read_geonameids, read_modifications,
+)
+
+LONDON, VORONEZH, MANCHESTER, NEW_YORK = 2643743, 472045, 2643123, 5128581
+VORONEZH_OBLAST = 472039
+
+
+def _get_line(geonameid, name, feature_class, feature_code, country_code,
+              admin1_code, population):
+    columns = [''] * 19
+    columns[0], columns[1], columns[2] = str(geonameid), name, name
+    columns[6], columns[7] = feature_class, feature_code
+    columns[8], columns[10], columns[14] = (
+        country_code, admin1_code, str(population)
+    )
+    return '\t'.join(columns) + '\n'
+
+
+@pytest.fixture
+def delta(tmpdir):
+    modifications = tmpdir.join('modifications-2026-10-16.txt')
+    modifications.write(''.join([
+        _get_line(LONDON, 'London', 'P', 'PPLC', 'GB', 'ENG', 8961989),
+        _get_line(NEW_YORK, 'Gotham', 'P', 'PPL', 'US', 'NY', 8175133),
+        _get_line(
+            VORONEZH_OBLAST, 'Voronezh Oblast', 'A', 'ADM1', 'RU', '86', 0
+        ),
+        # New cities
+        _get_line(1, u'Tula'.encode('utf-8'), 'P', 'PPL', 'RU', '76', 501169),
+        _get_line(
+            2, 'Llanfair Pwllgwyngyll Gogerych Wyrndrobwll Llan Tysilio '
+            'Gogo Goch', 'P', 'PPL', 'GB', 'WLS', 3107,
+        ),
+        # Not a populated place
+        _get_line(3, 'Thames', 'H', 'STM', 'GB', 'ENG', 0),
+    ]))
+    deletes = tmpdir.join('deletes-2026-10-16.txt')
+    deletes.write(
+        '{}\tManchester\tduplicate\n404\tNowhere\tnot found\n'.format(
+            MANCHESTER
+        )
+    )
+    return (
+        list(read_modifications(str(modifications))),
+        list(read_deletes(str(deletes))),
+    )
+
+
+def _read_cities(geo_text, text):
+    return sorted(city.name for city in geo_text.read(text).results.cities)
+
+
+def test_apply_delta(delta):
+    geodb = GeoDB(create_databases())
+    geonameids = read_geonameids()
+    assert geodb.get_max_location_length() == 7
+    london = geodb.city_db['london']
+    stats = dict()
+    new_geodb, new_geonameids = apply_delta(
+        geodb, geonameids, *delta, stats=stats
+    )
+    assert stats == {'added': 2, 'modified': 3, 'removed': 1, 'skipped': 2}
+
+    # The given model is not changed
+    assert geodb.city_db['london'] is london
+    assert london.population == 7556900
+    assert geodb.city_db['manchester'] is not None
+    assert geonameids[NEW_YORK][1][0] == 'new york'
+    assert geodb.get_max_location_length() == 7
+
+    assert new_geodb.city_db['london'].population == 8961989
+    assert new_geodb.city_db['manchester'] is None
+    assert new_geodb.city_db['new york'] is None
+    gotham = new_geodb.city_db['gotham']
+    assert gotham.state is geodb.state_db['US.NY']
+    # Links and children of the replaced places refer to the new ones
+    assert new_geodb.city_abbreviation_db['NYC'].place is gotham
+    voronezh = new_geodb.city_db['voronezh']
+    assert voronezh.state is new_geodb.state_db['RU.86']
+    assert voronezh.state.name == 'Voronezh Oblast'
+    assert geodb.city_db['voronezh'].state.name == 'Voronezj'
+    assert new_geodb.city_db['tula'].state.name == 'Tula'
+    # Unchanged databases are shared
+    assert new_geodb.country_db is geodb.country_db
+    assert new_geodb.nationality_db is geodb.nationality_db
+    assert new_geodb.get_max_location_length() == 8
+    assert new_geonameids[NEW_YORK] == (
+        'city_db', ('gotham', 'US', 'US.NY', 8175133),
+    )
+    assert MANCHESTER not in new_geonameids and 3 not in new_geonameids
+
+    # Updates apply to the updated model
+    newer_geodb, _ = apply_delta(new_geodb, new_geonameids, deletes=[2])
+    assert newer_geodb.get_max_location_length() == 7
+    # Lengths updated place by place are the same as counted from scratch
+    assert newer_geodb.get_locations_lengths('city_db') == (
+        GeoDB(newer_geodb).get_locations_lengths('city_db')
+    )
+
+
+def test_apply_delta_min_population(delta):
+    geodb = GeoDB(create_databases(min_population=1000000))
+    new_geodb, _ = apply_delta(
+        geodb, read_geonameids(), *delta, min_population=1000000
+    )
+    assert new_geodb.city_db['tula'] is None
+    assert new_geodb.city_db['london'].population == 8961989
+
+
+def test_mapped_model_is_read_only(delta, tmpdir):
+    path = str(tmpdir.join('model.mmap'))
+    write_mapped_model(create_databases(), path)
+    with pytest.raises(TypeError):
+        apply_delta(open_mapped_model(path), read_geonameids(), *delta)
+
+
+@pytest.mark.parametrize('matcher', GeoText.MATCHERS)
+def test_swap_model(delta, matcher):
+    geo_text = GeoText(
+        GeoDB(create_databases()), matcher=matcher, cache_size=10
+    )
+    text = 'From Manchester to Gotham and Tula'
+    assert _read_cities(geo_text, text) == ['Manchester']
+    # Streams go on with the model they started with
+    geo_text.feed('I live in ')
+    model, _ = apply_delta(geo_text.model, read_geonameids(), *delta)
+    previous_model = geo_text.swap_model(model)
+    assert geo_text.model is model
+    # Reads don't wait for the lookup tables the previous reads used
+    assert set(model._surface_forms) == set(previous_model._surface_forms)
+    assert set(model._tries) == set(previous_model._tries)
+    assert len(geo_text.result_cache) == 0
+    geo_text.feed('Manchester, not in Tula')
+    assert [
+        city.name for city in geo_text.finalize().results.cities
+    ] == ['Manchester']
+    assert _read_cities(geo_text, text) == ['Gotham', 'Tula']
+    assert [
+        sorted(city.name for city in results.cities)
+        for results in geo_text.read_many([text, 'NYC'])
+    ] == [['Gotham', 'Tula'], ['Gotham']]
+    geo_text.swap_model(previous_model)
+    assert _read_cities(geo_text, text) == ['Manchester']
+
+
+def test_read_many_swaps_between_texts(delta):
+    geo_text = GeoText(GeoDB(create_databases()))
+    model, _ = apply_delta(geo_text.model, read_geonameids(), *delta)
+    results = geo_text.iter_read_many(['Manchester'] * 2)
+    assert [city.name for city in next(results).cities] == ['Manchester']
+    geo_text.swap_model(model)
+    assert next(results).cities == ()
+
+
+def test_apply_delta_changes_place_kind(tmpdir):
+    geodb = GeoDB(create_databases())
+    modifications = tmpdir.join('modifications.txt')
+    modifications.write(''.join([
+        # New York City becomes a state, the state of Voronezh a city
+        _get_line(NEW_YORK, 'Gotham', 'A', 'ADM1', 'US', 'GT', 0),
+        _get_line(VORONEZH_OBLAST, 'Voronezj', 'P', 'PPL', 'RU', '', 1000),
+    ]))
+    new_geodb, new_geonameids = apply_delta(
+        geodb, read_geonameids(),
+        read_modifications(str(modifications)),
+    )
+    assert new_geodb.city_db['new york'] is None
+    assert new_geodb.city_db['gotham'] is None
+    gotham = new_geodb.state_db['US.GT']
+    assert (type(gotham).__name__, gotham.name) == ('State', 'Gotham')
+    assert new_geodb.state_db['RU.86'] is None
+    voronezj = new_geodb.city_db['voronezj']
+    assert (type(voronezj).__name__, voronezj.population) == ('City', 1000)
+    assert all(
+        type(place).__name__ == 'City' for place in new_geodb.city_db.all()
+    )
+    assert all(
+        type(place).__name__ == 'State' for place in new_geodb.state_db.all()
+    )
+    # Links to the city and cities of the state don't refer to them anymore
+    assert new_geodb.city_abbreviation_db['NYC'] is None
+    assert new_geodb.city_db['voronezh'].state is None
+    assert new_geonameids[NEW_YORK] == ('state_db', 'US.GT')
+    assert new_geonameids[VORONEZH_OBLAST][0] == 'city_db'
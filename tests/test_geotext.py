@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
+import subprocess
+import sys
+
 import pytest
 
-from geotext import GeoText
+from geotext import GeoText, load_geotext_model
 from geotext.text_utils import get_words_counts
+from geotext.windowed import WindowedReader
 
 
+@pytest.mark.parametrize('matcher', GeoText.MATCHERS)
 @pytest.mark.parametrize(
     (
         'limit,skip_nationalities,text,'
@@ -83,9 +88,9 @@ from geotext.text_utils import get_words_counts
 )
 def test_read(
     limit, skip_nationalities, text, cities, countries, nationalities, states,
-    country_mentions
+    country_mentions, matcher
 ):
-    geo_text = GeoText()
+    geo_text = GeoText(matcher=matcher)
     geo_text.read(
         text, min_population=limit, skip_nationalities=skip_nationalities
     )
@@ -112,3 +117,262 @@ def test_read(
 )
 def test_get_words_counts(phrases, result):
     assert get_words_counts(phrases) == result
+
+
+def test_unknown_matcher():
+    with pytest.raises(ValueError):
+        GeoText(matcher='regex')
+
+
+def test_read_many():
+    texts = [
+        'Voronezh and NY', 'I live in Washington D.C. but used to live in NY',
+        '', 'It is sunny in LA CA', 'Voronezh and NY',
+    ]
+    geo_text = GeoText()
+    results = geo_text.read_many(texts, min_population=500000)
+    assert len(results) == len(texts)
+    for text, text_results in zip(texts, results):
+        expected = geo_text.read(text, min_population=500000)
+        assert list(map(set, text_results)) == list(
+            map(set, expected.results)
+        )
+        assert geo_text.get_country_mentions(text_results) == (
+            expected.get_country_mentions()
+        )
+
+
+@pytest.mark.parametrize('matcher', GeoText.MATCHERS)
+def test_spans(matcher):
+    text = 'I am from Izumiōtsu but lived in Воронеж, not in Washington D.C.'
+    spans = GeoText(matcher=matcher).read(text).results.spans
+    assert [
+        (span.text, span.kind, span.place.name) for span in spans
+    ] == [
+        (u'Izumiōtsu', 'cities', 'Izumiotsu'),
+        (u'Воронеж', 'cities', 'Voronezh'),
+        (u'Washington D.C', 'cities', 'Washington, D.C.'),
+    ]
+    assert all(
+        text.decode('utf-8')[span.start:span.end] == span.text
+        for span in spans
+    )
+
+
+@pytest.mark.parametrize('matcher', GeoText.MATCHERS)
+@pytest.mark.parametrize('window_size', [1, 2, 5, 1000])
+def test_window_size(monkeypatch, matcher, window_size):
+    # Pieces split into words at once end in the middle of words and
+    # locations
+    monkeypatch.setattr(GeoText, 'DOCUMENT_CHUNK_SIZE', 7)
+    text = (
+        'I am from Izumiōtsu but lived in Воронеж, not in Washington D.C. '
+        'New York City is bigger than NY state, LA or San Francisco, USA. '
+        'Germans and the French like Paris. '
+    ) * 3
+    geo_text = GeoText(matcher=matcher)
+    expected = geo_text.read(text).results
+    results = geo_text.read(text, window_size=window_size).results
+    assert results.spans == expected.spans
+    assert [set(places) for places in results[:4]] == [
+        set(places) for places in expected[:4]
+    ]
+
+
+@pytest.mark.parametrize('text', [
+    'London,' * 2000,
+    '北京東京Izumiōtsu、Воронеж。' * 200,
+])
+def test_window_size_without_whitespace(monkeypatch, text):
+    monkeypatch.setattr(GeoText, 'DOCUMENT_CHUNK_SIZE', 7)
+    pending_lengths = list()
+    feed = WindowedReader.feed
+
+    def feed_and_measure(reader, text):
+        feed(reader, text)
+        pending_lengths.append(reader._pending_length)
+
+    monkeypatch.setattr(WindowedReader, 'feed', feed_and_measure)
+    geo_text = GeoText()
+    expected = geo_text.read(text).results.spans
+    assert geo_text.read(text, window_size=5).results.spans == expected
+    assert expected
+    assert max(pending_lengths) <= WindowedReader.MAX_WORD_LENGTH * 7
+
+
+@pytest.mark.parametrize('matcher', GeoText.MATCHERS)
+@pytest.mark.parametrize('chunk_size', [1, 4, 1000])
+def test_feed(matcher, chunk_size):
+    text = (
+        u'I am from Izumiōtsu but lived in Воронеж, not in Washington D.C. '
+        u'New York City is bigger than NY state, LA or San Francisco, USA.'
+    )
+    geo_text = GeoText(matcher=matcher)
+    expected = geo_text.read(text).results
+    expected_mentions = geo_text.get_country_mentions()
+    spans_counts = list()
+    for start in range(0, len(text), chunk_size):
+        geo_text.feed(text[start:start + chunk_size])
+        spans_counts.append(len(geo_text.results.spans))
+        assert geo_text.results.spans == expected.spans[:spans_counts[-1]]
+    assert spans_counts == sorted(spans_counts)
+    assert geo_text.finalize().results.spans == expected.spans
+    # Countries with the same count may go in any order
+    assert dict(geo_text.get_country_mentions()) == dict(expected_mentions)
+    # Next text starts from scratch
+    geo_text.feed('Paris ')
+    with pytest.raises(ValueError):
+        geo_text.feed('and Berlin', min_population=10)
+    assert [span.text for span in geo_text.finalize().results.spans] == [
+        'Paris',
+    ]
+
+
+def test_feed_holds_back_last_words():
+    geo_text = GeoText()
+    geo_text.feed('I live in New ')
+    assert geo_text.results.spans == ()
+    # Words are searched once no longer place name may contain them
+    geo_text.feed('York ' + 'and then ' * 5)
+    assert [span.text for span in geo_text.results.spans] == [
+        'New York',
+    ]
+    # The last word may go on in the next piece
+    geo_text.feed('Paris')
+    assert len(geo_text.results.spans) == 1
+    geo_text.finalize()
+    assert [span.text for span in geo_text.results.spans] == [
+        'New York', 'Paris',
+    ]
+
+
+@pytest.mark.parametrize('text', [
+    u'London,' * 2000,
+    # Transliterated to words, with no separators in the original text
+    (u'北京東京Izumiōtsu、Воронеж。') * 200,
+    # A word longer than the pending text limit
+    u'a' * 5000 + u' London',
+])
+def test_feed_without_whitespace(text):
+    geo_text = GeoText()
+    expected = geo_text.read(text).results.spans
+    max_pending_length = 0
+    for char in text:
+        geo_text.feed(char)
+        max_pending_length = max(
+            max_pending_length, geo_text._stream._pending_length
+        )
+    assert geo_text.finalize().results.spans == expected
+    assert expected
+    assert max_pending_length <= WindowedReader.MAX_WORD_LENGTH * 7
+
+
+@pytest.mark.parametrize('matcher', GeoText.MATCHERS)
+def test_strict_case_mode(matcher):
+    text = (
+        'The china in Georgia is from Turkey, not of turkey or china. '
+        'NYC and Washington D.C., USA'
+    )
+    geo_text = GeoText(matcher=matcher, case_mode=GeoText.CASE_MODE_STRICT)
+    assert [span.text for span in geo_text.read(text).results.spans] == [
+        'Georgia', 'Turkey', 'NYC', 'Washington D.C', 'USA',
+    ]
+    assert len(GeoText(matcher=matcher).read(text).results.spans) > 5
+    with pytest.raises(ValueError):
+        GeoText(case_mode='lower')
+
+
+def test_result_cache():
+    geo_text = GeoText(cache_size=2)
+    expected = GeoText().read(
+        'I live in Washington D.C. but used to live in NY'
+    )
+    for text in [
+        'I live in Washington D.C. but used to live in NY',
+        'I  live in Washington DC, but used to live in NY!',
+    ]:
+        results = geo_text.read(text).results
+        assert [
+            {place._key for place in places} for places in results[:4]
+        ] == [
+            {place._key for place in places} for places in expected.results[:4]
+        ]
+        assert [
+            text.decode('utf-8')[span.start:span.end] for span in results.spans
+        ] == [span.text for span in results.spans]
+    assert geo_text.read('NY', min_population=10 ** 9).results.cities == ()
+    assert (
+        geo_text.result_cache.hits, geo_text.result_cache.misses,
+        geo_text.result_cache.evictions,
+    ) == (1, 2, 0)
+
+
+def test_min_population_floor(tmpdir):
+    snapshot_path = str(tmpdir.join('model.pickle'))
+    database = load_geotext_model(
+        snapshot_path, min_population_floor=500000
+    ).load()
+    assert tmpdir.join('model-500000.pickle').check()
+    assert all(
+        city.population >= 500000 for city in database.city_db.all()
+    )
+    assert all(
+        link.place.population >= 500000
+        for link in database.city_abbreviation_db.all()
+    )
+    geo_text = GeoText(database)
+    geo_text.read('name of the munich writer, singer and photographer in LA')
+    assert {city.name for city in geo_text.results.cities} == {
+        'Munich', 'Los Angeles',
+    }
+
+
+def test_lazy_loading(tmpdir):
+    snapshot_path = str(tmpdir.join('model.pickle'))
+    load_geotext_model(snapshot_path).load()
+    for path in (snapshot_path, None):
+        database = load_geotext_model(path)
+        assert database.loaded == ()
+        geo_text = GeoText(database)
+        assert database.loaded == ()
+        assert database.country_db['GB'].name == 'United Kingdom'
+        assert database.loaded == ('country_db',)
+        geo_text.read('Voronezh and NY, not Germans', skip_nationalities=True)
+        assert {city.name for city in geo_text.results.cities} == {
+            'Voronezh', 'New York',
+        }
+        assert 'nationality_db' not in database.loaded
+        geo_text.read('Voronezh and NY, not Germans')
+        assert len(database.loaded) == len(database)
+
+
+@pytest.mark.parametrize('size_fraction', [0.3, 0.9])
+def test_truncated_snapshot(tmpdir, size_fraction):
+    snapshot = tmpdir.join('model.pickle')
+    expected = GeoText().read('Voronezh and NY, not Germans').results
+    load_geotext_model(str(snapshot)).load()
+    data = snapshot.read_binary()
+    snapshot.write_binary(data[:int(len(data) * size_fraction)])
+    database = load_geotext_model(str(snapshot))
+    assert database.country_db['GB'].name == 'United Kingdom'
+    # The databases missing in the snapshot are built from the data files
+    results = GeoText(database).read('Voronezh and NY, not Germans').results
+    assert [
+        (span.text, span.place._key) for span in results.spans
+    ] == [(span.text, span.place._key) for span in expected.spans]
+    assert results.spans[0].place.country is database.country_db['RU']
+    # The next load rewrites it
+    assert not snapshot.check()
+    load_geotext_model(str(snapshot)).load()
+    assert snapshot.read_binary() == data
+
+
+def test_import_does_no_io():
+    code = (
+        'import __builtin__, os\n'
+        'def fail(*args, **kwargs):\n'
+        '    raise AssertionError(args)\n'
+        '__builtin__.open = os.open = fail\n'
+        'import geotext\n'
+    )
+    subprocess.check_call([sys.executable, '-c', code])
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from geotext import GeoText, load_mapped_geotext_model
+from geotext.instrumentation import PeriodicProfiler, ReadStats, STAGES
+
+
+@pytest.mark.parametrize('matcher', GeoText.MATCHERS)
+def test_stats(matcher):
+    geo_text = GeoText(matcher=matcher, instrument=True)
+    results = geo_text.read('I flew from New York to Moscow').results
+    stats = geo_text.stats
+    assert stats.reads == 1
+    assert stats.tokens == 7
+    assert stats.candidates > 0
+    if matcher == GeoText.MATCHER_NGRAM:
+        # "New" and "York" aren't looked up after "New York" is found
+        assert stats.suppressed_candidates > 0
+    assert stats.lookups == stats.candidates
+    assert stats.hits_by_field == {'cities': len(results.spans)}
+    assert sum(stats.hits_by_step.values()) == len(results.spans)
+    assert tuple(stats.timings) == STAGES
+    assert all(timing >= 0 for timing in stats.timings.values())
+
+    geo_text.read_many(['Paris', 'Paris'])
+    assert stats.reads == 3
+    # In-memory models look names up in their surface forms table, without
+    # the batch cache
+    assert stats.lookups == stats.candidates
+
+
+def test_stats_batch_cache(tmpdir):
+    geo_text = GeoText(
+        load_mapped_geotext_model(str(tmpdir.join('model.mmap'))),
+        instrument=True,
+    )
+    geo_text.read_many(['Paris', 'Paris'])
+    # The second "Paris" is looked up in the batch cache
+    assert (geo_text.stats.candidates, geo_text.stats.lookups) == (2, 1)
+
+
+def test_stats_disabled():
+    assert GeoText().stats is None
+
+
+def test_result_cache_hits():
+    geo_text = GeoText(instrument=True, cache_size=10)
+    geo_text.read('London')
+    geo_text.read('London')
+    assert (geo_text.stats.reads, geo_text.stats.result_cache_hits) == (2, 1)
+
+
+def test_on_read():
+    reads = list()
+    geo_text = GeoText(on_read=lambda text, stats: reads.append((text, stats)))
+    geo_text.read('London')
+    geo_text.read('Voronezh and Berlin')
+    assert [text for text, _ in reads] == ['London', 'Voronezh and Berlin']
+    assert [stats.hits_by_field['cities'] for _, stats in reads] == [1, 2]
+    assert geo_text.stats.hits_by_field['cities'] == 3
+
+
+def test_merge_and_pickle():
+    stats = ReadStats()
+    other = ReadStats()
+    other.reads = 2
+    other.hits_by_step['6:city_db'] = 3
+    other.timings['lookup'] = 0.5
+    stats.merge(other)
+    stats.merge(pickle.loads(pickle.dumps(other)))
+    assert stats.as_dict()['reads'] == 4
+    assert stats.hits_by_step == {'6:city_db': 6}
+    assert stats.total_time == 1.0
+
+
+def test_periodic_profiler(tmpdir):
+    path = str(tmpdir.join('geotext-{}.prof'))
+    profiler = PeriodicProfiler(path, interval=0)
+    geo_text = GeoText(profiler=profiler)
+    assert len(geo_text.read('London').results.cities) == 1
+    assert geo_text.stats is None
+    assert profiler.dumps_count == 1
+    assert tmpdir.join('geotext-0.prof').check()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from geotext.models.city import City
+from geotext.models.country import Country
+from geotext.models.mapped_place import (
+    open_mapped_model, read_mapped_sources, write_mapped_model,
+)
+from geotext.models.place import PlaceDB
+from geotext.models.place_link import PlaceLink
+from geotext.models.state import State
+
+
+@pytest.fixture
+def databases():
+    country_db = PlaceDB(ignore_abbreviations=True)
+    country = Country('GB', 'United Kingdom', 'united kingdom', 62348447)
+    country_db.add(country)
+    canada = Country('CA', 'Canada', 'canada', 33679000)
+    country_db.add(canada)
+    state_db = PlaceDB()
+    state = State('GB.ENG', 'England', 'england', country)
+    state_db.add(state)
+    city_db = PlaceDB()
+    city = City('London', 'London', 'london', 7556900, state, country)
+    city_db.add(city)
+    city_db.add(City('Of', 'Of', 'of', 22000, None, country))
+    city_db.add(City('London', 'London', 'london', 346765, None, canada))
+    abbreviation_db = PlaceDB()
+    abbreviation_db.add(PlaceLink('UK', 'UK', 'UK', country))
+    return country_db, state_db, city_db, abbreviation_db
+
+
+@pytest.fixture
+def mapped_databases(databases, tmpdir):
+    path = str(tmpdir.join('model.mmap'))
+    write_mapped_model(databases, path, sources=(('file', 'hash'),))
+    assert read_mapped_sources(path) == (('file', 'hash'),)
+    return open_mapped_model(path)
+
+
+@pytest.mark.parametrize(
+    'db_idx,text',
+    [
+        (0, 'GB'), (0, 'united kingdom'), (0, 'france'),
+        (1, 'GB.ENG'), (1, 'england'), (1, 'US.CA'),
+        (2, 'London'), (2, 'london'), (2, 'of'), (2, 'Paris'),
+        (3, 'UK'), (3, 'uk'),
+    ]
+)
+def test_mapped_search(databases, mapped_databases, db_idx, text):
+    db, mapped_db = databases[db_idx], mapped_databases[db_idx]
+    assert repr(mapped_db.search(text)) == repr(db.search(text))
+    assert repr(mapped_db[text]) == repr(db[text])
+    assert (text in mapped_db) == (text in db)
+
+
+def test_mapped_places(mapped_databases):
+    country_db, state_db, city_db, abbreviation_db = mapped_databases
+    city = city_db.search('london')
+    # Places are created once per process and shared between databases
+    assert city is city_db['London']
+    assert city.state is state_db['GB.ENG']
+    assert city.country is country_db.search('united kingdom')
+    assert abbreviation_db.search('UK').place is city.country
+    assert city.population == 7556900
+    assert city_db.search('of').state is None
+    assert city in city_db
+    assert sorted(city_db.get_search_fields()) == ['london', 'london', 'of']
+    assert sorted(place.name for place in city_db.all()) == [
+        'London', 'London', 'Of',
+    ]
+    with pytest.raises(TypeError):
+        city_db.add(city)
+
+
+def test_mapped_search_all(databases, mapped_databases):
+    city_db, mapped_city_db = databases[2], mapped_databases[2]
+    for kwargs in [
+        {}, {'limit': 1}, {'min_population': 1000000}, {'country': 'CA'},
+    ]:
+        assert repr(mapped_city_db.search_all('london', **kwargs)) == repr(
+            city_db.search_all('london', **kwargs)
+        )
+    assert len(mapped_city_db.search_all('london')) == 2
+    assert len(list(mapped_city_db.all())) == 3
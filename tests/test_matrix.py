@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from geotext import GeoText
+from geotext.matrix import CountsMatrixBuilder
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_counts_matrix_builder(sparse):
+    pytest.importorskip('numpy')
+    if sparse:
+        pytest.importorskip('scipy')
+    builder = CountsMatrixBuilder(columns_count=3, sparse=sparse)
+    builder.add_row({2: 1, 0: 2})
+    builder.add_row({})
+    builder.add_row({1: 5})
+    assert builder.rows_count == 3
+    matrix = builder.build()
+    if sparse:
+        matrix = matrix.toarray()
+    assert matrix.tolist() == [[2, 0, 1], [0, 0, 0], [0, 5, 0]]
+
+
+def test_country_matrix():
+    numpy = pytest.importorskip('numpy')
+    pytest.importorskip('scipy')
+    texts = [
+        'New York, Texas, and also China',
+        'nothing here',
+        'London is a great city, unlike Moscow and Berlin',
+    ]
+    geo_text = GeoText()
+    index = geo_text.get_country_index()
+    matrix = geo_text.get_country_matrix(geo_text.iter_read_many(texts))
+    dense = geo_text.get_country_matrix(
+        geo_text.iter_read_many(texts), sparse=False
+    )
+    assert matrix.shape == dense.shape == (len(texts), len(index))
+    assert (matrix.toarray() == dense).all()
+    for row, text in zip(dense, texts):
+        mentions = geo_text.read(text).get_country_mentions()
+        assert {
+            index.get_place(country_id): count
+            for country_id, count in enumerate(row) if count
+        } == mentions
+    assert dense.sum() == numpy.asarray(matrix.sum(axis=0)).sum() == 5
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from geotext import GeoText, load_geotext_model
+from geotext.models.geodb import GeoDB
+from geotext import parallel
+from geotext.parallel import create_pool, read_parallel
+
+TEXTS = [
+    'London is a great city', 'Voronezh and NY', '', 'It is sunny in LA CA',
+    'I live in Washington D.C. but used to live in NY',
+] * 3
+
+
+def _get_keys(results):
+    return [
+        sorted(place._key for place in places) for places in results[:4]
+    ]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_read_parallel(workers):
+    geo_text = GeoText()
+    expected = [_get_keys(results) for results in geo_text.read_many(TEXTS)]
+    assert [
+        _get_keys(results) for results in read_parallel(
+            iter(TEXTS), workers=workers, chunk_size=2,
+            max_chunks_in_flight=2, geo_text=geo_text,
+        )
+    ] == expected
+
+
+def test_read_parallel_stop_early():
+    results = read_parallel(TEXTS, workers=2, chunk_size=1)
+    assert _get_keys(next(results)) == [[], [], [], ['London']]
+    results.close()
+
+
+def _get_parent_process_loader(model):
+    pid = os.getpid()
+
+    def load(geodb, name):
+        assert os.getpid() == pid, 'Worker process loaded ' + name
+        return {name: getattr(model, name)}
+    return load
+
+
+@pytest.mark.parametrize('matcher', GeoText.MATCHERS)
+def test_read_parallel_loads_model_once(matcher):
+    model = load_geotext_model()
+    geo_text = GeoText(
+        GeoDB(loader=_get_parent_process_loader(model)), matcher=matcher,
+    )
+    results = list(read_parallel(
+        TEXTS, workers=2, chunk_size=1, geo_text=geo_text,
+    ))
+    assert _get_keys(results[0]) == [[], [], [], ['London']]
+    assert geo_text.model.loaded == GeoDB._fields
+    # Compiled before the workers were forked, so they inherited them too
+    assert geo_text.model._surface_forms
+    assert bool(geo_text.model._tries) == (matcher == GeoText.MATCHER_TRIE)
+
+
+def test_read_parallel_skip_nationalities():
+    model = load_geotext_model()
+    geo_text = GeoText(GeoDB(loader=_get_parent_process_loader(model)))
+    assert len(list(read_parallel(
+        TEXTS, workers=2, skip_nationalities=True, geo_text=geo_text,
+    ))) == len(TEXTS)
+    # Only what these reads need is prepared
+    assert 'nationality_db' not in geo_text.model.loaded
+    assert list(geo_text.model._surface_forms) == [
+        GeoText._get_search_databases(skip_nationalities=True),
+    ]
+
+
+def _exit_worker():
+    os._exit(0)
+
+
+def _get_worker_state():
+    return (
+        os.getpid(), parallel._geo_text.matcher,
+        parallel._geo_text.model.loaded,
+    )
+
+
+def test_create_pool_replaced_worker():
+    geo_text = GeoText(matcher=GeoText.MATCHER_TRIE)
+    pool = create_pool(1, geo_text)
+    try:
+        pid = pool.apply(os.getpid)
+        pool.apply_async(_exit_worker)
+        # The worker started instead of the exited one has the same instance
+        new_pid, matcher, loaded = pool.apply(_get_worker_state)
+        assert new_pid != pid
+        assert matcher == GeoText.MATCHER_TRIE
+        assert loaded == GeoDB._fields
+    finally:
+        pool.terminate()
+        pool.join()
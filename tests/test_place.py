@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import cPickle as pickle
+import sys
+
+import pytest
+
+from geotext.models.city import City
+from geotext.models.country import Country
+from geotext.models.place import PlaceDB
+from geotext.models.place_link import PlaceLink
+from geotext.tasks.db_tasks import create_databases
+
+
+class _DictPlace(object):
+    """
+    Place stored in a `__dict__`, as places used to be
+    """
+    def __init__(self, place):
+        for slot in place._get_slots():
+            setattr(self, slot, getattr(place, slot))
+
+
+def _get_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def _get_strings(places):
+    for place in places:
+        yield place._key
+        yield place.name
+        yield place._search_field
+
+
+def test_memory_footprint():
+    places = [
+        place for database in create_databases() for place in database.all()
+    ]
+    assert not any(hasattr(place, '__dict__') for place in places)
+    size = sum(_get_size(place) for place in places)
+    dict_size = sum(_get_size(_DictPlace(place)) for place in places)
+    assert size * 3 < dict_size
+
+    # Equal strings are stored once
+    strings = list(_get_strings(places))
+    assert len({id(string) for string in strings}) == len(set(strings))
+
+
+def test_pickle():
+    country = Country('GB', 'United Kingdom', 'united kingdom', 62348447)
+    city = City('London', 'London', 'london', 7556900, None, country)
+    city, country = pickle.loads(
+        pickle.dumps((city, country), pickle.HIGHEST_PROTOCOL)
+    )
+    assert (city.name, city.population, city.state) == (
+        'London', 7556900, None,
+    )
+    assert city.country is country
+    assert city.name is intern('London')
+    assert city._search_field is intern('london')
+
+
+def _create_city_db():
+    us = Country('US', 'United States', 'united states', 310232863)
+    ca = Country('CA', 'Canada', 'canada', 33679000)
+    city_db = PlaceDB()
+    for city in [
+        City('Springfield', 'Springfield', 'springfield', 116565, None, us),
+        City('Springfield', 'Springfield', 'springfield', 153703, None, us),
+        City('Springfield', 'Springfield', 'springfield', 15000, None, ca),
+        City('Springfield', 'Springfield', 'springfield', 15000, None, us),
+    ]:
+        city_db.add(city)
+    return city_db
+
+
+def test_posting_lists():
+    city_db = _create_city_db()
+    springfields = city_db.search_all('springfield')
+    assert [(city.population, city.country._key) for city in springfields] == [
+        (153703, 'US'), (116565, 'US'), (15000, 'US'), (15000, 'CA'),
+    ]
+    assert city_db.search('springfield') is springfields[0]
+    # Key conflicts keep the most populated place
+    assert city_db['Springfield'] is springfields[0]
+    assert len(list(city_db.all())) == 4
+    assert all(city in city_db for city in springfields)
+
+    assert city_db.search_all('springfield', limit=1) == springfields[:1]
+    assert city_db.search_all(
+        'springfield', min_population=100000
+    ) == springfields[:2]
+    assert city_db.search_all('springfield', country='CA') == springfields[3:]
+    assert city_db.search_all('springfield', country='GB') == []
+    assert city_db.search_all('paris') == []
+
+
+def test_links_ranked_by_place():
+    city_db = _create_city_db()
+    link_db = PlaceDB()
+    for city in city_db.search_all('springfield'):
+        link_db.add(PlaceLink('SPR', 'SPR', 'spr', city))
+    assert [
+        link.place.population for link in link_db.search_all(
+            'spr', min_population=20000, country='US'
+        )
+    ] == [153703, 116565]
+
+
+def test_remove_and_copy():
+    city_db = _create_city_db()
+    springfields = city_db.search_all('springfield')
+    copy = city_db.copy()
+    copy.remove(springfields[0])
+    assert copy.search_all('springfield') == springfields[1:]
+    # The next most populated place with the key is found by it
+    assert copy['Springfield'] is springfields[1]
+    assert springfields[0] not in copy
+    # The original database is not changed
+    assert city_db.search_all('springfield') == springfields
+    assert city_db['Springfield'] is springfields[0]
+    for city in springfields[1:]:
+        copy.remove(city)
+    assert copy.search('springfield') is None
+    assert copy.search_all('springfield', country='US') == []
+    assert 'Springfield' not in copy
+    with pytest.raises(KeyError):
+        copy.remove(springfields[0])
+
+
+def test_finish():
+    city_db = _create_city_db()
+    springfields = city_db.search_all('springfield')
+    # Removed while building, the next places still go in population order
+    city_db.remove(springfields[1])
+    city_db.add(springfields[1])
+    assert city_db.finish() is city_db
+    assert type(city_db._objects_by_text['springfield']) is tuple
+    assert city_db.search_all('springfield') == springfields
+    copy = pickle.loads(pickle.dumps(city_db, pickle.HIGHEST_PROTOCOL))
+    assert [city.population for city in copy.search_all('springfield')] == [
+        153703, 116565, 15000, 15000,
+    ]
+    # Places added after `finish` don't change the copies
+    copy = city_db.copy()
+    us = springfields[0].country
+    city = City('Springfield', 'Springfield', 'springfield', 20000, None, us)
+    city_db.add(city)
+    assert city_db.search_all('springfield', country='US') == [
+        springfields[0], springfields[1], city, springfields[2],
+    ]
+    assert copy.search_all('springfield') == springfields
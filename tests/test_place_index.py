@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from geotext import load_geotext_model
+from geotext.models.city import City
+from geotext.models.country import Country
+from geotext.models.place_index import PlaceIndex
+
+
+def test_stable_ids():
+    indexes = [
+        load_geotext_model().get_place_index('city_db') for _ in range(2)
+    ]
+    assert len(indexes[0]) == len(indexes[1]) > 0
+    for place_id, place in enumerate(indexes[0]):
+        other_place = indexes[1].get_place(place_id)
+        assert other_place is not place
+        assert (other_place._key, other_place.population) == (
+            place._key, place.population
+        )
+        assert indexes[1].get_id(place) == place_id
+
+
+def test_same_keys():
+    country = Country('US', 'United States', 'united states', 300000000)
+    cities = [
+        City(
+            'Springfield', 'Springfield', 'springfield', population, None,
+            country,
+        )
+        for population in (150000, 150000, 110000)
+    ]
+    index = PlaceIndex(cities)
+    # Places with the same values are the same place
+    assert len(index) == 2
+    assert index.get_id(cities[0]) == index.get_id(cities[1])
+    assert index.get_id(cities[2]) != index.get_id(cities[0])
+    assert cities[2] in index
+
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from geotext.models.result_cache import ResultCache
+
+
+def test_lru_eviction():
+    cache = ResultCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
+    assert len(cache) == 2
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        ResultCache(0)
+
+
+def test_threads():
+    cache = ResultCache(50)
+
+    def use_cache():
+        for i in range(1000):
+            if cache.get(i % 100) is None:
+                cache.put(i % 100, i)
+
+    threads = [threading.Thread(target=use_cache) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 50
+    assert cache.hits + cache.misses == 4000
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from geotext.models.country import Country
+from geotext.models.place import PlaceDB
+from geotext.models.state import State
+from geotext.tasks.snapshot_tasks import load_snapshot, save_snapshot
+
+
+def _create_databases():
+    country_db = PlaceDB(ignore_abbreviations=True)
+    country = Country('GB', 'United Kingdom', 'united kingdom', 62348447)
+    country_db.add(country)
+    state_db = PlaceDB()
+    state_db.add(State('GB.ENG', 'England', 'england', country))
+    return country_db, state_db
+
+
+def test_snapshot_roundtrip(tmpdir):
+    source = tmpdir.join('source.txt')
+    source.write('GB\tUnited Kingdom\n')
+    path = str(tmpdir.join('model.pickle'))
+
+    save_snapshot(_create_databases(), path, sources=[str(source)])
+    country_db, state_db = load_snapshot(path, sources=[str(source)])
+
+    assert country_db.ignore_abbreviations
+    assert country_db.search('united kingdom').population == 62348447
+    # References between databases are preserved
+    assert state_db['GB.ENG'].country is country_db.search('united kingdom')
+
+
+def test_snapshot_is_stale(tmpdir):
+    source = tmpdir.join('source.txt')
+    source.write('GB\tUnited Kingdom\n')
+    path = str(tmpdir.join('model.pickle'))
+
+    save_snapshot(_create_databases(), path, sources=[str(source)], key=1)
+    assert load_snapshot(path, sources=[str(source)], key=2) is None
+
+    source.write('GB\tGreat Britain\n')
+    assert load_snapshot(path, sources=[str(source)], key=1) is None
+
+
+def test_snapshot_missing_or_corrupted(tmpdir):
+    path = tmpdir.join('model.pickle')
+    assert load_snapshot(str(path), sources=[]) is None
+    path.write('garbage')
+    assert load_snapshot(str(path), sources=[]) is None
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from geotext import GeoText
+from geotext.models.surface_forms import SurfaceFormTable, US_STATE_PREFIX
+
+
+@pytest.fixture(scope='module')
+def geo_text():
+    return GeoText()
+
+
+def _get_texts(geodb):
+    for database in geodb:
+        for key in database.get_lookup_keys():
+            if key.startswith(US_STATE_PREFIX):
+                key = key[len(US_STATE_PREFIX):]
+            for text in (key, key.lower(), key.upper(), key.title()):
+                yield text
+    for text in ('', 'of', 'Of', 'nowhere', 'US', 'LA', 'la', 'CA', 'Ca'):
+        yield text
+
+
+@pytest.mark.parametrize('skip_nationalities', [False, True])
+@pytest.mark.parametrize(
+    'min_population', [0, 20000, 500000, 10 ** 7, 10 ** 9]
+)
+def test_matches_cascade(geo_text, min_population, skip_nationalities):
+    geodb = geo_text._geodb
+    surface_forms = SurfaceFormTable(
+        geodb, geo_text._get_search_databases(skip_nationalities)
+    )
+    for text in set(_get_texts(geodb)):
+        assert surface_forms.lookup(text, min_population) == (
+            geo_text._search_location(
+                text, min_population, skip_nationalities
+            )
+        ), text
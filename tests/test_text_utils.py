@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import pytest
+from unidecode import unidecode
+
+from geotext.text_utils import replace_non_ascii, transliteration_stats
+
+
+@pytest.mark.parametrize(
+    'text',
+    [
+        '', 'London', u'London', 'Izumiōtsu', u'Воронеж и Москва',
+        u'東京 Tokyo',
+    ],
+)
+def test_replace_non_ascii(text):
+    expected = unidecode(
+        text.decode('utf-8') if isinstance(text, str) else text
+    )
+    assert replace_non_ascii(text) == expected
+    assert isinstance(replace_non_ascii(text), str)
+
+
+def test_transliteration_stats():
+    transliteration_stats.reset()
+    replace_non_ascii('London')
+    replace_non_ascii(u'Москва Москва Tokyo')
+    assert transliteration_stats.ascii_texts == 1
+    assert transliteration_stats.non_ascii_texts == 1
+    assert transliteration_stats.cache_hits >= 1
+    assert 0 < transliteration_stats.hit_rate <= 1
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from geotext.tokenizer import Token, tokenize
+
+
+@pytest.mark.parametrize(
+    'text,tokens',
+    [
+        ('', []),
+        ('  ', []),
+        ('New York', [Token('New', 0, 3), Token('York', 4, 8)]),
+        ('Washington D.C.', [Token('Washington', 0, 10), Token('DC', 11, 14)]),
+        ('e.mail, U.S.A.!', [
+            Token('e', 0, 1), Token('mail', 2, 6), Token('USA', 8, 13),
+        ]),
+        ("Rock'n'roll", [
+            Token('Rock', 0, 4), Token('n', 5, 6), Token('roll', 7, 11),
+        ]),
+        ('... .', []),
+        (u'Воронеж', [Token('Voronezh', 0, 7)]),
+        (u'Жуковский,Ōsaka', [
+            Token('Zhukovskii', 0, 9), Token('Osaka', 10, 15),
+        ]),
+        ('Izumiōtsu city', [Token('Izumiotsu', 0, 9), Token('city', 10, 14)]),
+    ]
+)
+def test_tokenize(text, tokens):
+    assert tokenize(text) == tokens
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from geotext.models.candidate import CandidateDB
+from geotext.models.trie import TokenTrie, TrieCandidateDB
+
+
+def test_find_all():
+    trie = TokenTrie(['New York', 'York', 'new york city', 'LA'])
+    assert trie.max_phrase_len == 3
+    assert sorted(trie.find_all('i love new york city and la'.split())) == [
+        (2, 4), (2, 5), (3, 4), (6, 7),
+    ]
+
+
+@pytest.mark.parametrize(
+    'text,locations',
+    [
+        ('New York City is in New York', {'New York City', 'New York'}),
+        ('South Korea and North Korea', {'South Korea', 'North Korea'}),
+        ('Korea', {'Korea'}),
+    ]
+)
+def test_candidates_match_ngrams(text, locations):
+    trie = TokenTrie(
+        ['New York City', 'New York', 'York', 'Korea', 'South Korea',
+         'North Korea', 'City']
+    )
+
+    def find_locations(candidate_db):
+        found = set()
+        for candidate in candidate_db.get_candidates():
+            if candidate.text in locations:
+                found.add(candidate.text)
+                candidate.mark_as_location()
+        return found
+
+    assert find_locations(TrieCandidateDB(text, trie)) == locations
+    assert find_locations(CandidateDB(text)) == locations